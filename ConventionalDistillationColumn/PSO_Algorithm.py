@@ -2,62 +2,186 @@
 
 import numpy as np
 import time
-import datetime as dt
+from concurrent.futures import wait, FIRST_COMPLETED
 
-from print_pso import print_results
+from reporters import make_reporters
+from evaluation import make_evaluator
+from cache import CachedEvaluator
+from budget import Budget
+from checkpoint import CheckpointWriter, load_checkpoint, rng_state, set_rng_state
+from topology import make_topology, neighborhood_best
+from history import History, diversity, diversity_work
+from profiler import Profiler
+from liveplot import LivePlot
 
 
 
-def pso_gbest(objfnc, lb, ub, intVar, *arg):
-'''Standard PSO algorithm (gbest) for minimizing a n dimensional function
-  Input argurments:
-	objfnc:  objective function 
-	lb:  array containing lower bound on independent variables (len of array determines the dimensions)
-	ub: array containing upper bound on independent variables (len of array determines the dimensions)
-	intVar: array containing the index of the interger (indpendent) variables
+def pso_gbest(objfnc, lb, ub, intVar, *arg, **options):
+    '''Standard PSO algorithm (gbest) for minimizing a n dimensional function
+      Input argurments:
+    	objfnc:  objective function 
+    	lb:  array containing lower bound on independent variables (len of array determines the dimensions)
+    	ub: array containing upper bound on independent variables (len of array determines the dimensions)
+    	intVar: array containing the index of the interger (indpendent) variables
+    	arg[0]: Problem structure passed to the objective, objfnc(x, Problem)
+    	options: keyword arguments overriding the PSO OPTIONS (swarm_size,
+    		maxIter, ..., topology, topology_k, print_freq, reporters,
+    		report_interval, plotPSO, engine,
+    		rng, history, history_size, history_mode, profile_callback,
+    		evaluator, n_workers,
+    		worker_init, worker_initargs, cache_size, cache_quantization)
+
+    	history: True (default) records gbest, pworst, error_fnc, error_x,
+    		FO_eval, wall time and diversity of every iteration (see
+    		history.py), returned as Result.history. history_mode 'grow',
+    		'ring' (last history_size iterations) or 'downsample' (at most
+    		history_size rows for the whole run)
+
+    	rng: numpy.random.Generator of the run or its seed (int or
+    		np.random.SeedSequence, None for a fresh seed). The particle and
+    		swarm engines draw the random coefficients of an iteration in one
+    		call; in async mode every particle has its own stream spawned from
+    		rng, so its coefficients do not depend on the order in which the
+    		evaluations complete (with parallel evaluators that order still
+    		changes which gbest each particle sees). Random numbers are never
+    		drawn in the evaluation workers, so the particle and swarm engines
+    		give the same trajectories with serial, thread and process
+    		evaluators for the same seed
+
+    	topology: 'gbest' (default) or a lbest topology, 'ring', 'von_neumann',
+    		'random' or a neighbor index array (see topology.py). With lbest
+    		topologies each particle follows the best personal best of its
+    		neighbors instead of gbest (topology_k: ring radius or number of
+    		random informants)
+
+    	profile_callback: function f(phase, seconds) called at the end of
+    		every phase of the run ('objective', 'update', 'bookkeeping',
+    		'reporting', 'plotting', see profiler.py). The time of each phase
+    		is returned as Result.profile: 'objective' is the simulator,
+    		the rest is the Python side of the optimizer
+    	reporters: progress reporters (see reporters.py), a list of Reporter
+    		instances and/or functions f(n_iter, FO_eval, gbest, pworst,
+    		error_fnc, error_x). By default a ConsoleReporter prints every
+    		print_freq iterations, at most once per report_interval seconds
+    		(Reporter instances are flushed, not closed, when the run ends)
+    	plotPSO: live plot of the convergence and of the particles, drawn by a
+    		separate process fed through shared memory (see liveplot.py), so
+    		the optimizer never waits for the rendering (frames are dropped
+    		when the plot falls behind). True or 'on' opens one for the run,
+    		a LivePlot instance is used as given (and not closed)
+    	engine: 'particle' moves and evaluates one particle at a time (default
+    		with the serial evaluator), 'swarm' moves the whole swarm and then
+    		evaluates it in one call to the evaluator (default with parallel
+    		evaluators), 'async' re-dispatches each particle as soon as its own
+    		evaluation completes, using the latest gbest (steady-state PSO for
+    		simulators with heterogeneous evaluation times). In async mode an
+    		iteration is counted every swarm_size completed evaluations and no
+    		evaluation is dispatched beyond maxIter*swarm_size, so maxIter
+    		gives the same number of evaluations as the other engines
+    	evaluator: 'serial', 'thread', 'process' or an evaluator instance (see
+    		evaluation.py). Parallel evaluators spread the swarm across
+    		n_workers workers. When worker_init is given, each worker calls
+    		worker_init(*worker_initargs) once and the objective is called with
+    		the returned context instead of Problem, objfnc(x, context).
+    		simulator_pool.SimulatorPool keeps n_workers simulator instances
+    		open across iterations and recycles them (an evaluator instance)
+    	cache_size: positions kept in a LRU cache of fitness values (0 disables
+    		it), keyed on the rounded position and, if cache_quantization is
+    		given, on the quantized continuous variables. Repeated designs are
+    		not simulated again but still count in FO_eval
+    	maxFO, maxTime: budgets checked after every evaluation, so the run
+    		stops in the middle of an iteration when one runs out and returns
+    		the best design so far. Parallel evaluators receive the whole
+    		swarm and the simulations not started when the time runs out are
+    		cancelled
+    	checkpoint: .npz file where the swarm state is saved every
+    		checkpoint_every iterations (at most once per checkpoint_interval
+    		seconds) by a background writer, so a crash of the simulator or of
+    		Python does not lose the run
+    	resume: checkpoint file to continue a run from (same options). The
+    		particle and swarm engines continue exactly as the uninterrupted
+    		run; the async engine dispatches again the evaluations in flight
 	
-	returns: Result Class
-					Result.best_fitness = gbest_fitness
-					Result.x_best       = gbest_x
-					Result.iterations   = n_iter
-					Result.FO_eval      = FO_eval
-					Result.error_x      = error_x
-					Result.error_fnc    = error_fnc
-					Result.exit         = termination
+    	returns: Result Class
+    					Result.best_fitness = gbest_fitness
+    					Result.x_best       = gbest_x
+    					Result.iterations   = n_iter
+    					Result.FO_eval      = FO_eval (exact number of evaluations)
+    					Result.error_x      = error_x
+    					Result.error_fnc    = error_fnc
+    					Result.exit         = termination
+    					Result.time_total, time_objective, time_optimizer [s]
+    					Result.cache        = cache statistics (when cache_size > 0)
+    					Result.history      = convergence history (None if disabled)
+    					Result.profile      = time of each phase {phase: [s]}
   
-	 Author: Juan Javaloyes Antón & FJ Navarro-Brull (Sept 2016)
-     License: BSD-CL 3 javaloyes.juan@gmail.com 
-     More info at: https://github.com/CAChemE/stochastic-optimization
-'''
+    	 Author: Juan Javaloyes Antón & FJ Navarro-Brull (Sept 2016)
+         License: BSD-CL 3 javaloyes.juan@gmail.com 
+         More info at: https://github.com/CAChemE/stochastic-optimization
+    '''
     
     Problem = arg[0]
     
 # >>>>>>>>>>>>>>>>>>>>>>>>>>[ PSO OPTIONS ]>>>>>>>>>>>>>>>>>>>> User inputs
     # * Population size
-    swarm_size = 20          #  number of the swarm particles
+    swarm_size = options.pop('swarm_size', 20)          #  number of the swarm particles
     
     # * Termination Conditions
-    maxIter    = 30          #  maximum number of iterations
-    maxFO      = 1e5         #  maximun number of function evaluations
+    maxIter    = options.pop('maxIter', 30)          #  maximum number of iterations
+    maxFO      = options.pop('maxFO', 1e5)         #  maximun number of function evaluations
     
-    maxIterNoImprov = 1e5    # maximun number of iterations without improving the objective function
-    maxTime         = 1e5    # time limit in seconds [s] [or np.finfo(np.float64).max for realmax]
+    maxIterNoImprov = options.pop('maxIterNoImprov', 1e5)    # maximun number of iterations without improving the objective function
+    maxTime         = options.pop('maxTime', 1e5)    # time limit in seconds [s] [or np.finfo(np.float64).max for realmax]
     
-    tol_x   = 1e-5           # tolerance in x (norm 2)
-    tol_fnc = 1e-5           # tolerance in objective function
+    tol_x   = options.pop('tol_x', 1e-5)           # tolerance in x (norm 2)
+    tol_fnc = options.pop('tol_fnc', 1e-5)           # tolerance in objective function
     
     # * PSO parameters
-    inertia_w       = 0.72   # Inertia weigth
-    acceleration_c1 = 1.49   # Acceleration coefficient (cognitive)
-    acceleration_c2 = 1.49   # Acceleraton coefficient (social)
-    v_max = 2                # Maximun velocity in absolute value
-    break_coeff = 0.05       # Break factor for the worst particle
-    Red_acceleration_c1 = 2  # Reduction factor of accelaration c1 coefficient for the worst particle
+    inertia_w       = options.pop('inertia_w', 0.72)   # Inertia weigth
+    acceleration_c1 = options.pop('acceleration_c1', 1.49)   # Acceleration coefficient (cognitive)
+    acceleration_c2 = options.pop('acceleration_c2', 1.49)   # Acceleraton coefficient (social)
+    v_max = options.pop('v_max', 2)                # Maximun velocity in absolute value
+    break_coeff = options.pop('break_coeff', 0.05)       # Break factor for the worst particle
+    Red_acceleration_c1 = options.pop('Red_acceleration_c1', 2)  # Reduction factor of accelaration c1 coefficient for the worst particle
+    topology   = options.pop('topology', 'gbest')  # 'gbest', 'ring', 'von_neumann', 'random' or neighbor array
+    topology_k = options.pop('topology_k', None)   # ring radius or number of random informants
     
     
     # * Algorithm options
-    print_freq = 1
-    plotPSO    = 'on'
+    print_freq = options.pop('print_freq', 1)
+    reporters  = options.pop('reporters', None)     # progress reporters (None: console)
+    report_interval = options.pop('report_interval', 0.0)  # minimum time between reports [s]
+    plotPSO    = options.pop('plotPSO', False)  # live plot in another process (see liveplot.py)
+    engine     = options.pop('engine', None)    # 'particle', 'swarm' (synchronous) or 'async' update
+    rng        = options.pop('rng', None)       # numpy Generator or its seed
+    
+    # * Convergence history
+    history      = options.pop('history', True)      # record the metrics of every iteration
+    history_size = options.pop('history_size', 1024) # rows (initial rows in 'grow' mode)
+    history_mode = options.pop('history_mode', 'grow')  # 'grow', 'ring' or 'downsample'
+
+    # * Profiling
+    profile_callback = options.pop('profile_callback', None)  # f(phase, seconds) after every phase
+    
+    # * Evaluation backend
+    evaluator       = options.pop('evaluator', 'serial')  # 'serial', 'thread', 'process' or instance
+    n_workers       = options.pop('n_workers', None)      # workers of the thread/process pools
+    worker_init     = options.pop('worker_init', None)    # objective context of each worker
+    worker_initargs = options.pop('worker_initargs', ())
+    
+    # * Evaluation cache
+    cache_size         = options.pop('cache_size', 0)            # LRU size (0: no cache)
+    cache_quantization = options.pop('cache_quantization', None) # quantum of the continuous variables
+    
+    # * Checkpoints
+    checkpoint            = options.pop('checkpoint', None)       # .npz file with the swarm state
+    checkpoint_every      = options.pop('checkpoint_every', 1)    # iterations between checkpoints
+    checkpoint_interval   = options.pop('checkpoint_interval', 0) # minimum time between checkpoints [s]
+    checkpoint_background = options.pop('checkpoint_background', True)
+    resume                = options.pop('resume', None)           # checkpoint to continue from
+    
+    if options:
+        raise TypeError('pso_gbest() got unexpected options: {}'.format(', '.join(options)))
 # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> End inputs
             
             
@@ -71,6 +195,45 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
     lb_original = np.copy(lb) # copy of original bounds for plotting
     ub_original = np.copy(ub)
     
+    # * Evaluation backend: the objective receives Problem or the context of its worker
+    objfnc_args = () if worker_init is not None else (Problem,)
+    evaluator, close_evaluator = make_evaluator(objfnc, evaluator, n_workers, objfnc_args,
+                                                False, worker_init, worker_initargs)
+    backend = evaluator
+    
+    if cache_size:
+        evaluator = CachedEvaluator(backend, cache_size, cache_quantization)
+    
+    if engine is None:
+        engine = 'particle' if evaluator.n_workers == 1 else 'swarm'
+    
+    assert engine in ('particle', 'swarm', 'async'), "engine must be 'particle', 'swarm' or 'async'"
+    
+    # * Random streams: the swarm's and, in async mode, one per particle
+    rng = np.random.default_rng(rng)
+    particle_rngs = rng.spawn(swarm_size) if engine == 'async' else []
+    
+    # * Budget: evaluations are charged as they are done, after every particle
+    #   (serial evaluator) or with the whole swarm as Futures (parallel ones)
+    budget = Budget(maxFO, maxTime)
+    budget_submit = evaluator.submit if evaluator.n_workers > 1 else None
+    
+    # * Time of each phase of the run (simulator, update, bookkeeping ...)
+    profiler = Profiler(budget, profile_callback)
+    
+    reporters, owned_reporters = make_reporters(reporters, print_freq, report_interval)
+    
+    close_plot = plotPSO is True or plotPSO == 'on'
+    if close_plot:
+        plotPSO = LivePlot(lb_original, ub_original, swarm_size)
+    elif plotPSO in (False, None, 'off'):
+        plotPSO = None
+    
+    if history is True:
+        history = History(history_size, history_mode)
+    elif history is False:
+        history = None
+    
     
 # #  Initialization #######################################################
     
@@ -86,7 +249,7 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
 # 02. Set the initial position of the particles ---------------------------
     aux1 = (ub - lb) 
     x = np.outer(lb, np.ones(swarm_size)) + \
-        np.outer(aux1, np.ones(swarm_size))*np.random.rand(n_variables, swarm_size)
+        np.outer(aux1, np.ones(swarm_size))*rng.random((n_variables, swarm_size))
         
     # * Round intger variables     
     x[intVar,:] = np.rint(x[intVar,:])
@@ -95,15 +258,19 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
     v = np.zeros((n_variables, swarm_size))
     
 # 04. Evaluation of each particle -----------------------------------------
-# NOTE3: It is not possible to perform a vectorized version since our
-#        objective function can be a black box (e.g. process simulator) 
-    
-    start_initialization = dt.datetime.now()
-    tic_initialization   = time.time()
-    
-    fval = np.zeros((swarm_size))
-    for iParticle in range(swarm_size):
-        fval[iParticle] = objfnc(x[:,iParticle], Problem)
+# NOTE3: Our objective function is a black box (e.g. process simulator), so
+#        the particles are evaluated one by one, serially or spread across
+#        the workers of the evaluator
+    
+    if resume is None:
+        fval, n_evaluated = budget.evaluate(evaluator.evaluate, x.T, evaluator.n_workers, budget_submit)
+    else:
+        state = load_checkpoint(resume)  # swarm state of a previous run
+        assert state['x'].shape == x.shape, "Checkpoint swarm does not match swarm_size and bounds"
+        
+        x, v, fval = state['x'], state['v'], state['fval']
+        budget.restore(state['evaluations'], state['elapsed'], state['objective_time'])
+        profiler.restart()
 
 
 # 05. Best particle position and global best particle position and fitness-
@@ -114,27 +281,39 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
     gbest_ind      = np.argmin(fval)
     gbest_x        = x[:,gbest_ind]
     
-    toc_initialization =  time.time() -  tic_initialization   
-    
-    stop_initialization = dt.datetime.now()  
-    elapsed_time_initialization = (stop_initialization - start_initialization).microseconds
+    if resume is not None:
+        pbest_x, pbest_fitness = state['pbest_x'], state['pbest_fitness']
+        gbest_x, gbest_fitness = state['gbest_x'], state['gbest_fitness']
     
 # 06. Worst particle in each iteration ----------------------------------------
     
-    pworst_fitness = np.max(fval) 
-    pworst_ind     = np.argmax(fval)
-    pworst_x       = x[:,pworst_ind]
+    pworst_fitness = np.max(pbest_fitness) 
+    pworst_ind     = np.argmax(pbest_fitness)
+    pworst_x       = pbest_x[:,pworst_ind]
     
     error_x   = np.linalg.norm(pworst_x - gbest_x, ord = 2)
     error_fnc = np.linalg.norm(pworst_fitness - gbest_fitness)
     
-# 07. Print results
-    print_results(1, swarm_size, gbest_fitness, pworst_fitness,
-                  error_fnc, error_x, swarm_size, n_variables, intVar,
-                  print_freq)
-
-# 08. Plot objective function and paticles for 2D and 3D test functions
+# 07. Print results (a resumed run was reported up to its checkpoint)
+    work_diversity = diversity_work(n_variables)
+    
+    if history is not None and resume is None:
+        history.record(1, budget.evaluations, budget.elapsed(), gbest_fitness, pworst_fitness,
+                       error_fnc, error_x, diversity(x[:,:n_evaluated], work_diversity))
+    
+    profiler.switch('reporting')
+    for reporter in reporters:
+        reporter.start(swarm_size, n_variables, intVar)
+        if resume is None:
+            reporter.update(1, budget.evaluations, gbest_fitness, pworst_fitness,
+                            error_fnc, error_x)
 
+# 08. Plot the convergence and the particles (plotting process) ---------------
+    if plotPSO is not None and resume is None:
+        profiler.switch('plotting')
+        plotPSO.update(1, budget.evaluations, gbest_fitness, pworst_fitness,
+                       x[:,:n_evaluated], fval[:n_evaluated])
+    profiler.switch('bookkeeping')
 
 # #########################################################################
 # ####### Main Body of the Algorithm ### ##################################
@@ -142,83 +321,256 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
 
     # * Control parameters & Preallocation arrays
     n_iter                   = 1
-    timeLimit                = toc_initialization 
-    FO_eval                  = swarm_size
     iter_fitness_improvement = 0
     
+    # * Neighbor index array of the lbest topologies (None for gbest)
+    neighbors = make_topology(topology, swarm_size, topology_k, rng)
+    
+    if resume is not None:
+        n_iter                   = int(state['n_iter'])
+        iter_fitness_improvement = int(state['iter_fitness_improvement'])
+        set_rng_state(state, rng, *particle_rngs)
+        
+        if neighbors is not None:
+            neighbors = state['neighbors']
+    
+    if checkpoint is not None:
+        writer = CheckpointWriter(checkpoint, checkpoint_every, checkpoint_interval,
+                                  checkpoint_background)
+        
+        def swarm_state():
+            """Snapshot of everything the main loop needs to continue"""
+            state = dict(x=np.copy(x), v=np.copy(v), fval=np.copy(fval),
+                         pbest_x=np.copy(pbest_x), pbest_fitness=np.copy(pbest_fitness),
+                         gbest_x=np.copy(gbest_x), gbest_fitness=gbest_fitness,
+                         n_iter=n_iter, iter_fitness_improvement=iter_fitness_improvement,
+                         evaluations=budget.evaluations, elapsed=budget.elapsed(),
+                         objective_time=budget.objective_time)
+            if neighbors is not None:
+                state['neighbors'] = neighbors
+            if engine == 'async':  # positions whose evaluation is in flight
+                in_flight = list(pending.values())
+                state['pending_ind'] = np.array([iP for iP, _ in in_flight], dtype=int)
+                state['pending_x']   = np.array([x_iP for _, x_iP in in_flight]).reshape(-1, n_variables)
+            state.update(rng_state(rng, *particle_rngs))
+            return state
+    
     v_new  = np.copy(v)
     x_new  = np.copy(x)
-    x_plot = np.copy(x)
+    x_eval = np.copy(x)  # rounded positions evaluated in the iteration
     
+    if engine == 'async':
+        
+        def move_particle(iP):
+            """Steps 09-13 for particle iP using the latest gbest (async engine)"""
+            if n_iter > 1 and iP == pworst_ind:
+                w, c1 = break_coeff * inertia_w, acceleration_c1/Red_acceleration_c1
+            else:
+                w, c1 = inertia_w, acceleration_c1
+            
+            if neighbors is None:
+                social_x = gbest_x
+            else:  # latest personal bests of the neighbors of iP
+                social_x = pbest_x[:,neighborhood_best(pbest_fitness, neighbors[iP])]
+            
+            r1, r2 = particle_rngs[iP].random((2, n_variables))
+            
+            v[:,iP] = w * v[:,iP] + \
+                c1 * r1 * (pbest_x[:,iP] - x[:,iP]) + \
+                acceleration_c2 * r2 * (social_x - x[:,iP])
+            v[:,iP] = np.clip(v[:,iP], -v_max, v_max)
+            x[:,iP] = np.clip(x[:,iP] + v[:,iP], lb, ub)
+            
+            x_iP = np.copy(x[:,iP])
+            x_iP[intVar] = np.rint(x_iP[intVar])
+            x_eval[:,iP] = x_iP
+            return x_iP
+        
+        # * Evaluations of maxIter iterations: the last ones are not dispatched
+        #   instead of being finished after the loop
+        max_evaluations = min(maxFO, maxIter*swarm_size)
+        
+        def dispatch(iP):
+            """Moves particle iP and starts its evaluation while the budget lasts"""
+            if budget.evaluations + len(pending) < max_evaluations and not budget.out_of_time():
+                x_iP = move_particle(iP)
+                tic = time.perf_counter()
+                pending[evaluator.submit(x_iP)] = (iP, x_iP)
+                budget.charge(0, time.perf_counter() - tic)  # serial evaluators run on submit
+        
+        # * Dispatch every particle; evaluations in flight {future: (iP, x_iP)}
+        pending = {}
+        if resume is None:
+            for iP in range(swarm_size):
+                dispatch(iP)
+        else:
+            for iP, x_iP in zip(state['pending_ind'], state['pending_x']):
+                pending[evaluator.submit(x_iP)] = (iP, x_iP)
     
     
     while 1:
-        start_iter_time = time.time()
+        
+        profiler.switch('update')  # steps 09-16 (evaluations are charged to 'objective')
     
-        for iP in range(swarm_size):
+        if engine == 'async':
             
-# 09. Update velocity for all particles -----------------------------------
-            if n_iter > 1 and iP == pworst_ind:
-                v_new[:,iP] = break_coeff * inertia_w * v[:,iP] + \
-                    acceleration_c1 * np.random.rand(1,n_variables) * (pbest_x[:,iP] - x[:,iP])/Red_acceleration_c1 + \
-                    acceleration_c2 * np.random.rand(1,n_variables) * (gbest_x - x[:,iP])
+# 09-16. Process evaluations as they complete and re-dispatch the particles ---
+            n_completed = 0
+            while n_completed < swarm_size and pending:
+                tic = time.perf_counter()
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                budget.charge(0, time.perf_counter() - tic)  # waiting for the objective
+                
+                # * In dispatch order (done is a set), so runs can be reproduced
+                for future in [future for future in pending if future in done]:
+                    iP, x_iP = pending.pop(future)
+                    fval[iP] = future.result()
+                    n_completed = n_completed + 1
+                    budget.charge(1, 0.0)
+                    
+                    # * pbest and gbest with the result of particle iP
+                    if fval[iP] < pbest_fitness[iP]:
+                        pbest_fitness[iP] = fval[iP]
+                        pbest_x[:,iP]     = x_iP
+                    
+                    if pbest_fitness[iP] < gbest_fitness:
+                        gbest_fitness  = pbest_fitness[iP]
+                        gbest_x        = x_iP
+                        iter_fitness_improvement = 0
+                    else:
+                        iter_fitness_improvement = iter_fitness_improvement + 1
+                    
+                    # * Move particle iP and dispatch it again (never beyond maxFO/maxIter)
+                    dispatch(iP)
+            
+            n_evaluated = swarm_size  # latest position of every particle in x_eval
+            
+        elif engine == 'swarm':
+            
+# 09. Update velocity for all particles (synchronous, whole swarm) ------------
+            r1, r2 = rng.random((2, n_variables, swarm_size))  # whole iteration in one call
+            
+            if neighbors is None:
+                social_x = np.broadcast_to(gbest_x[:,np.newaxis], x.shape)
+            else:  # best neighbor of each particle in one gather
+                social_x = pbest_x[:,neighborhood_best(pbest_fitness, neighbors)]
+            
+            v_new = inertia_w * v + \
+                acceleration_c1 * r1 * (pbest_x - x) + \
+                acceleration_c2 * r2 * (social_x - x)
+            
+            if n_iter > 1:
+                v_new[:,pworst_ind] = break_coeff * inertia_w * v[:,pworst_ind] + \
+                    acceleration_c1 * r1[:,pworst_ind] * (pbest_x[:,pworst_ind] - x[:,pworst_ind])/Red_acceleration_c1 + \
+                    acceleration_c2 * r2[:,pworst_ind] * (social_x[:,pworst_ind] - x[:,pworst_ind])
+            
+# 10. Velocity control --------------------------------------------------------
+            np.clip(v_new, -v_max, v_max, out=v_new)
+            
+# 11. Update position for all particles ---------------------------------------
+            x_new = x + v_new
+            
+# 12. Position control --------------------------------------------------------
+            np.clip(x_new, lb[:,np.newaxis], ub[:,np.newaxis], out=x_new)
+            
+# 13. Round integer variables to the nearest integer --------------------------
+            x_eval = np.copy(x_new) # rounded positions
+            x_eval[intVar,:] = np.rint(x_eval[intVar,:])
+            
+# 14. Function evaluation of the whole swarm ----------------------------------
+            fval, n_evaluated = budget.evaluate(evaluator.evaluate, x_eval.T, evaluator.n_workers,
+                                                budget_submit)
+            
+# 15. Update personal best particle (pbest) so far ----------------------------
+            improved = fval < pbest_fitness
+            pbest_fitness[improved] = fval[improved]
+            pbest_x[:,improved]     = x_eval[:,improved]
+            
+# 16. Update global best particle (gbest) -------------------------------------
+            iP = np.argmin(pbest_fitness)
+            if pbest_fitness[iP] < gbest_fitness:
+                gbest_fitness  = pbest_fitness[iP]
+                gbest_x        = np.copy(pbest_x[:,iP])
+                iter_fitness_improvement = 0
             else:
-                v_new[:,iP] = inertia_w * v[:,iP] + \
-                    acceleration_c1 * np.random.rand(1,n_variables) * (pbest_x[:,iP] - x[:,iP]) + \
-                    acceleration_c2 * np.random.rand(1,n_variables) * (gbest_x - x[:,iP])
-            # end if
+                iter_fitness_improvement = iter_fitness_improvement + swarm_size
+            
+        else:
+            
+            if neighbors is not None:  # best neighbor of each particle
+                lbest_ind = neighborhood_best(pbest_fitness, neighbors)
+            
+            r1, r2 = rng.random((2, n_variables, swarm_size))  # whole iteration in one call
+            
+            n_evaluated = swarm_size  # unless a budget runs out
+            for iP in range(swarm_size):
+                
+                if budget.exhausted():  # stop in the middle of the iteration
+                    n_evaluated = iP
+                    break
+                
+                social_x = gbest_x if neighbors is None else pbest_x[:,lbest_ind[iP]]
+            
+# 09. Update velocity for all particles -----------------------------------
+                if n_iter > 1 and iP == pworst_ind:
+                    v_new[:,iP] = break_coeff * inertia_w * v[:,iP] + \
+                        acceleration_c1 * r1[:,iP] * (pbest_x[:,iP] - x[:,iP])/Red_acceleration_c1 + \
+                        acceleration_c2 * r2[:,iP] * (social_x - x[:,iP])
+                else:
+                    v_new[:,iP] = inertia_w * v[:,iP] + \
+                        acceleration_c1 * r1[:,iP] * (pbest_x[:,iP] - x[:,iP]) + \
+                        acceleration_c2 * r2[:,iP] * (social_x - x[:,iP])
+                # end if
             
 # 10. Velocity control --------------------------------------------------------    
-            v_new[v_new > v_max]  =  v_max
-            v_new[v_new < -v_max] = -v_max
+                v_new[v_new > v_max]  =  v_max
+                v_new[v_new < -v_max] = -v_max
             
 # 11. Update position for all particlespbes -----------------------------------
-            x_new[:,iP] = x[:,iP] + v_new[:,iP]
+                x_new[:,iP] = x[:,iP] + v_new[:,iP]
 
 # 12. Position control ----------------------------------------------------
-            # * Lower bound
-            x_new[:,iP] = (x_new[:,iP] < lb) * lb + (x_new[:,iP] >= lb) *x_new[:,iP]                   
+                # * Lower bound
+                x_new[:,iP] = (x_new[:,iP] < lb) * lb + (x_new[:,iP] >= lb) *x_new[:,iP]                   
                    
-            # * Upper bound
-            x_new[:,iP]  = (x_new[:,iP] > ub) * ub + (x_new[:,iP] <= ub)*x_new[:,iP]
+                # * Upper bound
+                x_new[:,iP]  = (x_new[:,iP] > ub) * ub + (x_new[:,iP] <= ub)*x_new[:,iP]
                 
 # 13. Round integer variables to the nearest integer ----------------------
 # NOTE4: we need an aux var for the position in order to round the integer
 #        variables keeping unalterd x_new for next iterations
-            x_iP = np.copy(x_new[:,iP])
+                x_iP = np.copy(x_new[:,iP])
             
-            x_iP[intVar] =  np.rint(x_iP[intVar])
+                x_iP[intVar] =  np.rint(x_iP[intVar])
                 
-            x_plot[:,iP] = x_iP # for plotting
+                x_eval[:,iP] = x_iP
 
 # 14. Function evaluation  ----------------------------------------------------
-            fval[iP] = objfnc(x_iP, Problem)
+                fval[iP] = budget.evaluate_one(evaluator.evaluate_one, x_iP)
             
 # 15. Update personal best particle (pbest) so far ----------------------------            
-            if fval[iP] < pbest_fitness[iP]:
-                pbest_fitness[iP] = fval[iP]
-                pbest_x[:,iP]     =  x_iP
+                if fval[iP] < pbest_fitness[iP]:
+                    pbest_fitness[iP] = fval[iP]
+                    pbest_x[:,iP]     =  x_iP
 
 # 16. Update global best particle (gbest) ---------------------------------
-            if pbest_fitness[iP] < gbest_fitness:
-                gbest_fitness  = pbest_fitness[iP]
-                gbest_x        = x_iP
-                iter_fitness_improvement = 0
-            else:
-                iter_fitness_improvement = iter_fitness_improvement + 1
-                
-            stop_iter_time = time.time() - start_iter_time
+                if pbest_fitness[iP] < gbest_fitness:
+                    gbest_fitness  = pbest_fitness[iP]
+                    gbest_x        = x_iP
+                    iter_fitness_improvement = 0
+                else:
+                    iter_fitness_improvement = iter_fitness_improvement + 1
     
 # =============================================================================
 #       end for loop in range of swarm size
 # =============================================================================
     
 # 17. Uptdate Control parameters    
+        profiler.switch('bookkeeping')
             
         n_iter = n_iter + 1
 
-        FO_eval = FO_eval + swarm_size
-        timeLimit = timeLimit + stop_iter_time
+        FO_eval = budget.evaluations
             
 # * Worst particle in each iteration
         pworst_fitness = np.max(pbest_fitness) 
@@ -228,25 +580,37 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
         error_x   = np.linalg.norm(pworst_x - gbest_x, ord = 2)
         error_fnc = np.linalg.norm(pworst_fitness - gbest_fitness)
     
-# 18. Print iteration results    
-        print_results(n_iter, FO_eval, gbest_fitness, pworst_fitness,
-                  error_fnc, error_x, swarm_size, n_variables, intVar,
-                  print_freq)
+# 18. Print iteration results (only the particles evaluated if a budget ran out)
+        x_iter, fval_iter = x_eval[:,:n_evaluated], fval[:n_evaluated]
+        
+        if history is not None:  # diversity of the evaluated positions, only for stored rows
+            history.record(n_iter, FO_eval, budget.elapsed(), gbest_fitness, pworst_fitness,
+                           error_fnc, error_x,
+                           diversity(x_iter, work_diversity) if history.keeps() else np.nan)
+        
+        profiler.switch('reporting')
+        for reporter in reporters:
+            reporter.update(n_iter, FO_eval, gbest_fitness, pworst_fitness,
+                            error_fnc, error_x)
 
 # 19. Plot Particles and Objective Function -------------------------------
+        if plotPSO is not None:
+            profiler.switch('plotting')
+            plotPSO.update(n_iter, FO_eval, gbest_fitness, pworst_fitness, x_iter, fval_iter)
 
 # 20. Check Termination Criterias -----------------------------------------
+        profiler.switch('bookkeeping')
 
         if n_iter >= maxIter:
             termination = 'Stop due to maximum number of major iterations.'
             break
-        elif FO_eval >= maxFO:
+        elif budget.out_of_evaluations():
             termination = 'Stop due to maximum number of function evaluations.'
             break
         elif iter_fitness_improvement >= maxIterNoImprov:
             termination = 'Number of generations without fitness improvement Reached. The objective function is under specified tolerance'      
             break
-        elif timeLimit >= maxTime:
+        elif budget.out_of_time():
             termination = 'The solver was interrupted because it reached the time limit.'       
             break 
 #        elif error_fnc <= tol_fnc: 
@@ -257,23 +621,74 @@ def pso_gbest(objfnc, lb, ub, intVar, *arg):
 #            break
 
     
-# 21. Position and velocity for next iteration
-        x = np.copy(x_new)
-        v = np.copy(v_new)
+# 21. Position and velocity for next iteration (updated in place by async)
+        if engine != 'async':
+            x = np.copy(x_new)
+            v = np.copy(v_new)
+        
+# 22. Checkpoint of the swarm state
+        if checkpoint is not None and writer.due(n_iter):
+            writer.save(swarm_state)
 # =============================================================================
 #   end while loop
 # =============================================================================
     
+    if engine == 'async':
+        # * Evaluations in flight: the queued ones are cancelled and the running
+        #   ones are waited for and counted, so FO_eval is the exact number of
+        #   objective evaluations
+        for future in pending:
+            future.cancel()
+        
+        for future, (iP, x_iP) in pending.items():
+            if not future.cancelled():
+                tic = time.perf_counter()
+                fval[iP] = future.result()
+                budget.charge(1, time.perf_counter() - tic)
+                if fval[iP] < pbest_fitness[iP]:
+                    pbest_fitness[iP] = fval[iP]
+                    pbest_x[:,iP]     = x_iP
+                if pbest_fitness[iP] < gbest_fitness:
+                    gbest_fitness = pbest_fitness[iP]
+                    gbest_x       = x_iP
+    
+    if checkpoint is not None:
+        writer.close()
+    
+    profiler.switch('reporting')
+    for reporter in reporters:
+        reporter.flush()
+    for reporter in owned_reporters:  # the caller's reporters stay open
+        reporter.close()
+    
+    if close_plot:
+        profiler.switch('plotting')
+        plotPSO.close()
+    profiler.switch('bookkeeping')
+    
+    if close_evaluator:
+        backend.close()
+    
     class Result:
         pass
     
     Result.best_fitness = gbest_fitness
     Result.x_best       = gbest_x
     Result.iterations   = n_iter
-    Result.FO_eval      = FO_eval
+    Result.FO_eval      = budget.evaluations
     Result.error_x      = error_x
     Result.error_fnc    = error_fnc
     Result.exit         = termination
+    Result.history      = history
+    
+    Result.profile        = profiler.stop()  # time of each phase {phase: [s]}
+    Result.time_total     = budget.elapsed()
+    Result.time_objective = budget.objective_time
+    Result.time_optimizer = Result.time_total - Result.time_objective
+    
+    if cache_size:
+        Result.cache          = evaluator.stats()  # hits, misses, hit_rate, objective_time ...
+        Result.cache_hit_rate = Result.cache['hit_rate']
     
     return Result    
 
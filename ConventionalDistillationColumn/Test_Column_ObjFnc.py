@@ -28,23 +28,21 @@ def tac_column(Problem):
     """
     
        
-    # 01 # Recover Hysys Objects from structure Problem
-    HyObject       = Problem.HyObject          # Main Aspen Hysys Objects
-    MaterialStream = HyObject.MaterialStream   # Column material streams
-    EnergyStream   = HyObject.EnergyStream     # Column energy streams
+    # 01 # Recover the simulator backend from structure Problem (see simulator.py)
+    simulator = Problem.simulator
     
-    # 02 # Import Data from Aspen Hysys Model
-    NT = HyObject.DistColumn.Main_TS.NumberOfTrays               # Column Active  Trays
+    # 02 # Import Data from the simulator model
+    NT = simulator.n_trays()                    # Column Active  Trays
     
-    TD    = MaterialStream.Distillate.Temperature.GetValue('C')  # Distillate Temperature    
-    TB    = MaterialStream.Bottoms.Temperature.GetValue('C')     # Residue Temperature
+    TD    = simulator.temperature('Distillate') # Distillate Temperature [C]
+    TB    = simulator.temperature('Bottoms')    # Residue Temperature [C]
     
-    Qcond = EnergyStream.Qcond.HeatFlow.GetValue('kW')           # Condenser duty
-    Qreb  = EnergyStream.Qreb.HeatFlow.GetValue('kW')            # Reboiler Duty
+    Qcond = simulator.duty('Qcond')             # Condenser duty [kW]
+    Qreb  = simulator.duty('Qreb')              # Reboiler Duty [kW]
     
-    # 03 # Run Aspen Hysys Script "Col_diam_V8.SCP" to update column diameter
-    #    Problem.HyObject.HyCase.Application.PlayScript(os.path.abspath('Column_Diameter.SCP'))
-    column_diameter  =  max( HyObject.HyCase.UtilityObjects.Item('Tray Sizing-1').DiameterValue)  # [m]
+    # 03 # Column diameter (Hysys: utility 'Tray Sizing-1'; the script "Col_diam_V8.SCP"
+    #    updates it, Problem.HyObject.HyCase.Application.PlayScript(os.path.abspath('Column_Diameter.SCP')))
+    column_diameter  =  simulator.diameter()    # [m]
     
     # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>><<<< User Inputs
     # # Equipment and Utility Parameter Cost ##################################
@@ -0,0 +1,138 @@
+"""
+Wall-clock and function evaluation budgets of a PSO run
+
+The budget is charged after every evaluation (or chunk of evaluations that
+are run together by the evaluator), so a run can stop in the middle of an
+iteration. Parallel evaluators get the whole swarm at once and the
+evaluations still queued when the time runs out are cancelled. Time is
+measured with a monotonic clock and split into the time spent in the
+objective function and the time spent in the optimizer.
+"""
+
+import numpy as np
+import sys
+import time
+from concurrent.futures import wait
+
+
+class Budget:
+    """Evaluation count and wall time of a run against their limits
+
+    :param max_evaluations: maximum number of objective function evaluations
+    :param max_time: time limit in seconds [s]
+    """
+
+    def __init__(self, max_evaluations=np.inf, max_time=np.inf):
+        self.max_evaluations = max_evaluations
+        self.max_time        = max_time
+        self.timed           = not (np.isinf(max_time) or max_time >= sys.float_info.max)
+
+        self.evaluations    = 0    # objective evaluations charged so far
+        self.objective_time = 0.0  # time spent in the objective function [s]
+        self.start          = time.perf_counter()
+
+    def elapsed(self):
+        """Wall time since the start of the run [s]"""
+        return time.perf_counter() - self.start
+
+    def optimizer_time(self):
+        """Wall time spent outside the objective function [s]"""
+        return self.elapsed() - self.objective_time
+
+    def remaining_evaluations(self):
+        return self.max_evaluations - self.evaluations
+
+    def out_of_evaluations(self):
+        return self.evaluations >= self.max_evaluations
+
+    def out_of_time(self):
+        return self.elapsed() >= self.max_time
+
+    def exhausted(self):
+        """True when any of the limits has been reached"""
+        return self.out_of_evaluations() or self.out_of_time()
+
+    def restore(self, evaluations, elapsed, objective_time):
+        """Continues the accounting of a previous run (resume from checkpoint)"""
+        self.evaluations    = evaluations
+        self.objective_time = objective_time
+        self.start          = time.perf_counter() - elapsed
+
+    def charge(self, n_evaluations, objective_time):
+        """Adds n_evaluations done in objective_time seconds"""
+        self.evaluations    += n_evaluations
+        self.objective_time += objective_time
+
+    def evaluate(self, evaluate, X, chunksize=1, submit=None):
+        """Evaluates the rows of X while the budget lasts
+
+        :param evaluate: function evaluating a (n_points, n_variables) array
+        :param X: positions of the particles, one per row
+        :param chunksize: rows evaluated between two checks of the time limit
+            (1 for serial evaluators). Without time limit X is evaluated in
+            one call, only truncated by max_evaluations
+        :param submit: optional function starting the evaluation of a row and
+            returning its Future (parallel evaluators). With a time limit all
+            the rows are submitted at once and the ones that did not start
+            when the time runs out are cancelled (the running ones finish)
+        :return: (fval, n_evaluated), the first n_evaluated rows of X are
+            evaluated and the rest are np.inf
+        """
+        n_points = X.shape[0]
+
+        if not self.timed:
+            chunksize = n_points
+        elif submit is not None:
+            return self._evaluate_futures(submit, X)
+
+        if n_points <= chunksize and n_points <= self.remaining_evaluations():
+            tic  = time.perf_counter()
+            fval = evaluate(X)
+            self.charge(n_points, time.perf_counter() - tic)
+            return fval, n_points
+
+        fval = np.full(n_points, np.inf)
+        n_evaluated = 0
+
+        while n_evaluated < n_points and not self.exhausted():
+            n = int(min(chunksize, n_points - n_evaluated, self.remaining_evaluations()))
+
+            tic = time.perf_counter()
+            fval[n_evaluated:n_evaluated + n] = evaluate(X[n_evaluated:n_evaluated + n])
+            self.charge(n, time.perf_counter() - tic)
+
+            n_evaluated += n
+
+        return fval, n_evaluated
+
+    def _evaluate_futures(self, submit, X):
+        """Submits the rows of X within max_evaluations and waits for them
+        until the time limit. The evaluators start the rows in order, so the
+        ones cancelled are the last rows"""
+        fval = np.full(X.shape[0], np.inf)
+        if self.exhausted():
+            return fval, 0
+
+        tic = time.perf_counter()
+        futures = [submit(x) for x in X[:int(min(X.shape[0], self.remaining_evaluations()))]]
+
+        _, not_done = wait(futures, timeout=max(self.max_time - self.elapsed(), 0.0))
+        for future in reversed(futures):  # last first, the workers take them in order
+            if future in not_done:
+                future.cancel()
+
+        n_evaluated = 0
+        for i, future in enumerate(futures):
+            if not future.cancelled():
+                fval[i] = future.result()  # the running ones are waited for
+                n_evaluated += 1
+
+        self.charge(n_evaluated, time.perf_counter() - tic)
+        return fval, n_evaluated
+
+    def evaluate_one(self, evaluate_one, x):
+        """Evaluates a single particle and charges it"""
+        tic  = time.perf_counter()
+        fval = evaluate_one(x)
+        self.charge(1, time.perf_counter() - tic)
+        return fval
@@ -0,0 +1,153 @@
+"""
+Memoizing evaluation layer for the PSO algorithm
+
+Late in a run (and always for integer variables such as the number of trays
+of a column) the swarm keeps proposing designs that have already been
+simulated. CachedEvaluator wraps any evaluator of evaluation.py and returns
+the stored fitness value of those designs instead of calling the objective.
+
+The key of a position is the position itself after the rounding of the
+integer variables. Continuous variables can be quantized (e.g. 1e-4) so
+designs closer than the quantum share the same fitness value.
+"""
+
+import numpy as np
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class CachedEvaluator:
+    """LRU cache of fitness values in front of an evaluator
+
+    :param evaluator: evaluator doing the actual evaluations (see evaluation.py)
+    :param maxsize: maximum number of stored positions (least recently used
+        positions are evicted first)
+    :param quantization: None to key on the exact position, or a float (or an
+        array with one value per variable) with the quantum of the variables
+    """
+
+    def __init__(self, evaluator, maxsize=1024, quantization=None):
+        assert maxsize > 0, "Cache size must be positive"
+
+        self.evaluator    = evaluator
+        self.n_workers    = evaluator.n_workers
+        self.maxsize      = maxsize
+        self.quantization = None if quantization is None else np.asarray(quantization, dtype=float)
+
+        self.table = OrderedDict()  # key: fitness value
+        self.in_flight = {}         # key: Future of the submitted positions being evaluated
+        self.lock  = threading.Lock()
+
+        self.hits           = 0
+        self.misses         = 0
+        self.evictions      = 0
+        self.objective_time = 0.0  # time spent evaluating the misses [s]
+
+    def keys(self, X):
+        """Returns the cache keys of the rows of X"""
+        if self.quantization is not None:
+            X = np.round(X / self.quantization)
+
+        X = np.ascontiguousarray(X, dtype=float) + 0.0  # -0.0 and 0.0 share key
+        return [row.tobytes() for row in X]
+
+    def _lookup(self, key):
+        """Returns the stored fitness of key (None if missing) updating the LRU order"""
+        with self.lock:
+            fval = self.table.get(key)
+            if fval is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.table.move_to_end(key)
+            return fval
+
+    def _store(self, key, fval):
+        with self.lock:
+            self.table[key] = fval
+            self.table.move_to_end(key)
+            while len(self.table) > self.maxsize:
+                self.table.popitem(last=False)
+                self.evictions += 1
+
+    def evaluate(self, X):
+        """Returns the fitness values of the rows of X, evaluating only the new positions"""
+        keys = self.keys(X)
+        fval = np.empty(len(keys))
+
+        missing = {}  # key: rows (repeated positions within X are evaluated once)
+        for i, key in enumerate(keys):
+            stored = self._lookup(key)
+            if stored is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                fval[i] = stored
+
+        if missing:
+            rows = [i_rows[0] for i_rows in missing.values()]
+
+            tic = time.perf_counter()
+            fval_missing = self.evaluator.evaluate(X[rows])
+            self.objective_time += time.perf_counter() - tic
+
+            for (key, i_rows), value in zip(missing.items(), fval_missing):
+                self._store(key, value)
+                fval[i_rows] = value
+
+            # repeated positions within X are hits of the first one
+            n_repeated = sum(len(i_rows) - 1 for i_rows in missing.values())
+            with self.lock:
+                self.hits   += n_repeated
+                self.misses -= n_repeated
+
+        return fval
+
+    def evaluate_one(self, x):
+        """Returns the fitness value of the 1D position x"""
+        return self.evaluate(x[np.newaxis, :])[0]
+
+    def submit(self, x):
+        """Returns a Future with the fitness value of x (already done on hits,
+        shared with the evaluation in flight of the same position)"""
+        key    = self.keys(x[np.newaxis, :])[0]
+        stored = self._lookup(key)
+
+        if stored is not None:
+            future = Future()
+            future.set_result(stored)
+            return future
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:  # a hit of the position being evaluated
+                self.hits   += 1
+                self.misses -= 1
+                return future
+
+        def store_result(done):
+            if not done.cancelled() and done.exception() is None:
+                self._store(key, done.result())
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+        future = self.evaluator.submit(x)
+        with self.lock:
+            self.in_flight[key] = future
+        future.add_done_callback(store_result)  # runs now if it is already done
+        return future
+
+    def stats(self):
+        """Returns a dict with the cache statistics"""
+        n_lookups = self.hits + self.misses
+        return {'hits':           self.hits,
+                'misses':         self.misses,
+                'hit_rate':       self.hits / n_lookups if n_lookups else 0.0,
+                'evictions':      self.evictions,
+                'size':           len(self.table),
+                'objective_time': self.objective_time}
+
+    def close(self):
+        """Releases the stored values (the wrapped evaluator is not closed)"""
+        self.table.clear()
@@ -0,0 +1,127 @@
+"""
+Checkpoints of the swarm state of a PSO run
+
+A checkpoint is a .npz file (NumPy binary arrays) with every array and
+counter the main loop needs to continue: positions, velocities, personal and
+global bests, fitness values, iteration counters, budget bookkeeping and the
+state of the random number generators (stored as a JSON string, the 128 bit
+PCG64 states do not fit in integer arrays). Files are written to a temporary
+file in the same folder and renamed over the previous checkpoint, so a crash
+in the middle of a write never leaves a broken checkpoint behind.
+
+Resuming a run (resume option of the PSO drivers) from the checkpoint of
+iteration k gives the same iterations k+1, k+2 ... as the uninterrupted run.
+"""
+
+import numpy as np
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+
+
+def save_checkpoint(path, state):
+    """Atomically writes the dict state (arrays and scalars) to path (.npz)"""
+    path   = os.path.abspath(path)
+    folder = os.path.dirname(path)
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    """Returns the state dict stored in path (0D arrays as Python scalars)"""
+    with np.load(path, allow_pickle=False) as data:
+        return {key: data[key][()] if data[key].ndim == 0 else data[key]
+                for key in data.files}
+
+
+def rng_state(*generators):
+    """State of the NumPy Generators of a run as a checkpoint entry"""
+    return {'rng_state': json.dumps([rng.bit_generator.state for rng in generators])}
+
+
+def set_rng_state(state, *generators):
+    """Restores the NumPy Generators of a run (same order as in rng_state)"""
+    for rng, rng_state in zip(generators, json.loads(str(state['rng_state']))):
+        rng.bit_generator.state = rng_state
+
+
+class CheckpointWriter:
+    """Periodic checkpoints of a run, optionally written in a background thread
+
+    :param path: checkpoint file (.npz)
+    :param every: iterations between checkpoints
+    :param interval: minimum time between checkpoints [s]
+    :param background: write the files in a background thread. Only the
+        snapshot of the state (copies of the arrays) is taken in the
+        optimizer thread; if a write is still in progress the pending
+        snapshot is replaced by the newest one
+    """
+
+    def __init__(self, path, every=1, interval=0.0, background=True):
+        self.path       = path
+        self.every      = max(int(every), 1)
+        self.interval   = interval
+        self.background = background
+
+        self.last_time = time.perf_counter()
+        self.n_written = 0
+        self.error     = None
+
+        if background:
+            self.queue  = queue.Queue(maxsize=1)
+            self.thread = threading.Thread(target=self._writer, daemon=True)
+            self.thread.start()
+
+    def due(self, iteration):
+        """True if a checkpoint must be taken at the end of iteration"""
+        return iteration % self.every == 0 and \
+            time.perf_counter() - self.last_time >= self.interval
+
+    def save(self, get_state):
+        """Takes a snapshot, get_state() -> dict, and writes it"""
+        state = get_state()
+        self.last_time = time.perf_counter()
+
+        if not self.background:
+            save_checkpoint(self.path, state)
+            self.n_written += 1
+            return
+
+        if self.error is not None:
+            raise self.error
+
+        try:
+            self.queue.get_nowait()  # drop the snapshot not yet written
+        except queue.Empty:
+            pass
+        self.queue.put(state)
+
+    def _writer(self):
+        while True:
+            state = self.queue.get()
+            if state is None:
+                return
+            try:
+                save_checkpoint(self.path, state)
+                self.n_written += 1
+            except Exception as error:
+                self.error = error
+
+    def close(self):
+        """Waits for the last snapshot to be written"""
+        if self.background and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+        if self.error is not None:
+            raise self.error
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from Test_Column_ObjFnc import tac_column
+from simulator import SimulatorError
 import time
 """
 % -------------------------------------------------------------------------
@@ -24,33 +25,29 @@ def distColumn_model(x, Problem):
     NS = x[3]  # * NS: Number of active trays in stripping  section
     
 
-    HyObject = Problem.HyObject # Recover Hysys Objects from structure Problem
+    simulator = Problem.simulator # Simulator backend (see simulator.py)
     NT     = (NR + NS) + 1  # Total number of active trays
     Feed_S = NR + 1         # Feed location
 
     # 01 Change Column Topology and Column specifications (degrees of freedom)
-    HyObject = Problem.HyObject # Recover Hysys Objects from structure Problem
         
-    # Total number of active trays
-    HyObject.DistColumn.Main_TS.NumberOfTrays = NT
-        
-    # Feed location
-    HyObject.DistColumn.Main_TS.SpecifyFeedLocation(HyObject.DistColumn.FeedMainTS, Feed_S)
+    # Total number of active trays and feed location
+    simulator.set_topology(NT, Feed_S)
     
     # Reflux Ratio
-    HyObject.DistColumn.Column.ColumnFlowsheet.Specifications.Item('Reflux Ratio').GoalValue = RR
+    simulator.set_spec('Reflux Ratio', RR)
     
     # Boilup Ratio
-    HyObject.DistColumn.Column.ColumnFlowsheet.Specifications.Item('Boilup Ratio').GoalValue = BR
+    simulator.set_spec('Boilup Ratio', BR)
 
-    # 02 Run Aspen Hysys model with new topology
-    HyObject.DistColumn.ColumnFlowsheet.Run() # Run Aspen Hysy model
-#    time.sleep(0.3)
-    
-    # 03 Check model convergence
-    RunStatus = HyObject.HyApp.ActiveDocument.Flowsheet.Operations.Item(0).ColumnFlowsheet.CfsConverged 
+    # 02 Run the simulator model with new topology
+    try:
+        simulator.run()
+        RunStatus = simulator.converged()  # 03 Check model convergence
+    except SimulatorError:  # the simulator failed, the design is penalized as not converged
+        RunStatus = False
     
-    if RunStatus == 1:
+    if RunStatus:
         
         # 04 Compute the Total Annual Cost of the Distillation Column
         ColumnCost = tac_column(Problem) # from Test_Column_ObjFnc
@@ -58,8 +55,8 @@ def distColumn_model(x, Problem):
         # 05 Check purity constraints
         Tol_dist   = 0.001   # Molar Fraction Impurites
         Bz_Bottoms = 0.001
-        Comp_frac_Tol_dist = HyObject.MaterialStream.Distillate.ComponentMolarFractionValue[1] 
-        Comp_frac_Bz_Bott  = HyObject.MaterialStream.Bottoms.ComponentMolarFractionValue[0]
+        Comp_frac_Tol_dist = simulator.molar_fractions('Distillate')[1] 
+        Comp_frac_Bz_Bott  = simulator.molar_fractions('Bottoms')[0]
 
         if   Comp_frac_Tol_dist >  Tol_dist:
             w1 = (Comp_frac_Tol_dist - Tol_dist)*1e5
@@ -0,0 +1,162 @@
+"""
+Convergence history of a PSO run
+
+History keeps one row of metrics per iteration (one value per field of
+FIELDS) in a preallocated NumPy array. record() writes the whole row with a
+single struct.pack_into into the buffer of the array, about half a
+microsecond per iteration (little more than the call itself), so the
+history can stay on in production runs. Three storage modes:
+
+    * 'grow': every iteration is kept, the arrays double their size when full
+    * 'ring': only the last size iterations are kept (fixed memory)
+    * 'downsample': at most size rows covering the whole run (fixed memory).
+      When the arrays are full every other row is dropped and from then on
+      only one of every 2, 4, 8 ... iterations is recorded
+
+The recorded metrics are available as arrays in chronological order, e.g.
+history.gbest or history.as_dict().
+"""
+
+import struct
+
+import numpy as np
+
+FIELDS = ('iteration',    # iteration number
+          'evaluations',  # objective function evaluations so far
+          'time',         # wall time since the start of the run [s]
+          'gbest',        # global best fitness
+          'pworst',       # worst personal best fitness
+          'error_fnc',    # |pworst - gbest|
+          'error_x',      # ||pworst_position - gbest_position||
+          'diversity')    # RMS distance of the particles to the swarm centroid
+
+MODES = ('grow', 'ring', 'downsample')
+
+_ROW = struct.Struct('{}d'.format(len(FIELDS)))  # one row of float64 values
+_ROW_BYTES = _ROW.size
+
+
+DIVERSITY_BLOCK = 2**14  # elements of the work buffer of diversity
+
+
+def diversity_work(n_variables):
+    """Work buffer of diversity, allocated once per run"""
+    return np.empty(max(n_variables, DIVERSITY_BLOCK))
+
+
+def diversity(x, work=None):
+    """RMS distance of the particles, x (n_variables, swarm_size), to their centroid
+
+    The deviations are squared in place in work (see diversity_work) a block
+    of particles at a time, so no temporary of the size of the swarm is made
+    """
+    n_variables, swarm_size = x.shape
+    if swarm_size == 0:
+        return np.nan
+    if work is None:
+        work = diversity_work(n_variables)
+
+    centroid = np.mean(x, axis=1, keepdims=True)
+    step = work.size // n_variables
+    block = work[:n_variables*min(step, swarm_size)].reshape(n_variables, -1)
+
+    total = 0.0
+    for start in range(0, swarm_size, step):
+        deviation = block[:, :min(step, swarm_size - start)]
+        np.subtract(x[:, start:start + step], centroid, out=deviation)
+        np.square(deviation, out=deviation)
+        total += np.sum(deviation)
+
+    return np.sqrt(total/swarm_size)
+
+
+class History:
+    """Per iteration metrics of a run
+
+    :param size: initial number of rows ('grow') or fixed number of rows
+        ('ring' and 'downsample', must be even for the latter)
+    :param mode: 'grow', 'ring' or 'downsample'
+    """
+
+    __slots__ = ('mode', 'stride', 'skip', 'n_rows', 'size', 'data', '_buffer', '_pack')
+
+    def __init__(self, size=1024, mode='grow'):
+        assert mode in MODES, "mode must be one of {}".format(', '.join(MODES))
+        assert size >= 2 and (mode != 'downsample' or size % 2 == 0), \
+            "size must be an even number of rows (at least 2)"
+
+        self.mode   = mode
+        self.stride = 1  # iterations per stored row ('downsample')
+        self.skip   = 0  # calls to record to skip before the next stored row
+        self.n_rows = 0  # rows written (in 'ring' mode also the overwritten ones)
+
+        self._pack = _ROW.pack_into  # bound once, record is called every iteration
+        self._allocate(size)
+
+    def _allocate(self, size):
+        """Row-major storage of size rows; data is its (len(FIELDS), size) view"""
+        rows = np.full((size, len(FIELDS)), np.nan)
+        if self.n_rows:
+            rows[:self.size] = self.data.T
+
+        self.size    = size
+        self.data    = rows.T
+        self._buffer = memoryview(rows.reshape(-1))  # rows written by record
+
+    def keeps(self):
+        """True if the next call to record is stored (skip costly metrics otherwise)"""
+        return self.skip == 0
+
+    def record(self, iteration, evaluations, time, gbest, pworst, error_fnc, error_x,
+               diversity=np.nan):
+        """Appends the metrics of one iteration (see FIELDS)"""
+        if self.skip:
+            self.skip -= 1
+            return
+        self.skip = self.stride - 1
+
+        i = self.n_rows
+        self.n_rows = i + 1
+        if i >= self.size:
+            i = i % self.size if self.mode == 'ring' else self._full()
+
+        self._pack(self._buffer, i*_ROW_BYTES, iteration, evaluations, time, gbest, pworst,
+                   error_fnc, error_x, diversity)
+
+    def _full(self):
+        """Makes room for a new row when the arrays are full ('grow' and
+        'downsample' modes), returns its position"""
+        size = self.size
+
+        if self.mode == 'grow':
+            self._allocate(2*size)
+            return size
+
+        # 'downsample': keep every other row
+        self.data[:, :size//2] = self.data[:, ::2]
+        self.data[:, size//2:] = np.nan
+        self.stride *= 2
+        self.skip   = self.stride - 1
+        self.n_rows = size//2 + 1
+        return size//2
+
+    def __len__(self):
+        return min(self.n_rows, self.size)
+
+    def rows(self):
+        """Recorded rows in chronological order, array (len(FIELDS), len(self))"""
+        size = self.size
+        if self.n_rows <= size:
+            return self.data[:, :self.n_rows]
+
+        start = self.n_rows % size  # oldest row of the ring
+        return np.concatenate((self.data[:, start:], self.data[:, :start]), axis=1)
+
+    def __getattr__(self, name):
+        if name in FIELDS:
+            return self.rows()[FIELDS.index(name)]
+        raise AttributeError(name)
+
+    def as_dict(self):
+        """Dict {field: array} with the recorded history"""
+        return dict(zip(FIELDS, self.rows()))
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
 import os
-import win32com.client as win32
 
 """
 
@@ -38,14 +37,17 @@ def hy_Dist_Col_Object(Problem, *varargin):
     hyFilePath = os.path.abspath(hy_filename)
     hy_beswt_solution_FilePath = os.path.abspath(hy_best_model_filename)
 
-    # 02 Initialize  Aspen Hysys application
+    # 02 Initialize  Aspen Hysys application (COM is only available on Windows)
+    import win32com.client as win32
+
     print(' # Connecting to the Aspen Hysys App ... ')
     HyApp = win32.Dispatch('HYSYS.Application')
 
-    # 03 Open Aspen Hysys File
-    #    HyCase = HyApp.SimulationCases.Open(hyFilePath)
-    
-    HyCase = HyApp.ActiveDocument
+    # 03 Open Aspen Hysys File (parallel workers open their own case)
+    if getattr(Problem, 'hy_open_case', False):
+        HyCase = HyApp.SimulationCases.Open(hyFilePath)
+    else:
+        HyCase = HyApp.ActiveDocument
 
     # 04 Aspen Hysys Environment Visible
     HyCase.Visible = hy_visible
@@ -0,0 +1,211 @@
+"""
+Live plot of a pso_gbest run rendered in a separate process
+
+Drawing a figure on the optimization thread stalls the run, so the swarm is
+published to a plotting process through a ring buffer in shared memory
+(multiprocessing.RawArray) and the optimizer never waits for it:
+
+    * every frame (iteration, evaluations, gbest, pworst, positions and
+      fitness of the particles) goes to the next of n_slots slots. The slot
+      is stamped with the number of the frame before and after it is
+      written (a sequence lock), publishing costs one copy of the swarm
+    * the plotting process always takes the newest frame and skips the older
+      ones; a frame overwritten while it was being copied is discarded. When
+      rendering is slower than the iterations, frames are dropped, the
+      optimizer is never blocked (LivePlot.dropped)
+
+The figure shows the convergence of gbest and pworst and the particles in
+parallel coordinates (every variable scaled to its bounds, colored by the
+fitness of the particle). With a non interactive backend (e.g. 'Agg' on a
+compute node) nothing is shown and the last frame can be saved to path.
+"""
+
+import multiprocessing
+import time
+
+import numpy as np
+
+HEADER = 4  # iteration, evaluations, gbest, pworst
+
+
+class LivePlot:
+    """Publishes the swarm of a run to a plotting process
+
+    :param lb, ub: bounds of the variables (scale of the parallel coordinates)
+    :param swarm_size: particles of every frame
+    :param names: names of the variables (default x0, x1 ...)
+    :param n_slots: frames of the ring buffer
+    :param interval: time between redraws of the plotting process [s]
+    :param backend: matplotlib backend of the plotting process (None: default)
+    :param path: file where the figure is saved when the plot is closed
+    """
+
+    def __init__(self, lb, ub, swarm_size, names=None, n_slots=4, interval=0.1,
+                 backend=None, path=None):
+        assert n_slots >= 2, "the ring buffer needs at least 2 slots"
+
+        lb = np.asarray(lb, dtype=float)
+        ub = np.asarray(ub, dtype=float)
+        n_variables = lb.size
+        names = list(names) if names is not None else ['x{}'.format(i) for i in range(n_variables)]
+
+        self.shape      = (n_variables, swarm_size)
+        self.n_slots    = n_slots
+        self.frame_size = HEADER + n_variables*swarm_size + swarm_size
+
+        # * Shared memory: frames, sequence number of each slot, [published, rendered]
+        self._frames    = multiprocessing.RawArray('d', n_slots*self.frame_size)
+        self._sequences = multiprocessing.RawArray('q', n_slots)
+        self._counters  = multiprocessing.RawArray('q', 2)
+
+        self.frames    = np.frombuffer(self._frames).reshape(n_slots, self.frame_size)
+        self.sequences = np.frombuffer(self._sequences, dtype=np.int64)
+        self.counters  = np.frombuffer(self._counters, dtype=np.int64)
+
+        self.stop    = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=_render, name='pso-liveplot', daemon=True,
+            args=(self._frames, self._sequences, self._counters, self.shape, lb, ub, names,
+                  interval, backend, path, self.stop))
+        self.process.start()
+
+    @property
+    def published(self):
+        """Frames published by the optimizer"""
+        return int(self.counters[0])
+
+    @property
+    def rendered(self):
+        """Frames drawn by the plotting process"""
+        return int(self.counters[1])
+
+    @property
+    def dropped(self):
+        """Frames skipped because the plotting process was behind"""
+        return self.published - self.rendered
+
+    def update(self, iteration, evaluations, gbest_fitness, pworst_fitness, x, fval):
+        """Publishes the swarm x (n_variables, n_particles) and its fitness
+        values fval; never waits for the plotting process. Particles beyond
+        n_particles (not evaluated when a budget ran out) are not drawn"""
+        sequence = self.published + 1
+        slot = sequence % self.n_slots
+        frame = self.frames[slot]
+        n = np.shape(x)[1]
+
+        self.sequences[slot] = -1  # being written
+        frame[:HEADER] = (iteration, evaluations, gbest_fitness, pworst_fitness)
+        positions = frame[HEADER:-self.shape[1]].reshape(self.shape)
+        positions[:, :n] = x
+        positions[:, n:] = np.nan
+        frame[-self.shape[1]:][:n] = fval
+        frame[-self.shape[1]:][n:] = np.nan
+        self.sequences[slot] = sequence
+
+        self.counters[0] = sequence
+
+    def close(self, timeout=5.0):
+        """Lets the plotting process draw the last frame and stops it"""
+        if self.process.pid is None or self.stop.is_set():
+            return
+
+        self.stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read(frames, sequences, sequence):
+    """Copy of frame sequence, None if it was overwritten meanwhile"""
+    slot = sequence % len(sequences)
+    if sequences[slot] != sequence:
+        return None
+    frame = frames[slot].copy()
+    return frame if sequences[slot] == sequence else None
+
+
+def _render(frames, sequences, counters, shape, lb, ub, names, interval, backend, path, stop):
+    """Main loop of the plotting process"""
+    import matplotlib
+    if backend is not None:
+        matplotlib.use(backend)
+    import matplotlib.pyplot as plt
+
+    n_variables, swarm_size = shape
+    frames    = np.frombuffer(frames).reshape(len(sequences), -1)
+    sequences = np.frombuffer(sequences, dtype=np.int64)
+    counters  = np.frombuffer(counters, dtype=np.int64)
+    parent    = multiprocessing.parent_process()
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(11, 4))
+    gui = fig.canvas.required_interactive_framework is not None
+
+    iterations, gbest, pworst = [], [], []
+    gbest_line,  = ax1.plot([], [], label='gbest')
+    pworst_line, = ax1.plot([], [], label='pworst')
+    ax1.set_xlabel('iteration')
+    ax1.set_ylabel('objective function')
+    ax1.legend()
+
+    span = np.where(ub > lb, ub - lb, 1.0)
+    lines = ax2.plot(np.arange(n_variables), np.zeros((n_variables, swarm_size)), alpha=0.6)
+    ax2.set_xticks(np.arange(n_variables))
+    ax2.set_xticklabels(names)
+    ax2.set_ylim(-0.05, 1.05)
+    ax2.set_ylabel('position (scaled to the bounds)')
+    title = fig.suptitle('')
+
+    if gui:
+        plt.show(block=False)
+
+    last = 0
+    while True:
+        stopping = stop.is_set() or (parent is not None and not parent.is_alive())
+        sequence = int(counters[0])
+
+        frame = _read(frames, sequences, sequence) if sequence != last else None
+        if frame is not None:
+            iteration, evaluations, gbest_fitness, pworst_fitness = frame[:HEADER]
+            x    = frame[HEADER:-swarm_size].reshape(shape)
+            fval = frame[-swarm_size:]
+
+            iterations.append(iteration)
+            gbest.append(gbest_fitness)
+            pworst.append(pworst_fitness)
+            gbest_line.set_data(iterations, gbest)
+            pworst_line.set_data(iterations, pworst)
+            ax1.relim()
+            ax1.autoscale_view()
+
+            finite = np.isfinite(fval)
+            lo, up = (fval[finite].min(), fval[finite].max()) if finite.any() else (0.0, 1.0)
+            colors = plt.cm.viridis((np.where(finite, fval, up) - lo) / (up - lo or 1.0))
+            for line, column, color in zip(lines, ((x - lb[:, np.newaxis]) / span[:, np.newaxis]).T,
+                                           colors):
+                line.set_ydata(column)
+                line.set_color(color)
+
+            title.set_text('iteration {:.0f}   evaluations {:.0f}   gbest {:.6g}'.format(
+                iteration, evaluations, gbest_fitness))
+            counters[1] += 1
+            last = sequence  # a torn frame is retried with the newest one
+
+        if stopping and last == int(counters[0]):
+            break
+
+        if gui and plt.fignum_exists(fig.number):
+            fig.canvas.draw_idle()
+            fig.canvas.start_event_loop(interval)
+        else:
+            time.sleep(interval)
+
+    if path is not None:
+        fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
@@ -82,6 +82,29 @@ IntVars = [2, 3]
 # # 05 Aspen Hysys Graphical User Interface Visible
 hy_visible = 1  # [1 ==> Visible    0 ==> No Visible]
 
+# # 06 Parallel evaluation of the particles
+evaluator = 'serial'  # ['serial', 'thread', 'process' or 'pool' ==> one Hysys case per worker]
+n_workers = 4         # number of workers of the thread/process pools (cases of the simulator pool)
+pool_max_uses = 100   # evaluations of a case of the simulator pool before it is opened again
+
+# # 07 Cache of simulated designs
+cache_size         = 0     # designs kept (0 ==> every particle is simulated)
+cache_quantization = None  # quantum of RR and BR (None ==> exact match after rounding NR, NS)
+
+# # 08 Checkpoints of the swarm (continue a run after a crash of Hysys)
+checkpoint = None  # file saved every iteration, e.g. 'pso_column_checkpoint.npz' (None ==> no checkpoints)
+resume     = None  # checkpoint file to continue from
+
+# # 09 Seed of the random numbers
+seed = None  # integer to reproduce a run (None ==> different run every time)
+
+# # 10 Live plot of the convergence and of the particles
+plotPSO = False  # drawn by a separate process, never slows down the optimization
+
+# # 11 Simulator backend
+backend         = 'hysys'  # ['hysys' ==> Aspen Hysys (Windows)   'standin' ==> local shortcut model]
+backend_options = dict(latency=0.0, failure_rate=0.0)  # stand-in: time per run [s] and crash probability
+
 
 # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>><<<<<<<<< END
 
@@ -96,10 +119,29 @@ Problem.lb                     = lb
 Problem.ub                     = ub  
 Problem.IntVars                = IntVars
 Problem.hy_visible             = hy_visible
+Problem.evaluator              = evaluator
+Problem.n_workers              = n_workers
+Problem.pool_max_uses          = pool_max_uses
+Problem.cache_size             = cache_size
+Problem.cache_quantization     = cache_quantization
+Problem.checkpoint             = checkpoint
+Problem.resume                 = resume
+Problem.seed                   = seed
+Problem.plotPSO                = plotPSO
+Problem.backend                = backend
+Problem.backend_options        = backend_options
 
 
 # # Run PSO ###############################################################
-Result = distCol_optimization(Problem) # from pso_column
-print('Obj_fnc = ', Result.best_fitness)
-print('x_best  = ', Result.x_best)
-#---------------------------------------------------------------------- end
\ No newline at end of file
+# (guarded: the 'process' and 'pool' evaluators and the live plot start processes
+#  that import this script again on Windows)
+if __name__ == '__main__':
+    Result = distCol_optimization(Problem) # from pso_column
+    print('Obj_fnc = ', Result.best_fitness)
+    print('x_best  = ', Result.x_best)
+    for phase, seconds in Result.profile.items():  # simulator ('objective') vs Python side
+        print('{:<12} {:10.2f} s'.format(phase, seconds))
+    if hasattr(Result, 'pool'):  # simulator pool: how busy the cases were
+        print('Simulator pool: utilization {utilization:.0%}, {evaluations} evaluations, '
+              '{recycles} recycles, {failures} failures, {restarts} restarts'.format(**Result.pool))
+    #---------------------------------------------------------------------- end
\ No newline at end of file
@@ -1,5 +1,29 @@
 import numpy as np
 
+
+def print_header(swarm_size, n_variables, intVar):
+    """Prints the description of the run (before the first iteration)"""
+    print(' \n')
+    print('# STANDARD PARTICLE SWARM OPTIMIZATION ALGORITHM - gbest version ### \n')
+    print('     * Swarm size ................. {}'.format(swarm_size))
+    print('     * # continuous variables ..... {}'.format(n_variables - np.size(intVar)))
+    print('     * # integer variables .......  {}'.format(np.size(intVar)))
+    print(' \n')
+
+
+def print_table_header():
+    """Prints the header of the table of iterations"""
+    print('  --------------------------------------------------------------------------------------------\n')
+    print('   Iteration \t FO_evals \t gBest Fitness \t pWorst Fitness\t   error_FO \t error_x\n')
+    print('  --------------------------------------------------------------------------------------------\n')
+
+
+def print_row(iter, FO_evaluations, gbest, pworst, error_fnc, error_x):
+    """Prints the row of one iteration"""
+    print('{:8.0f} \t {:5.0f} \t {:15.3e} \t {:11.3e} \t {:11.3e} \t {:6.3e}'.format(
+    iter, FO_evaluations, gbest, pworst, error_fnc, error_x))
+
+
 def  print_results(iter, FO_evaluations, gbest, pworst,
                         error_fnc, error_x, swarm_size, n_variables,
                         intVar, print_freq):
@@ -18,26 +42,12 @@ def  print_results(iter, FO_evaluations, gbest, pworst,
     :param print_freq: frequency with the number of iterations that prints
     :return:
     """
-    intVar = np.array(intVar)
-
     if iter == 1:
-        print(' \n')
-        print('# STANDARD PARTICLE SWARM OPTIMIZATION ALGORITHM - gbest version ### \n')
-        print('     * Swarm size ................. {}'.format(swarm_size))
-        print('     * # continuous variables ..... {}'.format(n_variables - np.size(intVar)))
-        print('     * # integer variables .......  {}'.format(np.size(intVar)))
-        print(' \n')
-
-
-    if (iter == 1) or (iter/(print_freq) == round(iter/print_freq)):
-        if (iter == 1) or (iter/(print_freq*20) == round(iter/(print_freq))):
-            print('  --------------------------------------------------------------------------------------------\n')
-            print('   Iteration \t FO_evals \t gBest Fitness \t pWorst Fitness\t   error_FO \t error_x\n')
-            print('  --------------------------------------------------------------------------------------------\n')
-
-
-        print('{:8.0f} \t {:5.0f} \t {:15.3e} \t {:11.3e} \t {:11.3e} \t {:6.3e}'.format(
-        iter, FO_evaluations, gbest, pworst, error_fnc, error_x))
-
+        print_header(swarm_size, n_variables, intVar)
 
+    if (iter == 1) or (iter % print_freq == 0):
+        # * Table header every 20 printed rows
+        if (iter == 1) or (iter % (print_freq*20) == 0):
+            print_table_header()
 
+        print_row(iter, FO_evaluations, gbest, pworst, error_fnc, error_x)
@@ -2,7 +2,8 @@
 import time
 
 
-from hyInterface      import hy_Dist_Col_Object
+from simulator        import make_simulator
+from simulator_pool   import SimulatorPool
 from PSO_Algorithm    import pso_gbest
 from column_algorithm import distColumn_model
 
@@ -19,27 +20,93 @@ from column_algorithm import distColumn_model
 
 """
 
+def column_worker_context(settings):
+    """Problem structure with its own simulator (Aspen Hysys case) for a parallel worker
+
+    settings: dict with the picklable attributes of Problem (file names, backend ...)
+    """
+    class WorkerProblem:
+        pass
+
+    for name, value in settings.items():
+        setattr(WorkerProblem, name, value)
+
+    WorkerProblem.hy_open_case = True  # each worker simulates its own copy of the case
+    WorkerProblem.simulator    = make_simulator(WorkerProblem)  # from simulator
+
+    return WorkerProblem
+
+
 def distCol_optimization(Problem):
 
 
-    # 01 Interface between Aspen Hysys and Matlab
-    HyObject = hy_Dist_Col_Object(Problem)  # from hiInterface
-    
-    Problem.HyObject = HyObject
+    # * Evaluation backend: 'serial' uses the case opened below, parallel
+    #   evaluators and the simulator pool open one case per worker
+    evaluator = getattr(Problem, 'evaluator', 'serial')
+    n_workers = getattr(Problem, 'n_workers', None)
+
+    # 01 Interface with the simulator (Aspen Hysys or its stand-in, see simulator.py)
+    if evaluator == 'serial':
+        Problem.simulator = make_simulator(Problem)
+        
+        if hasattr(Problem.simulator, 'HyObject'):
+            Problem.HyObject = Problem.simulator.HyObject  # Aspen Hysys objects
 
     # 02 Run Optimization model
     lb      = Problem.lb    
     ub      = Problem.ub
     IntVars = Problem.IntVars
     
+    # * Cache of simulated designs (repeated designs are not simulated again)
+    options = dict(cache_size=getattr(Problem, 'cache_size', 0),
+                   cache_quantization=getattr(Problem, 'cache_quantization', None))
+    
+    # * Checkpoints of the swarm state
+    options.update(checkpoint=getattr(Problem, 'checkpoint', None),
+                   resume=getattr(Problem, 'resume', None))
+    
+    # * Seed of the random numbers (same seed ==> same run)
+    options.update(rng=getattr(Problem, 'seed', None))
+    
+    # * Live plot of the run (drawn in a separate process)
+    options.update(plotPSO=getattr(Problem, 'plotPSO', False))
+    
+    settings = {'hy_filename':            Problem.hy_filename,
+                'hy_best_model_filename': Problem.hy_best_model_filename,
+                'hy_visible':             Problem.hy_visible,
+                'backend':                getattr(Problem, 'backend', 'hysys'),
+                'backend_options':        getattr(Problem, 'backend_options', {})}
+    
+    # * Pool of simulator instances leased to the particles (reused across
+    #   iterations, recycled after pool_max_uses evaluations or a failure)
+    close_pool = evaluator == 'pool'
+    if close_pool:
+        evaluator = SimulatorPool(distColumn_model, column_worker_context, (settings,), n_workers,
+                                  max_uses=getattr(Problem, 'pool_max_uses', 100),
+                                  retries=getattr(Problem, 'pool_retries', 1),
+                                  timeout=getattr(Problem, 'pool_timeout', None))
+    
+    if isinstance(evaluator, SimulatorPool):  # also a pool kept by the caller across runs
+        options.update(evaluator=evaluator)
+    elif evaluator != 'serial':
+        options.update(evaluator=evaluator, n_workers=n_workers,
+                       worker_init=column_worker_context, worker_initargs=(settings,))
+    
     t_start   = time.time()
    
-    Result = pso_gbest(distColumn_model, lb, ub, IntVars, Problem )             # #### PSO ####
+    try:
+        Result = pso_gbest(distColumn_model, lb, ub, IntVars, Problem, **options)         # #### PSO ####
+    finally:
+        if close_pool:
+            evaluator.close()
    
     t_stop = time.time() - t_start
 
     # 03 Print Results
     Result.etime = t_stop
+    
+    if isinstance(evaluator, SimulatorPool):
+        Result.pool = evaluator.stats()  # utilization, recycles, failures ... of the instances
 
     # printResult_cdc(Result, Problem)
     return(Result)
\ No newline at end of file
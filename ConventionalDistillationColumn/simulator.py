@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+"""
+Simulator backends of the distillation column model
+
+distColumn_model and tac_column talk to the process simulator through a
+backend (Problem.simulator) with the interface of Simulator:
+
+    set_topology(n_trays, feed_stage)  active trays of the Main TS and feed tray
+    set_spec(name, value)              goal value of a column specification
+                                       ('Reflux Ratio', 'Boilup Ratio')
+    run()                              solves the column, raises SimulatorError
+                                       when the simulator itself fails
+    converged()                        True if the last run converged
+    n_trays()                          active trays of the column
+    temperature(stream)                [C] of a material stream ('Distillate', 'Bottoms')
+    molar_fractions(stream)            component molar fractions of a material stream
+    duty(stream)                       [kW] of an energy stream ('Qcond', 'Qreb')
+    diameter()                         column diameter [m] (tray sizing)
+    close()                            releases the simulator
+
+Backends:
+
+    * HysysSimulator ('hysys'): Aspen Hysys through COM (Windows). win32com
+      is only imported when the backend is created
+    * StandInSimulator ('standin'): pure-Python shortcut model of the
+      benzene/toluene column (McCabe-Thiele stage by stage, constant molar
+      overflow) with configurable start-up time, latency per run and failure
+      rate, to run, test and load-test the optimizer, the parallel
+      evaluators and the cache on machines without Hysys
+
+make_simulator(Problem) creates the backend named by Problem.backend.
+"""
+
+import time
+
+import numpy as np
+
+
+class SimulatorError(Exception):
+    """The simulator failed (crashed, lost connection ...), as opposed to a
+    column that did not converge"""
+
+
+class Simulator:
+    """Interface of the simulator backends (see the module docstring)
+
+    Backends implement _run() and the methods raising NotImplementedError.
+    run() counts the failures of the backend (failures attribute) and turns
+    any exception of _run() into a SimulatorError.
+    """
+
+    failures = 0  # runs that raised SimulatorError
+    runs     = 0  # calls to run
+
+    def set_topology(self, n_trays, feed_stage):
+        raise NotImplementedError
+
+    def set_spec(self, name, value):
+        raise NotImplementedError
+
+    def run(self):
+        """Solves the column with the current topology and specifications"""
+        self.runs += 1
+        try:
+            self._run()
+        except SimulatorError:
+            self.failures += 1
+            raise
+        except Exception as error:
+            self.failures += 1
+            raise SimulatorError('{} failed: {}'.format(type(self).__name__, error)) from error
+
+    def _run(self):
+        raise NotImplementedError
+
+    def converged(self):
+        raise NotImplementedError
+
+    def n_trays(self):
+        raise NotImplementedError
+
+    def temperature(self, stream):
+        raise NotImplementedError
+
+    def molar_fractions(self, stream):
+        raise NotImplementedError
+
+    def duty(self, stream):
+        raise NotImplementedError
+
+    def diameter(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# # Aspen Hysys ###########################################################
+
+class HysysSimulator(Simulator):
+    """Aspen Hysys case through COM (see hyInterface.py)
+
+    Problem: structure with hy_filename, hy_best_model_filename, hy_visible
+        and hy_open_case (True to open a new copy of the case, used by the
+        parallel workers, instead of the active document)
+    """
+
+    def __init__(self, Problem):
+        import pythoncom
+        from hyInterface import hy_Dist_Col_Object
+
+        pythoncom.CoInitialize()  # COM must be initialized in every worker thread
+
+        self.open_case = getattr(Problem, 'hy_open_case', False)
+        self.HyObject  = hy_Dist_Col_Object(Problem)  # from hiInterface
+
+    def set_topology(self, n_trays, feed_stage):
+        DistColumn = self.HyObject.DistColumn
+        DistColumn.Main_TS.NumberOfTrays = n_trays
+        DistColumn.Main_TS.SpecifyFeedLocation(DistColumn.FeedMainTS, feed_stage)
+
+    def set_spec(self, name, value):
+        self.HyObject.DistColumn.ColumnFlowsheet.Specifications.Item(name).GoalValue = value
+
+    def _run(self):
+        self.HyObject.DistColumn.ColumnFlowsheet.Run()
+
+    def converged(self):
+        return self.HyObject.DistColumn.ColumnFlowsheet.CfsConverged == 1
+
+    def n_trays(self):
+        return self.HyObject.DistColumn.Main_TS.NumberOfTrays
+
+    def temperature(self, stream):
+        return getattr(self.HyObject.MaterialStream, stream).Temperature.GetValue('C')
+
+    def molar_fractions(self, stream):
+        return getattr(self.HyObject.MaterialStream, stream).ComponentMolarFractionValue
+
+    def duty(self, stream):
+        return getattr(self.HyObject.EnergyStream, stream).HeatFlow.GetValue('kW')
+
+    def diameter(self):
+        return max(self.HyObject.HyCase.UtilityObjects.Item('Tray Sizing-1').DiameterValue)
+
+    def close(self):
+        if self.open_case:  # copies opened for this backend only
+            self.HyObject.HyCase.Close()
+
+
+# # Stand-in model ########################################################
+
+# Antoine constants of benzene and toluene, log10(P [mmHg]) = A - B/(C + T [C])
+ANTOINE = np.array([[6.90565, 1211.033, 220.790],
+                    [6.95464, 1344.800, 219.482]])
+
+
+class StandInSimulator(Simulator):
+    """Shortcut model of a benzene/toluene column standing in for Hysys
+
+    Saturated liquid feed, constant relative volatility and constant molar
+    overflow. Given the trays, feed tray, reflux ratio (RR) and boilup ratio
+    (BR), the distillate flow follows from the balances, D = BR F/(RR + 1 + BR),
+    and the distillate purity is found by bisection so that the stage by
+    stage calculation from the total condenser down to the reboiler meets
+    the bottoms composition of the mass balance. The column does not converge
+    when no such composition exists.
+
+    :param feed_flow: [kmol/h]
+    :param feed_benzene: molar fraction of benzene in the feed
+    :param alpha: relative volatility benzene/toluene
+    :param latency: time of every run [s], a number or a (min, max) range
+    :param failure_rate: probability that a run raises SimulatorError
+    :param startup: time to create the backend [s] (opening a case)
+    :param seed: seed of the random latencies and failures
+    """
+
+    LATENT_HEAT = 32000.0  # [kJ/kmol]
+    VELOCITY    = 1.0      # allowable vapor velocity [m/s]
+
+    def __init__(self, feed_flow=100.0, feed_benzene=0.4, alpha=2.5, pressure=760.0,
+                 latency=0.0, failure_rate=0.0, startup=0.0, seed=None):
+        self.feed_flow    = feed_flow
+        self.feed_benzene = feed_benzene
+        self.alpha        = alpha
+        self.pressure     = pressure  # [mmHg]
+        self.latency      = latency
+        self.failure_rate = failure_rate
+        self.rng          = np.random.default_rng(seed)
+
+        self.trays, self.feed_stage = 20, 11
+        self.specs  = {'Reflux Ratio': 1.5, 'Boilup Ratio': 1.5}
+        self.result = None  # streams of the last converged run
+
+        time.sleep(startup)
+
+    def set_topology(self, n_trays, feed_stage):
+        assert 1 <= feed_stage <= n_trays, "feed stage must be one of the trays"
+        self.trays, self.feed_stage = int(round(n_trays)), int(round(feed_stage))
+
+    def set_spec(self, name, value):
+        assert name in self.specs, "unknown specification {}".format(name)
+        self.specs[name] = float(value)
+
+    def _run(self):
+        latency = self.latency
+        if np.ndim(latency):
+            latency = self.rng.uniform(*latency)
+        time.sleep(latency)
+
+        self.result = None
+        if self.rng.random() < self.failure_rate:
+            raise SimulatorError('stand-in simulator crashed (failure_rate={})'.format(self.failure_rate))
+
+        self.result = self._solve()
+
+    def _solve(self):
+        """Streams of the column, None if it does not converge"""
+        F, zF, alpha = self.feed_flow, self.feed_benzene, self.alpha
+        RR, BR = self.specs['Reflux Ratio'], self.specs['Boilup Ratio']
+        if RR <= 0 or BR <= 0:
+            return None
+
+        D = BR*F/(RR + 1 + BR)
+        B = F - D
+        L, V = RR*D, (RR + 1)*D  # rectifying section
+        Ls   = L + F             # stripping section (same vapor flow)
+
+        def residual(xD):
+            """Reboiler liquid minus the bottoms composition of the balance"""
+            xB = (F*zF - D*xD)/B
+            y = xD  # total condenser
+            for stage in range(1, self.trays + 2):  # trays and reboiler
+                x = y/(alpha - (alpha - 1)*y)
+                if stage == self.trays + 1:
+                    return x - xB
+                y = (L*x + D*xD)/V if stage < self.feed_stage else (Ls*x - B*xB)/V
+                y = min(max(y, 0.0), 1.0)
+
+        lo, hi = max(0.0, (F*zF - B)/D), min(1.0, F*zF/D)
+        f_lo, f_hi = residual(lo), residual(hi)
+        if f_lo*f_hi > 0:
+            return None
+
+        for _ in range(60):
+            xD = 0.5*(lo + hi)
+            f = residual(xD)
+            if f*f_lo > 0:
+                lo, f_lo = xD, f
+            else:
+                hi = xD
+        xD = 0.5*(lo + hi)
+        xB = (F*zF - D*xD)/B
+
+        T_D, T_B = self._bubble_point(xD), self._bubble_point(xB)
+        Q = V*self.LATENT_HEAT/3600  # [kW], condenser and reboiler
+
+        # * Diameter for the largest volumetric vapor flow (ideal gas)
+        vapor = V*22.414/3600*(max(T_D, T_B) + 273.15)/273.15*760/self.pressure  # [m3/s]
+        diameter = np.sqrt(4*vapor/(np.pi*self.VELOCITY))
+
+        return {'Distillate': (T_D, (xD, 1 - xD)),
+                'Bottoms':    (T_B, (xB, 1 - xB)),
+                'Qcond': Q, 'Qreb': Q, 'diameter': diameter}
+
+    def _bubble_point(self, x_benzene):
+        """Bubble temperature [C] of a benzene/toluene liquid"""
+        x = np.array([x_benzene, 1 - x_benzene])
+        lo, hi = 0.0, 200.0
+        for _ in range(50):
+            T = 0.5*(lo + hi)
+            P = np.sum(x*10**(ANTOINE[:, 0] - ANTOINE[:, 1]/(ANTOINE[:, 2] + T)))
+            lo, hi = (T, hi) if P < self.pressure else (lo, T)
+        return 0.5*(lo + hi)
+
+    def converged(self):
+        return self.result is not None
+
+    def n_trays(self):
+        return self.trays
+
+    def temperature(self, stream):
+        return self.result[stream][0]
+
+    def molar_fractions(self, stream):
+        return self.result[stream][1]
+
+    def duty(self, stream):
+        return self.result[stream]
+
+    def diameter(self):
+        return self.result['diameter']
+
+
+SIMULATORS = {'hysys':   HysysSimulator,
+              'standin': StandInSimulator}
+
+
+def make_simulator(Problem):
+    """Returns the simulator backend of Problem
+
+    Problem.backend: 'hysys' (default), 'standin' or a function
+        backend(Problem) returning a Simulator. Problem.backend_options are
+        the keyword arguments of StandInSimulator
+    """
+    backend = getattr(Problem, 'backend', 'hysys')
+
+    if callable(backend):
+        return backend(Problem)
+
+    assert backend in SIMULATORS, "backend must be one of {}".format(', '.join(SIMULATORS))
+
+    if backend == 'hysys':
+        return HysysSimulator(Problem)
+
+    return SIMULATORS[backend](**getattr(Problem, 'backend_options', {}))
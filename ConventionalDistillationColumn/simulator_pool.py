@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pool of simulator instances for concurrent evaluations of the particles
+
+Opening a simulation case is expensive, so SimulatorPool keeps n_workers
+instances alive, each one in its own worker process with its own objective
+context (e.g. column_worker_context of pso_column.py: a Problem structure
+with its own simulator backend and Hysys case, see simulator.py):
+
+    * every evaluation leases an idle instance: a thread of the pool per
+      instance takes the next particle of the queue, sends it to its
+      process, where objfnc(x, context) runs, and sets the result of the
+      Future of the evaluation
+    * an instance is recycled (closed and opened again in its process) after
+      max_uses evaluations or when it fails: the objective raised or the
+      simulator counted a failure (Simulator.failures, SimulatorError). A
+      process that dies or hangs (timeout) is restarted. The evaluations
+      that failed are retried on a fresh instance up to retries times
+    * stats() reports the utilization of the instances (busy time over wall
+      time), the evaluations, failures, recycles, restarts, start-up time
+      and the time the evaluations waited for an instance
+
+The pool is an evaluator (evaluate, evaluate_one, submit, n_workers and
+close, see evaluation.py), so it is passed to pso_gbest as its evaluator
+option and can be kept across runs. Any backend works: the initializer
+returns the context of a worker, its simulator being context.simulator or
+the context itself.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from simulator import SimulatorError
+
+
+def _simulator(context):
+    """Simulator backend of a worker context (Problem structure or backend)"""
+    return getattr(context, 'simulator', context)
+
+
+def _close(context):
+    try:
+        getattr(_simulator(context), 'close', lambda: None)()
+    except Exception:  # a failed instance may not close cleanly
+        pass
+
+
+def _send(conn, message):
+    """Sends message, exceptions that cannot be pickled as SimulatorError"""
+    try:
+        conn.send(message)
+    except Exception:
+        value, error, *rest = message
+        conn.send((value, SimulatorError(repr(error)), *rest))
+
+
+def _worker(conn, objfnc, initializer, initargs, max_uses):
+    """Main loop of a worker process: one instance, recycled after max_uses
+    evaluations or a failure"""
+    while True:
+        tic = time.perf_counter()
+        try:
+            context = initializer(*initargs)
+        except Exception as error:
+            _send(conn, (None, error, 'error'))
+            return
+        conn.send((time.perf_counter() - tic, None, 'ready'))
+
+        for uses in range(1, max_uses + 1):
+            x = conn.recv()
+            if x is None:
+                _close(context)
+                return
+
+            failures = getattr(_simulator(context), 'failures', 0)
+            try:
+                value, error = objfnc(x, context), None
+            except Exception as exception:
+                value, error = None, exception
+
+            failed  = error is not None or getattr(_simulator(context), 'failures', 0) > failures
+            recycle = failed or uses == max_uses
+            _send(conn, (value, error, failed, recycle))
+
+            if recycle:
+                break
+
+        _close(context)
+
+
+class _Instance:
+    """Worker process of the pool and its counters"""
+
+    def __init__(self, index):
+        self.index       = index
+        self.process     = None
+        self.conn        = None
+        self.starting    = False  # a new instance is being opened in the process
+        self.evaluations = 0
+        self.failures    = 0
+        self.recycles    = 0
+        self.restarts    = 0
+        self.busy        = 0.0    # time evaluating [s]
+        self.startup     = 0.0    # time opening instances [s]
+
+    def stats(self):
+        return {'evaluations': self.evaluations, 'failures': self.failures,
+                'recycles': self.recycles, 'restarts': self.restarts,
+                'busy_time': self.busy, 'startup_time': self.startup}
+
+
+class SimulatorPool:
+    """n_workers simulator instances in worker processes, leased to evaluations
+
+    :param objfnc: objective function objfnc(x, context)
+    :param initializer: function returning the context of a worker (opens
+        the simulator), initializer(*initargs); module level functions, they
+        are sent to the worker processes
+    :param n_workers: instances (None: number of processors)
+    :param max_uses: evaluations of an instance before it is recycled
+    :param retries: new attempts of an evaluation on a fresh instance after
+        a failure (the last value or exception is returned)
+    :param timeout: time an evaluation may take before its process is
+        restarted [s] (None: no limit)
+    """
+
+    def __init__(self, objfnc, initializer, initargs=(), n_workers=None, max_uses=100,
+                 retries=1, timeout=None):
+        assert max_uses >= 1, "max_uses must be at least 1"
+
+        self.objfnc      = objfnc
+        self.initializer = initializer
+        self.initargs    = tuple(initargs)
+        self.n_workers   = n_workers or os.cpu_count() or 1
+        self.max_uses    = max_uses
+        self.retries     = retries
+        self.timeout     = timeout
+
+        self.tasks     = queue.Queue()  # (future, x, time queued)
+        self.wait      = 0.0            # time the evaluations waited for an instance [s]
+        self.lock      = threading.Lock()  # wait is updated by the threads of every instance
+        self.t_start   = time.perf_counter()
+        self.instances = [_Instance(i) for i in range(self.n_workers)]
+        self.threads   = [threading.Thread(target=self._serve, args=(instance,), daemon=True,
+                                           name='simulator-pool-{}'.format(instance.index))
+                          for instance in self.instances]
+        for thread in self.threads:
+            thread.start()
+
+    # Worker processes ########################################################
+
+    def _start(self, instance):
+        """Starts the process of instance (its instance is opened in the background)"""
+        if instance.process is not None:
+            instance.restarts += 1
+
+        conn, child_conn = multiprocessing.Pipe()
+        instance.process = multiprocessing.Process(
+            target=_worker, daemon=True, name='simulator-{}'.format(instance.index),
+            args=(child_conn, self.objfnc, self.initializer, self.initargs, self.max_uses))
+        instance.process.start()
+        child_conn.close()  # recv raises EOFError if the process dies
+        instance.conn, instance.starting = conn, True
+
+    def _kill(self, instance):
+        instance.process.kill()
+        instance.process.join()
+        instance.conn.close()
+        instance.conn = None
+
+    def _receive(self, instance, timeout):
+        """Next message of the process of instance, SimulatorError if it
+        dies or does not answer within timeout"""
+        try:
+            if timeout is not None and not instance.conn.poll(timeout):
+                raise SimulatorError('simulator {} did not answer in {} s'.format(instance.index, timeout))
+            return instance.conn.recv()
+        except (EOFError, OSError) as error:
+            self._kill(instance)
+            raise SimulatorError('simulator {} died'.format(instance.index)) from error
+        except SimulatorError:
+            self._kill(instance)
+            raise
+
+    def _ready(self, instance):
+        """Waits until the instance of the process is open"""
+        if instance.conn is None:
+            self._start(instance)
+
+        if instance.starting:
+            seconds, error, status = self._receive(instance, None)
+            instance.starting = False
+            if status == 'error':
+                self._kill(instance)
+                raise SimulatorError('simulator {} could not start: {}'.format(instance.index, error)) \
+                    from error
+            instance.startup += seconds
+
+    def _evaluate(self, instance, x):
+        """(value, error, failed) of x on instance"""
+        self._ready(instance)
+
+        tic = time.perf_counter()
+        try:
+            try:
+                instance.conn.send(x)
+            except OSError as error:
+                self._kill(instance)
+                raise SimulatorError('simulator {} died'.format(instance.index)) from error
+            value, error, failed, recycle = self._receive(instance, self.timeout)
+        except SimulatorError as exception:  # the process died or hung (restarted next time)
+            value, error, failed, recycle = None, exception, True, False
+        instance.busy += time.perf_counter() - tic
+        instance.evaluations += 1
+
+        if failed:
+            instance.failures += 1
+        if recycle:  # the process opens a new instance meanwhile
+            instance.recycles += 1
+            instance.starting = True
+
+        return value, error, failed
+
+    def _serve(self, instance):
+        """Thread of an instance: leases it to the queued evaluations"""
+        try:
+            self._ready(instance)  # every instance opens at once
+        except SimulatorError:
+            pass  # started again by the next evaluation
+
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            future, x, queued = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self.lock:
+                self.wait += time.perf_counter() - queued
+
+            for attempt in range(self.retries + 1):
+                try:
+                    value, error, failed = self._evaluate(instance, x)
+                except SimulatorError as exception:  # could not (re)start the instance
+                    value, error, failed = None, exception, True
+                if not failed:
+                    break
+
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
+
+        if instance.conn is not None:
+            try:
+                instance.conn.send(None)
+                instance.process.join(5)
+            except OSError:
+                pass
+            if instance.process.is_alive():
+                self._kill(instance)
+
+    # Evaluator interface (see evaluation.py) ##################################
+
+    def submit(self, x):
+        """Queues the evaluation of the 1D position x and returns its Future"""
+        future = Future()
+        self.tasks.put((future, np.array(x), time.perf_counter()))
+        return future
+
+    def evaluate_one(self, x):
+        """Returns the fitness value of the 1D position x"""
+        return self.submit(x).result()
+
+    def evaluate(self, X):
+        """Returns the fitness values of the rows of X (in particle order)"""
+        futures = [self.submit(x) for x in X]
+        return np.array([future.result() for future in futures], dtype=float)
+
+    def stats(self):
+        """Utilization and counters of the pool and of every instance"""
+        elapsed = time.perf_counter() - self.t_start
+        workers = [instance.stats() for instance in self.instances]
+        total = {name: sum(worker[name] for worker in workers) for name in workers[0]}
+
+        total.update(n_workers=self.n_workers,
+                     elapsed=elapsed,
+                     utilization=total['busy_time'] / (self.n_workers*elapsed) if elapsed > 0 else 0.0,
+                     mean_wait=self.wait / total['evaluations'] if total['evaluations'] else 0.0,
+                     workers=workers)
+        for worker in workers:
+            worker['utilization'] = worker['busy_time'] / elapsed if elapsed > 0 else 0.0
+        return total
+
+    def close(self):
+        """Closes the instances and stops the worker processes"""
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
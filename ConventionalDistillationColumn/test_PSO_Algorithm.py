@@ -0,0 +1,75 @@
+import PSO_Algorithm
+import unittest
+import os
+import tempfile
+import numpy as np
+
+'''Tests for the engines of pso_gbest (no simulator needed).
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_PSO_Algorithm.py
+'''
+
+
+def sphere(x, Problem):
+    """Column stand-in: one integer variable (trays) and one continuous"""
+    return float(np.sum((np.asarray(x) - [12, 1.5])**2))
+
+
+def run(**options):
+    options.setdefault('reporters', [])
+    options.setdefault('rng', 0)
+    return PSO_Algorithm.pso_gbest(sphere, [5, 0.5], [30, 4.0], [0], None, **options)
+
+
+class AsyncEngineTests(unittest.TestCase):
+
+    def test_max_fo(self):
+        for evaluator in ('serial', 'thread'):
+            result = run(engine='async', evaluator=evaluator, n_workers=4, maxIter=100, maxFO=137)
+
+            assert result.FO_eval == 137, \
+                "ERROR: {} evaluations with maxFO=137 ({})".format(result.FO_eval, evaluator)
+            assert result.exit.startswith('Stop due to maximum number of function evaluations')
+
+    def test_max_iter(self):
+        # same evaluations as the particle engine: maxIter*swarm_size
+        particle = run(engine='particle', maxIter=20)
+        assert particle.FO_eval == 400
+
+        for evaluator in ('serial', 'thread'):
+            result = run(engine='async', evaluator=evaluator, n_workers=4, maxIter=20)
+
+            assert result.iterations == 20
+            assert result.FO_eval == particle.FO_eval, \
+                "ERROR: {} evaluations in 20 iterations ({})".format(result.FO_eval, evaluator)
+
+    def test_converges(self):
+        result = run(engine='async', evaluator='thread', n_workers=4, maxIter=60)
+
+        assert result.x_best[0] == 12, "ERROR: integer variable not found"
+        assert abs(result.x_best[1] - 1.5) < 1e-2
+        assert result.best_fitness == sphere(result.x_best, None)
+
+
+class ResumeTests(unittest.TestCase):
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'swarm.npz')
+
+            for engine in ('particle', 'swarm'):
+                result = run(engine=engine, maxIter=30, checkpoint=path, checkpoint_every=20,
+                             checkpoint_background=False)
+
+                reported = []
+                resumed = run(engine=engine, maxIter=30, resume=path,
+                              reporters=[lambda n_iter, *status: reported.append(n_iter)])
+
+                assert np.array_equal(result.x_best, resumed.x_best), "ERROR: resumed run differs"
+                assert result.FO_eval == resumed.FO_eval
+                assert reported == list(range(21, 31)), "ERROR: resumed run reported {}".format(reported)
+                assert np.array_equal(resumed.history.iteration, range(21, 31))
+
+
+if __name__ == '__main__':
+    unittest.main()
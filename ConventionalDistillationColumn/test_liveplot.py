@@ -0,0 +1,100 @@
+import liveplot
+from liveplot import LivePlot
+import unittest
+import threading
+import tempfile
+import os
+import numpy as np
+
+'''Tests for the live plot of pso_gbest (shared memory ring, headless backend).
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_liveplot.py
+'''
+
+
+class OverwrittenWhileCopied:
+    """Frames whose slot is written again by the optimizer during the copy"""
+
+    def __init__(self, frames, sequences):
+        self.frames, self.sequences = frames, sequences
+
+    def __getitem__(self, slot):
+        sequences, frame = self.sequences, self.frames[slot]
+
+        class Frame:
+            def copy(self):
+                copy = frame.copy()
+                sequences[slot] = -1  # the writer starts the next frame of the slot
+                return copy
+
+        return Frame()
+
+
+class LivePlotTests(unittest.TestCase):
+
+    def test_publish_and_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'swarm.png')
+            with LivePlot([0, 0, 0], [1, 2, 3], 5, n_slots=3, interval=0.01,
+                          backend='Agg', path=path) as plot:
+                rng = np.random.default_rng(0)
+                for iteration in range(1, 51):
+                    x = rng.random((3, 5))
+                    plot.update(iteration, 5*iteration, 1/iteration, 2/iteration, x, np.sum(x, axis=0))
+
+                # * Partial swarm (budget reached in the middle of an iteration)
+                plot.update(51, 253, 0.01, 0.02, x[:, :3], np.sum(x[:, :3], axis=0))
+                frame = plot.frames[51 % 3]
+                positions = frame[liveplot.HEADER:-5].reshape(3, 5)
+                assert np.array_equal(positions[:, :3], x[:, :3]) and np.isnan(positions[:, 3:]).all()
+                assert np.isnan(frame[-2:]).all(), "ERROR: fitness of the missing particles"
+
+            assert plot.published == 51
+            assert 1 <= plot.rendered <= plot.published
+            assert plot.rendered + plot.dropped == plot.published
+            assert os.path.getsize(path) > 0, "ERROR: last frame not saved"
+            assert not plot.process.is_alive()
+
+    def test_torn_frames(self):
+        plot = LivePlot([0], [1], 4, n_slots=2, interval=10, backend='Agg')
+        try:
+            plot.update(1, 4, 0.5, 1.0, np.full((1, 4), 0.5), np.ones(4))
+            assert plot.sequences[1] == 1
+            assert liveplot._read(plot.frames, plot.sequences, 1)[0] == 1
+            assert liveplot._read(plot.frames, plot.sequences, 3) is None, "ERROR: frame not published yet"
+
+            plot.sequences[1] = -1  # being written
+            assert liveplot._read(plot.frames, plot.sequences, 1) is None, "ERROR: torn frame read"
+
+            plot.sequences[1] = 1
+            frames = OverwrittenWhileCopied(plot.frames, plot.sequences)
+            assert liveplot._read(frames, plot.sequences, 1) is None, "ERROR: overwritten frame read"
+
+            # * A reader never sees a frame mixing two updates
+            first, n_frames, torn, seen = plot.published + 1, 3000, [], []
+
+            def read():
+                while plot.published < n_frames:
+                    sequence = plot.published
+                    frame = liveplot._read(plot.frames, plot.sequences, sequence) \
+                        if sequence >= first else None
+                    if frame is not None:
+                        seen.append(sequence)
+                        if not (frame == frame[0]).all() or frame[0] != sequence:
+                            torn.append(sequence)
+
+            reader = threading.Thread(target=read)
+            reader.start()
+            for sequence in range(first, n_frames + 1):
+                value = np.full((1, 4), float(sequence))
+                plot.update(sequence, sequence, sequence, sequence, value, value[0])
+            reader.join()
+
+            assert seen, "ERROR: no frame read"
+            assert not torn, "ERROR: torn frames {}".format(torn[:10])
+        finally:
+            plot.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import simulator
+from simulator import Simulator, SimulatorError, StandInSimulator, make_simulator
+from column_algorithm import distColumn_model
+import unittest
+import numpy as np
+
+'''Tests for the simulator backends (the stand-in model, no Hysys needed).
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_simulator.py
+'''
+
+
+class Problem:
+    pass
+
+
+class Crashing(Simulator):
+    """Backend whose runs raise a non simulator exception"""
+
+    def _run(self):
+        raise OSError('connection lost')
+
+
+class SimulatorInterfaceTests(unittest.TestCase):
+
+    def test_interface(self):
+        backend = Simulator()
+        for method, args in [('set_topology', (20, 11)), ('set_spec', ('Reflux Ratio', 1.5)),
+                             ('converged', ()), ('n_trays', ()), ('temperature', ('Bottoms',)),
+                             ('molar_fractions', ('Bottoms',)), ('duty', ('Qreb',)),
+                             ('diameter', ())]:
+            with self.assertRaises(NotImplementedError, msg=method):
+                getattr(backend, method)(*args)
+
+        with self.assertRaises(SimulatorError):  # _run not implemented
+            backend.run()
+
+    def test_run_failures(self):
+        with Crashing() as backend:
+            for i in range(3):
+                with self.assertRaises(SimulatorError) as raised:
+                    backend.run()
+
+            assert isinstance(raised.exception.__cause__, OSError), "ERROR: cause of the failure lost"
+            assert 'connection lost' in str(raised.exception)
+            assert backend.runs == 3 and backend.failures == 3
+            assert Simulator.failures == 0, "ERROR: counters shared between backends"
+
+
+class StandInSimulatorTests(unittest.TestCase):
+
+    def test_column(self):
+        backend = StandInSimulator()
+        backend.set_topology(31, 16)
+        backend.set_spec('Reflux Ratio', 1.5)
+        backend.set_spec('Boilup Ratio', 1.5)
+        backend.run()
+
+        assert backend.converged()
+        assert backend.n_trays() == 31
+        xD = backend.molar_fractions('Distillate')
+        xB = backend.molar_fractions('Bottoms')
+        assert xD[0] > 0.95 and xB[0] < 0.1, "ERROR: benzene/toluene not separated"
+        assert np.isclose(sum(xD), 1) and np.isclose(sum(xB), 1)
+
+        # * Benzene balance, D = BR F/(RR + 1 + BR)
+        D = 1.5*100/(1.5 + 1 + 1.5)
+        assert np.isclose(D*xD[0] + (100 - D)*xB[0], 100*0.4)
+
+        # * Toluene boils above benzene
+        assert 80 < backend.temperature('Distillate') < backend.temperature('Bottoms') < 111
+        assert backend.duty('Qcond') > 0 and backend.duty('Qreb') > 0
+        assert backend.diameter() > 0
+
+    def test_more_trays_purer_products(self):
+        backend = StandInSimulator()
+        purity = []
+        for n_trays in (10, 20, 40):
+            backend.set_topology(n_trays, n_trays // 2)
+            backend.run()
+            purity.append(backend.molar_fractions('Distillate')[0])
+
+        assert purity == sorted(purity), "ERROR: purities {}".format(purity)
+
+    def test_not_converged(self):
+        backend = StandInSimulator()
+        backend.set_spec('Reflux Ratio', 0.0)
+        backend.run()  # a column that does not converge is not a failure
+
+        assert not backend.converged()
+        assert backend.failures == 0
+
+    def test_deterministic(self):
+        results = []
+        for i in range(2):
+            backend = StandInSimulator(latency=(0.0, 1e-3), failure_rate=0.3, seed=1)
+            runs = []
+            for RR in np.linspace(1.0, 3.0, 20):
+                backend.set_spec('Reflux Ratio', RR)
+                try:
+                    backend.run()
+                    runs.append(backend.molar_fractions('Distillate')[0])
+                except SimulatorError:
+                    runs.append(None)
+            results.append(runs)
+
+        assert results[0] == results[1], "ERROR: same seed, different runs"
+        assert 0 < results[0].count(None) < 20
+
+    def test_failure_injection(self):
+        backend = StandInSimulator(failure_rate=1.0)
+        for i in range(5):
+            with self.assertRaises(SimulatorError):
+                backend.run()
+            assert not backend.converged()
+
+        assert backend.runs == 5 and backend.failures == 5
+
+        never = StandInSimulator(failure_rate=0.0, seed=0)
+        for i in range(20):
+            never.run()
+        assert never.failures == 0
+
+    def test_column_model(self):
+        problem = Problem()
+        problem.simulator = StandInSimulator()
+        x = [1.5, 1.5, 15, 15]
+        TAC = distColumn_model(x, problem)
+
+        assert 0 < TAC < 1e5
+        assert TAC == distColumn_model(x, problem), "ERROR: the stand-in model is not deterministic"
+
+        problem.simulator = StandInSimulator(failure_rate=1.0)
+        assert distColumn_model(x, problem) == 1e5, "ERROR: failed runs must be penalized"
+
+
+class MakeSimulatorTests(unittest.TestCase):
+
+    def test_backends(self):
+        problem = Problem()
+        problem.backend = 'standin'
+        problem.backend_options = dict(feed_benzene=0.5, failure_rate=0.25)
+        backend = make_simulator(problem)
+        assert isinstance(backend, StandInSimulator)
+        assert backend.feed_benzene == 0.5 and backend.failure_rate == 0.25
+
+        problem.backend = lambda Problem: Crashing()
+        assert isinstance(make_simulator(problem), Crashing)
+
+        problem.backend = 'aspen'
+        with self.assertRaises(AssertionError):
+            make_simulator(problem)
+
+        assert set(simulator.SIMULATORS) == {'hysys', 'standin'}
+
+
+if __name__ == '__main__':
+    unittest.main()
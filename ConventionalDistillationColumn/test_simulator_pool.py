@@ -0,0 +1,120 @@
+from simulator_pool import SimulatorPool
+from simulator import SimulatorError, StandInSimulator
+from column_algorithm import distColumn_model
+from pso_column import column_worker_context
+import unittest
+import time
+import numpy as np
+
+'''Tests for the pool of simulator instances (stand-in backend, no Hysys needed).
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_simulator_pool.py
+'''
+
+STARTUP = 0.02  # [s] to open a stand-in instance
+
+opened = 0  # instances opened in the worker process
+
+
+class Context:
+    """Worker context with a stand-in simulator and its uses"""
+
+    def __init__(self, **options):
+        global opened
+        opened += 1
+
+        self.simulator = StandInSimulator(startup=STARTUP, **options)
+        self.instance  = opened
+        self.uses      = 0
+
+
+def open_instance(**options):
+    return Context(**options)
+
+
+def uses(x, context):
+    """Objective returning (instance of the process, uses of the instance)"""
+    context.uses += 1
+    return context.instance*100 + context.uses
+
+
+def fails_first_instance(x, context):
+    """Objective raising on the first instance opened in the process"""
+    if context.instance == 1:
+        raise ValueError('first instance')
+    return float(np.sum(x))
+
+
+def slow(x, context):
+    time.sleep(x[0])
+    return x[0]
+
+
+def pool(objfnc, initializer=open_instance, initargs=(), **options):
+    options.setdefault('n_workers', 1)
+    return SimulatorPool(objfnc, initializer, initargs, **options)
+
+
+class SimulatorPoolTests(unittest.TestCase):
+
+    def test_instance_reuse(self):
+        with pool(uses, max_uses=3) as simulators:
+            values = simulators.evaluate(np.zeros((7, 2)))
+            stats = simulators.stats()
+
+        # * Every instance serves max_uses evaluations, then a new one is opened in the same process
+        assert list(values) == [101, 102, 103, 201, 202, 203, 301], "ERROR: uses {}".format(values)
+        assert stats['evaluations'] == 7
+        assert stats['recycles'] == 2 and stats['restarts'] == 0 and stats['failures'] == 0
+        assert stats['startup_time'] >= 3*STARTUP, "ERROR: start-up of the instances not counted"
+
+    def test_retry(self):
+        with pool(fails_first_instance, retries=1) as simulators:
+            value = simulators.evaluate_one(np.array([1.0, 2.0]))
+            stats = simulators.stats()
+
+        # * The failed instance is recycled and the evaluation retried on the new one
+        assert value == 3.0
+        assert stats['evaluations'] == 2 and stats['failures'] == 1 and stats['recycles'] == 1
+
+        with pool(fails_first_instance, retries=0) as simulators:
+            with self.assertRaises(ValueError):
+                simulators.evaluate_one(np.array([1.0, 2.0]))
+            assert simulators.evaluate_one(np.array([1.0, 2.0])) == 3.0
+
+    def test_simulator_failures(self):
+        # * distColumn_model penalizes a crash of the simulator, the pool still sees the failure
+        settings = {'backend': 'standin', 'backend_options': {'failure_rate': 1.0}}
+        with pool(distColumn_model, column_worker_context, (settings,), retries=2) as simulators:
+            value = simulators.evaluate_one(np.array([1.5, 1.5, 15, 15]))
+            stats = simulators.stats()
+
+        assert value == 1e5
+        assert stats['evaluations'] == 3 and stats['failures'] == 3 and stats['recycles'] == 3
+
+    def test_timeout(self):
+        with pool(slow, retries=0, timeout=0.5) as simulators:
+            with self.assertRaises(SimulatorError):
+                simulators.evaluate_one(np.array([10.0]))
+            assert simulators.evaluate_one(np.array([0.0])) == 0.0
+            stats = simulators.stats()
+
+        assert stats['restarts'] == 1 and stats['failures'] == 1
+
+    def test_stats(self):
+        X = np.zeros((12, 1)) + 0.02
+        with pool(slow, n_workers=3, max_uses=100) as simulators:
+            assert np.array_equal(simulators.evaluate(X), X[:, 0])
+            stats = simulators.stats()
+
+        assert stats['n_workers'] == 3 and len(stats['workers']) == 3
+        assert stats['evaluations'] == 12
+        assert sum(worker['evaluations'] for worker in stats['workers']) == 12
+        assert stats['busy_time'] >= 12*0.02
+        assert 0 < stats['utilization'] <= 1
+        # 12 evaluations queued at once on 3 instances: most of them wait
+        assert stats['mean_wait'] > 0.02, "ERROR: mean wait {}".format(stats['mean_wait'])
+
+
+if __name__ == '__main__':
+    unittest.main()
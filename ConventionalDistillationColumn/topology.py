@@ -0,0 +1,95 @@
+"""
+Neighborhood topologies of the PSO algorithm
+
+In the gbest topology every particle is attracted by the best position found
+by the whole swarm, which converges fast but prematurely on multimodal
+functions (rastrigin, rana ...). In the lbest topologies each particle only
+knows the personal bests of its neighbors, so good positions spread slowly
+through the swarm and several basins are explored at the same time.
+
+A topology is precomputed as an integer array neighbors of shape
+(swarm_size, n_neighbors): row i holds the indexes of the particles informing
+particle i (itself included). The best neighbor of every particle is then a
+single vectorized gather per iteration (see neighborhood_best).
+
+    * ring: particles i-k ... i+k (k = 1 by default)
+    * von_neumann: the four neighbors of a particle in a 2D torus grid
+    * random: k random informants per particle (k = 3 by default)
+"""
+
+import numpy as np
+
+
+def ring(swarm_size, k=None, rng=None):
+    """Ring (circle) topology, particle i is informed by particles i-k ... i+k"""
+    k = 1 if k is None else k
+    assert 2*k + 1 <= swarm_size, "Ring radius k is too large for the swarm"
+
+    offsets = np.arange(-k, k + 1)
+    return (np.arange(swarm_size)[:, np.newaxis] + offsets) % swarm_size
+
+
+def von_neumann(swarm_size, k=None, rng=None):
+    """Von Neumann topology, the particles are placed in a rows x cols torus
+    (rows being the largest divisor of swarm_size not above its square root)
+    and informed by the particles above, below, left and right"""
+    rows = int(np.sqrt(swarm_size))
+    while swarm_size % rows:
+        rows -= 1
+    cols = swarm_size // rows
+
+    i, j = np.divmod(np.arange(swarm_size), cols)
+    return np.column_stack([i*cols + j,
+                            ((i - 1) % rows)*cols + j,
+                            ((i + 1) % rows)*cols + j,
+                            i*cols + (j - 1) % cols,
+                            i*cols + (j + 1) % cols])
+
+
+def random_k(swarm_size, k=None, rng=None):
+    """Random topology, each particle is informed by itself and k particles
+    drawn at random (with replacement) with the NumPy Generator rng"""
+    k   = 3 if k is None else k
+    rng = np.random.default_rng(rng)
+    informants = rng.integers(swarm_size, size=(swarm_size, k))
+    return np.column_stack([np.arange(swarm_size), informants])
+
+
+TOPOLOGIES = {'ring':        ring,
+              'von_neumann': von_neumann,
+              'random':      random_k}
+
+
+def make_topology(topology, swarm_size, k=None, rng=None):
+    """Returns the neighbor index array of topology (None for 'gbest')
+
+    :param topology: 'gbest', 'ring', 'von_neumann', 'random' or an integer
+        array (swarm_size, n_neighbors) with the neighbors of each particle
+    :param k: parameter of the topology (radius of the ring, informants of
+        the random topology)
+    :param rng: NumPy Generator of the random topology
+    """
+    if isinstance(topology, str):
+        if topology == 'gbest':
+            return None
+
+        assert topology in TOPOLOGIES, \
+            "topology must be 'gbest', {} or a neighbor index array".format(', '.join(TOPOLOGIES))
+        return TOPOLOGIES[topology](swarm_size, k, rng)
+
+    neighbors = np.asarray(topology, dtype=int)
+    assert neighbors.ndim == 2 and neighbors.shape[0] == swarm_size, \
+        "Neighbor index array must have one row per particle"
+    return neighbors
+
+
+def neighborhood_best(pbest_fitness, neighbors):
+    """Index of the best personal best in the neighborhood of each particle
+
+    :param pbest_fitness: personal best fitness of the swarm (swarm_size,)
+    :param neighbors: neighbor index array (swarm_size, n_neighbors), or one
+        of its rows for a single particle
+    :return: index array (swarm_size,) (or index for a single particle)
+    """
+    best = np.argmin(pbest_fitness[neighbors], axis=-1)
+    return np.take_along_axis(neighbors, best[..., np.newaxis], axis=-1)[..., 0]
@@ -0,0 +1,295 @@
+"""
+Streaming animation of the particles of a run (GIF or MP4)
+
+Instead of saving a full figure per iteration (plotPSO_2D + savefig), an
+AnimationWriter draws the landscape once (the cached surface of plotPSO.py)
+in a figure that is reused for the whole run. Every frame only moves the
+particle artists, which are blitted over the saved background with the Agg
+renderer (no GUI, no pyplot). The RGB frame is handed to a background thread
+that encodes it as it arrives:
+
+    * .gif: quantized and LZW encoded by Pillow (one 256 colors palette per
+      frame) and appended to the file, so memory does not grow with the
+      frames and a run that is killed leaves a readable GIF
+    * .mp4: piped to ffmpeg (matplotlib's animation.ffmpeg_path)
+
+The cost per iteration is bounded: frames are taken every `every` updates and
+at most max_fps per second of wall time, and when the encoder falls behind
+(its queue of queue_size frames is full) the frame is dropped.
+
+    with AnimationWriter(ackley, ([-5, 5], [-5, 5]), 'ackley.gif') as writer:
+        result = pso(ackley, [-5, -5], [5, 5], [], plotPSO=writer)
+"""
+
+import io
+import os
+import queue
+import struct
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from plotPSO import surface, evaluate_points
+
+
+class AnimationWriter:
+    """Animation of the particles over the landscape of a 1D or 2D function
+
+    :param function: objective function (batch functions draw faster)
+    :param limits: [lo, up] (1D) or ([x_lo, x_up], [y_lo, y_up]) (2D)
+    :param path: output file, .gif or .mp4
+    :param fps: frames per second of the animation
+    :param max_fps: maximum frames rendered per second of the run (None:
+        every update, subject to every)
+    :param every: render one of every `every` updates
+    :param n_points: resolution of the surface (see plotPSO.surface)
+    :param cache_dir: optional disk cache of the surface
+    :param queue_size: frames waiting for the encoder before dropping frames
+    :param block: wait for the encoder instead of dropping frames (offline
+        replays, see trajectory.py)
+    """
+
+    def __init__(self, function, limits, path, fps=10, max_fps=None, every=1,
+                 n_points=100, cache_dir=None, figsize=(6, 5), dpi=100, queue_size=8,
+                 block=False):
+        extension = os.path.splitext(path)[1].lower()
+        assert extension in ('.gif', '.mp4'), "path must be a .gif or .mp4 file"
+
+        if extension == '.mp4':
+            self.ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+            if self.ffmpeg is None:
+                raise RuntimeError('ffmpeg is needed to write .mp4 files, use a .gif instead')
+
+        self.function  = function
+        self.path      = path
+        self.extension = extension
+        self.fps       = fps
+        self.every     = max(int(every), 1)
+        self.block     = block
+        self.min_interval = 0.0 if not max_fps else 1/max_fps
+
+        self.n_updates = 0  # calls to update
+        self.n_frames  = 0  # frames encoded
+        self.dropped   = 0  # frames dropped because the encoder was behind
+        self.last_time = -float('inf')
+
+        self.dim = 2 if np.ndim(limits) == 2 else 1
+        self._setup_figure(function, limits, n_points, cache_dir, figsize, dpi)
+
+        self.queue  = queue.Queue(maxsize=queue_size)
+        self.output = None  # file (GIF) or ffmpeg process (MP4), opened with the first frame
+        self.error  = None  # exception of the encoder thread
+        self.thread = threading.Thread(target=self._encoder, daemon=True)
+        self.thread.start()
+
+    # Figure ##################################################################
+
+    def _setup_figure(self, function, limits, n_points, cache_dir, figsize, dpi):
+        """Draws the landscape once and saves it as the background of the frames"""
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.ax = self.figure.add_subplot(1, 1, 1)
+
+        if self.dim == 2:
+            (XX, YY), ZZ = surface(function, limits, n_points, cache_dir)
+            contour = ax.contourf(XX, YY, ZZ, cmap=matplotlib.cm.viridis, zorder=1)
+            self.figure.colorbar(contour, ax=ax, shrink=1)
+            ax.set_xlabel('$x$')
+            ax.set_ylabel('$y$')
+        else:
+            x, z = surface(function, limits, n_points, cache_dir)
+            ax.plot(x, z, zorder=1)
+            ax.set_xlabel('$x$')
+            ax.set_ylabel('$y$')
+
+        ax.set_title(function.__name__)
+        ax.set_autoscale_on(False)  # particles never rescale the axes
+
+        self.particles = ax.scatter([], [], s=50, c='red', zorder=2, animated=True)
+        self.arrows    = None  # quiver of the velocities, created with the first frame
+        self.label     = ax.text(0.02, 0.95, '', transform=ax.transAxes, color='white',
+                                 zorder=3, animated=True)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def _render(self, x, v, z, iteration):
+        """Blits the particles over the background, returns the RGB frame"""
+        self.canvas.restore_region(self.background)
+
+        if self.dim == 2:
+            xy = x[:2].T
+        else:
+            if z is None:
+                z = evaluate_points(self.function, x[0][:, np.newaxis])
+            xy = np.column_stack((x[0], z))
+        self.particles.set_offsets(xy)
+        self.ax.draw_artist(self.particles)
+
+        if v is not None and self.dim == 2:
+            if self.arrows is None or self.arrows.N != xy.shape[0]:
+                self.arrows = self.ax.quiver(xy[:, 0], xy[:, 1], v[0], v[1], angles='xy',
+                                             scale_units='xy', scale=1, zorder=2, animated=True)
+            else:
+                self.arrows.set_offsets(xy)
+                self.arrows.set_UVC(v[0], v[1])
+            self.ax.draw_artist(self.arrows)
+
+        if iteration is not None:
+            self.label.set_text('iteration {}'.format(iteration))
+            self.ax.draw_artist(self.label)
+
+        return np.array(self.canvas.buffer_rgba())[..., :3]
+
+    # Frames ##################################################################
+
+    def update(self, x, v=None, z=None, iteration=None):
+        """Adds a frame with the particles x (n_variables, n_particles)
+
+        :param v: velocities (n_variables, n_particles), drawn as arrows (2D)
+        :param z: function values of the particles (1D, evaluated if None)
+        :param iteration: iteration shown in the frame
+        :return: True if a frame was rendered
+        """
+        self.n_updates += 1
+        if (self.n_updates - 1) % self.every:
+            return False
+
+        now = time.perf_counter()
+        if now - self.last_time < self.min_interval:
+            return False
+        self.last_time = now
+
+        if self.error is not None:
+            raise self.error
+
+        frame = self._render(np.asarray(x), None if v is None else np.asarray(v), z, iteration)
+        try:
+            self.queue.put(frame, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+        return True
+
+    # Encoder (background thread) #############################################
+
+    def _encoder(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue  # keep emptying the queue
+            try:
+                self._encode(frame)
+                self.n_frames += 1
+            except Exception as error:
+                self.error = error
+
+    def _encode(self, frame):
+        if self.extension == '.gif':
+            from PIL import Image
+
+            image = Image.fromarray(frame).quantize(256, method=Image.Quantize.FASTOCTREE)
+            if self.output is None:
+                self.output = open(self.path, 'wb')
+                self.output.write(_gif_header(image.size))
+            delay = int(round(100/self.fps))  # [1/100 s]
+            self.output.write(b'\x21\xf9\x04\x00' + struct.pack('<H', delay) + b'\x00\x00')
+            self.output.write(_gif_image(image))
+            self.output.flush()  # readable while the run goes on
+        else:
+            if self.output is None:
+                height, width = frame.shape[:2]
+                self.output = subprocess.Popen(
+                    [self.ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo',
+                     '-pix_fmt', 'rgb24', '-s', '{}x{}'.format(width, height),
+                     '-r', str(self.fps), '-i', '-', '-pix_fmt', 'yuv420p',
+                     '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', self.path],
+                    stdin=subprocess.PIPE)
+            self.output.stdin.write(frame.tobytes())
+
+    def _finish(self):
+        """Closes the GIF or waits for ffmpeg"""
+        if self.extension == '.gif':
+            self.output.write(b';')  # trailer
+            self.output.close()
+        else:
+            self.output.stdin.close()
+            self.output.wait()
+
+    def close(self, raise_error=True):
+        """Encodes the frames in the queue and closes the file
+
+        :param raise_error: raise the error of the encoder (if any)
+        """
+        if not self.thread.is_alive():
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+
+        if self.output is not None:
+            try:
+                self._finish()
+            except Exception as error:
+                self.error = self.error or error
+
+        if raise_error and self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # an exception raised in the with block is not hidden by the one of the encoder
+        self.close(raise_error=exc_type is None)
+
+
+# GIF89a stream ###############################################################
+
+def _gif_header(size):
+    """Header of an animated GIF without global color table, looping forever"""
+    return (b'GIF89a' + struct.pack('<HHBBB', size[0], size[1], 0, 0, 0) +
+            b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+
+def _gif_image(image):
+    """Image block of a P image (descriptor, local color table and LZW
+    data), taken from the single frame GIF that Pillow writes"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='GIF')
+    data = buffer.getvalue()
+
+    position, color_table, table_bits = 13, b'', 0
+    if data[10] & 0x80:  # global color table
+        table_bits = data[10] & 7
+        color_table = data[13:13 + (3 << (table_bits + 1))]
+        position += len(color_table)
+
+    while data[position] == 0x21:  # extensions
+        position += 2
+        while data[position]:
+            position += data[position] + 1
+        position += 1
+    assert data[position] == 0x2c, "unexpected block in the GIF of a frame"
+
+    descriptor = bytearray(data[position:position + 10])
+    position += 10
+    if descriptor[9] & 0x80:  # local color table
+        table_bits = descriptor[9] & 7
+        color_table = data[position:position + (3 << (table_bits + 1))]
+        position += len(color_table)
+    descriptor[9] = 0x80 | (descriptor[9] & 0x40) | table_bits  # keep the interlace flag
+
+    start = position
+    position += 1  # LZW minimum code size
+    while data[position]:
+        position += data[position] + 1
+
+    return bytes(descriptor) + color_table + data[start:position + 1]
@@ -1,13 +1,139 @@
+"""
+Plots of the test functions and of the particles
+
+The landscape of a function is evaluated once per (function, limits,
+n_points) and cached (see surface): in memory (the SURFACE_CACHE_SIZE most
+recently used surfaces, see clear_cache) and, with cache_dir, on disk as .npy
+files, so the frames of an animation redraw the particles over the same
+surface. Functions accepting batches of points (all of optitestfuns.py)
+evaluate the whole grid in a few calls; other functions are evaluated point
+by point.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
 plt.style.use('bmh')
 
+SURFACE_CACHE_SIZE = 16  # surfaces kept in memory
+
+_surfaces = OrderedDict()  # (function, limits, n_points) -> surface values, LRU order
+
+
+def clear_cache():
+    """Empties the in-memory cache of surfaces (not the disk cache)"""
+    _surfaces.clear()
+
+
+def _describe(value):
+    """Text identifying value across sessions (functions by qualified name)"""
+    if callable(value) and hasattr(value, '__qualname__'):
+        return '{}.{}'.format(getattr(value, '__module__', ''), value.__qualname__)
+    return repr(value)
+
+
+def _function_key(function):
+    """Stable identification of a function for the disk cache: qualified
+    name, bytecode, constants and values of its closure"""
+    parts = [_describe(function)]
+
+    code = getattr(function, '__code__', None)
+    if code is not None:
+        parts.append(code.co_code.hex())
+        parts += [repr(const) for const in code.co_consts if not hasattr(const, 'co_code')]
+
+    for cell in getattr(function, '__closure__', None) or ():
+        parts.append(_describe(cell.cell_contents))
+
+    return '|'.join(parts)
+
+
+def evaluate_points(function, points, chunk_size=65536):
+    """Values of function at the rows of points (n_points, n_variables)
+
+    Batch functions (returning one value per row of a 2D array) are called
+    with chunks of at most chunk_size rows; for the others the function is
+    called point by point (with a float for 1D functions). A function is
+    taken as batch when its values for the first 3 rows at once match those
+    of the rows one by one
+    """
+    points = np.asarray(points, dtype=float)
+    n = points.shape[0]
+
+    def single(x):
+        return function(x[0]) if x.size == 1 else function(x)
+
+    try:
+        probe = np.asarray(function(points[:3]), dtype=float)
+        batch = probe.shape == (min(n, 3),) and \
+            np.allclose(probe, [function(point) for point in points[:3]], equal_nan=True)
+    except Exception:  # function of a single point only
+        batch = False
+
+    if batch:
+        z = np.empty(n)
+        for start in range(0, n, chunk_size):
+            z[start:start + chunk_size] = function(points[start:start + chunk_size])
+        return z
+
+    return np.fromiter((single(point) for point in points), dtype=float, count=n)
+
+
+def surface(function, limits, n_points=100, cache_dir=None):
+    """Function values on a n_points grid (cached)
+
+    Params:
+        function: objective function of 1 or 2 variables (or nD evaluated
+            at 2D points)
+        limits: [lo, up] (1D) or ([x_lo, x_up], [y_lo, y_up]) (2D)
+        n_points: grid points per dimension
+        cache_dir: optional directory of the disk cache
+    returns (grid, values): x and z arrays (1D) or (XX, YY) and ZZ (2D)
+    """
+    limits = tuple(tuple(float(v) for v in limit) for limit in limits) \
+        if np.ndim(limits) == 2 else (tuple(float(v) for v in limits),)
+
+    axes = [np.linspace(lo, up, n_points) for lo, up in limits]
+    grid = np.meshgrid(*axes) if len(axes) == 2 else axes
+
+    key = (function, limits, n_points)
+    values = _surfaces.get(key)
+
+    path = None
+    if values is None and cache_dir is not None:
+        digest = hashlib.sha1(repr((_function_key(function), limits, n_points)).encode()).hexdigest()
+        path = os.path.join(cache_dir, 'surface_{}.npy'.format(digest))
+        if os.path.exists(path):
+            values = np.load(path)
+
+    if values is None:
+        points = np.column_stack([axis.ravel() for axis in grid])
+        values = evaluate_points(function, points).reshape(grid[0].shape)
+
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as file:
+                np.save(file, values)
+            os.replace(tmp, path)
+
+    values.flags.writeable = False  # shared by every figure of the same surface
+    _surfaces[key] = values
+    _surfaces.move_to_end(key)
+    while len(_surfaces) > SURFACE_CACHE_SIZE:
+        _surfaces.popitem(last=False)
+
+    return (grid if len(axes) == 2 else grid[0]), values
+
 
 def plotPSO_2D(function, limits=([-5,5],[-5,5]),
                particles_xy=([],[]), particles_uv=([],[]),
-               n_points=100, *arg):
+               n_points=100, *arg, cache_dir=None):
     """Creates a figure of 1x2 with a 3D projection representation of a 2D function and a its projection
     
     Params:
@@ -15,7 +141,8 @@ def plotPSO_2D(function, limits=([-5,5],[-5,5]),
         limits: define the bounds of the function
         particles_xy a tuple contatining 2 lists with the x and y coordinate of the particles
         particles_xy a tuple contatining 2 lists with the u and v velocities of the particles
-        n_points: number of points where the function is evaluated to be plotted, the bigger the finner"""
+        n_points: number of points where the function is evaluated to be plotted, the bigger the finner
+        cache_dir: optional directory where the surface is cached (see surface)"""
     
 
     # Grid points 
@@ -27,15 +154,8 @@ def plotPSO_2D(function, limits=([-5,5],[-5,5]),
     assert x_lo<x_up, "Unbound x limits, the first value of the list needs to be higher"
     assert y_lo<y_up, "Unbound x limits, the first value of the list needs to be higher"
                                  
-    x = np.linspace(x_lo, x_up, n_points) # x coordinates of the grid
-    y = np.linspace(y_lo, y_up, n_points) # y coordinates of the grid
-
-    XX, YY = np.meshgrid(x,y)
-    ZZ = np.zeros_like(XX)
-    
-    for i in range(n_points):
-        for j in range(n_points):
-            ZZ[i,j] = function((XX[i,j], YY[i,j]))
+    # Function values on the grid (evaluated once per function, limits and n_points)
+    (XX, YY), ZZ = surface(function, limits, n_points, cache_dir)
     
     fig = plt.figure(figsize=(12,4))
     ax1 = fig.add_subplot(1, 2, 1, projection='3d')
@@ -72,10 +192,7 @@ def plotPSO_2D(function, limits=([-5,5],[-5,5]),
     n_velocities = len(u_particles)
     
     if n_particles>=1:
-        z_particles = np.zeros(n_particles)
-    
-        for i in range(n_particles):
-            z_particles[i] = function((x_particles[i],y_particles[i]))
+        z_particles = evaluate_points(function, np.column_stack((x_particles, y_particles)))
 
         # Plot particles over the function 
         ax1.scatter(x_particles, y_particles, z_particles,
@@ -95,7 +212,6 @@ def plotPSO_2D(function, limits=([-5,5],[-5,5]),
     
     # Projection of function
     cf2d = ax2.contourf(XX,YY,ZZ,
-                 zdir='z', offset=z_cut_plane,
                  cmap=plt.cm.viridis, zorder=1)
     
     # Particles (2D)
@@ -123,7 +239,8 @@ def plotPSO_2D(function, limits=([-5,5],[-5,5]),
   
     return fig, (ax1, ax2)
 
-def plotPSO_1D(function, limits=([-5,5]), particles_coordinates=([]), particles_velocities=([]), n_points=100, *arg):
+def plotPSO_1D(function, limits=([-5,5]), particles_coordinates=([]), particles_velocities=([]), n_points=100, *arg,
+               cache_dir=None):
     """Returns and shows a figure of a 2D representation of a 1D function
     
     Params:
@@ -131,17 +248,11 @@ def plotPSO_1D(function, limits=([-5,5]), particles_coordinates=([]), particles_
         limits: define the bounds of the function
         particles_coordinates: a tuple contatining 2 lists with the x and y coordinate of the particles
         particles_velocities: a tuple contatining 2 lists with the u and v velocities of the particles
-        n_points: number of points where the function is evaluated to be plotted, the bigger the finner"""
+        n_points: number of points where the function is evaluated to be plotted, the bigger the finner
+        cache_dir: optional directory where the curve is cached (see surface)"""
     
-    # Grid points 
-    x_lo = limits[0]
-    x_up = limits[1]                         
-                              
-    x = np.linspace(x_lo, x_up, n_points) # x coordinates of the grid
-    z = np.zeros(n_points)
-   
-    for i in range(n_points):
-        z[i] = function(x[i])
+    # Grid points and function values (evaluated once per function, limits and n_points)
+    x, z = surface(function, limits, n_points, cache_dir)
     
     fig = plt.figure()
     ax = fig.add_subplot(111) # 111 stands for subplot(nrows, ncols, plot_number) 
@@ -153,21 +264,17 @@ def plotPSO_1D(function, limits=([-5,5]), particles_coordinates=([]), particles_
     assert particles_coordinates.ndim <=1, \
     "Arrays containing particle coordinates have more than 1 dimmension"
     
-    if particles_coordinates.shape[0] is not 0: 
+    if particles_coordinates.shape[0] != 0: 
         x_particles = particles_coordinates
         n_particles = x_particles.shape[0]
 
-        z_particles = np.zeros(n_particles)
-
-
-        for i in range(n_particles):
-            z_particles[i] = function(x_particles[i])
+        z_particles = evaluate_points(function, x_particles[:, np.newaxis])
 
         # Plot particles over the function
         ax.scatter(x_particles, z_particles,
                s=50, c='red', zorder=2)
         
-        if particles_velocities.shape[0] is not 0:  
+        if particles_velocities.shape[0] != 0:  
             u_particles = particles_velocities
             
             n_velocities = u_particles.shape[0]
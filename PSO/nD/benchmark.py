@@ -0,0 +1,313 @@
+# coding: utf-8
+
+"""
+Wall-clock benchmarks of the PSO implementation
+
+Three groups of benchmarks, each one timed several times (the minimum and
+the median of the repeats are kept):
+
+    * 'function': the test functions of optitestfuns.py on one point and on
+      a batch of points, for every dimension
+    * 'pso': runs of pso() with a fixed number of iterations over the test
+      functions x dimensions x swarm sizes x engines (particle engine with
+      single point evaluations, swarm engine with batch evaluations). The
+      time of each phase of the last run (Result.profile) is stored too
+    * 'plot': plotPSO.plotPSO_2D (non interactive Agg backend) evaluating
+      its surface in every repeat and reusing the cached surface, and the
+      surface alone
+
+The results of a run are appended to a JSON file keyed by machine and commit,
+{machine: {'baseline': commit, 'runs': {commit: run}}} (commit followed by
+'-dirty' when the working tree has uncommitted changes), and compared against
+the baseline of the same machine: benchmarks whose minimum time grew more
+than threshold (relative) are reported as regressions. Everything runs
+offline, the commit is read with git when available.
+
+    python benchmark.py                  # full suite, compare with the baseline
+    python benchmark.py --quick          # small sizes (smoke test)
+    python benchmark.py --save-baseline  # the current commit becomes the baseline
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import optitestfuns
+from pso import pso
+
+FUNCTIONS = ('ackley', 'griewangk', 'rastrigin', 'salomon', 'odd_square', 'schwefel', 'rana')
+
+# * Search domain, -bound <= x_i <= bound (see optitestfuns.OPTIMA)
+BOUNDS = {name: optitestfuns.OPTIMA[name][2] for name in FUNCTIONS}
+
+DIMENSIONS  = (2, 10, 100, 1000)
+SWARM_SIZES = (20, 50)
+ENGINES     = ('particle', 'swarm')
+
+QUICK = dict(dimensions=(2, 10), swarm_sizes=(10,), max_iter=10, n_points=100,
+             grid_points=20, repeat=2)
+
+
+def supports(function, n, known_optimum=False):
+    """True if the test function is defined in n dimensions (odd_square up
+    to 10D, rana from 2D); with known_optimum, only if its documented optimum
+    (optitestfuns.OPTIMA) holds in n dimensions too (the one of rana is the
+    optimum of the 2D function)"""
+    if function == 'odd_square':
+        return n <= 10
+    if function == 'rana':
+        return n == 2 if known_optimum else n >= 2
+    return True
+
+
+def timeit(function, repeat=5, number=1):
+    """Runs function() number times per repeat, returns {'min', 'median'}
+    time of one call [s] over the repeats"""
+    times = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - tic) / number)
+
+    return {'min': min(times), 'median': float(np.median(times))}
+
+
+def bench_functions(dimensions=DIMENSIONS, n_points=1000, repeat=5, rng=0):
+    """Times the test functions on a single point and on n_points points"""
+    rng = np.random.default_rng(rng)
+    results = {}
+
+    for name in FUNCTIONS:
+        function = getattr(optitestfuns, name)
+        for n in dimensions:
+            if not supports(name, n):
+                continue
+
+            X = BOUNDS[name] * (2*rng.random((n_points, n)) - 1)
+            work = optitestfuns.workspace(X.shape)
+
+            results['function/{}/n={}/point'.format(name, n)] = \
+                timeit(lambda: function(X[0]), repeat, number=100)
+            results['function/{}/n={}/batch={}'.format(name, n, n_points)] = \
+                timeit(lambda: function(X, work), repeat)
+
+    return results
+
+
+def bench_pso(dimensions=DIMENSIONS, swarm_sizes=SWARM_SIZES, engines=ENGINES,
+              max_iter=50, repeat=3, rng=0):
+    """Times pso() runs of max_iter iterations (tolerances disabled)"""
+    results = {}
+
+    for name in FUNCTIONS:
+        function = getattr(optitestfuns, name)
+        for n in dimensions:
+            if not supports(name, n):
+                continue
+
+            lb, ub = [-BOUNDS[name]]*n, [BOUNDS[name]]*n
+            for swarm_size in swarm_sizes:
+                for engine in engines:
+                    runs = []
+
+                    def run():
+                        runs.append(pso(function, lb, ub, [], engine=engine,
+                                        batch=(engine == 'swarm'), swarm_size=swarm_size,
+                                        maxIter=max_iter, tol_x=-1, tol_fnc=-1,
+                                        v_max=0.1*BOUNDS[name], reporters=[], rng=rng))
+
+                    timing = timeit(run, repeat)
+                    timing['iterations'] = runs[-1].iterations
+                    timing['profile']    = runs[-1].profile
+
+                    key = 'pso/{}/n={}/S={}/iter={}/{}'.format(name, n, swarm_size, max_iter, engine)
+                    results[key] = timing
+
+    return results
+
+
+def bench_plot(functions=('ackley', 'rana'), n_points=100, repeat=3):
+    """Times plotPSO_2D (figure included) with the non interactive backend:
+    with the surface evaluated in every repeat (in-memory cache cleared, no
+    disk cache) and with the surface of the cache, and the surface alone"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import plotPSO
+
+    results = {}
+    for name in functions:
+        function = getattr(optitestfuns, name)
+        bound = BOUNDS[name]
+        limits = ([-bound, bound], [-bound, bound])
+
+        def plot(cached):
+            if not cached:
+                plotPSO.clear_cache()
+            plotPSO.plotPSO_2D(function, limits=limits, n_points=n_points)
+            plt.close('all')
+
+        def grid():
+            plotPSO.clear_cache()
+            plotPSO.surface(function, limits, n_points)
+
+        key = 'plot/{}/' + '{}/grid={}'.format(name, n_points)
+        results[key.format('plotPSO_2D')] = timeit(lambda: plot(False), repeat)
+        results[key.format('plotPSO_2D_cached')] = timeit(lambda: plot(True), repeat)
+        results[key.format('surface')] = timeit(grid, repeat)
+
+    return results
+
+
+def machine_info():
+    """Description of the machine and of the Python stack"""
+    return {'node':      platform.node(),
+            'machine':   platform.machine(),
+            'processor': platform.processor(),
+            'system':    platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'python':    platform.python_version(),
+            'numpy':     np.__version__}
+
+
+def machine_key(info):
+    """Key of a machine in the results file"""
+    return '{node}-{machine}-{cpu_count}cpu'.format(**info)
+
+
+def commit_info():
+    """(commit, dirty) of the working tree, ('unknown', None) without git"""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                cwd=cwd, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', None
+
+    return commit, bool(status.strip())
+
+
+def load_results(path):
+    """Stored results {machine: {'baseline': commit, 'runs': {commit: run}}}"""
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_results(path, stored, run, save_baseline=False):
+    """Adds run to the stored results (keyed by machine and commit) and
+    writes the file atomically"""
+    machine = stored.setdefault(run['machine_key'], {'baseline': None, 'runs': {}})
+    machine['runs'][run['key']] = run
+
+    if save_baseline or machine['baseline'] is None:
+        machine['baseline'] = run['key']
+
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as file:
+        json.dump(stored, file, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def compare(results, baseline, threshold=0.2):
+    """Benchmarks slower than in the baseline
+
+    :param results: {benchmark: {'min': time, ...}} of the current run
+    :param baseline: same structure for the baseline run
+    :param threshold: relative growth of the minimum time flagged (0.2: 20 %)
+    :return: list of (benchmark, baseline time, time, ratio), worst first
+    """
+    regressions = []
+    for key in sorted(set(results) & set(baseline)):
+        before, after = baseline[key]['min'], results[key]['min']
+        ratio = after / before if before > 0 else np.inf
+        if ratio > 1 + threshold:
+            regressions.append((key, before, after, ratio))
+
+    return sorted(regressions, key=lambda regression: -regression[3])
+
+
+def run_benchmarks(groups=('function', 'pso', 'plot'), quick=False, repeat=None):
+    """Runs the benchmark groups, returns the run (results and metadata)"""
+    settings = QUICK if quick else {}
+    repeat = repeat or settings.get('repeat')
+    dimensions = settings.get('dimensions', DIMENSIONS)
+
+    results = {}
+    if 'function' in groups:
+        results.update(bench_functions(dimensions, settings.get('n_points', 1000),
+                                       repeat or 5))
+    if 'pso' in groups:
+        results.update(bench_pso(dimensions, settings.get('swarm_sizes', SWARM_SIZES), ENGINES,
+                                 settings.get('max_iter', 50), repeat or 3))
+    if 'plot' in groups:
+        results.update(bench_plot(n_points=settings.get('grid_points', 100),
+                                  repeat=repeat or 3))
+
+    info = machine_info()
+    commit, dirty = commit_info()
+    return {'key':         commit + ('-dirty' if dirty else ''),
+            'commit':      commit,
+            'dirty':       dirty,
+            'date':        datetime.datetime.now().isoformat(timespec='seconds'),
+            'machine':     info,
+            'machine_key': machine_key(info),
+            'quick':       quick,
+            'results':     results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Wall-clock benchmarks of pso() and the test functions')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='JSON file with the results of every machine and commit')
+    parser.add_argument('--groups', nargs='+', default=['function', 'pso', 'plot'],
+                        choices=['function', 'pso', 'plot'])
+    parser.add_argument('--quick', action='store_true', help='small sizes (smoke test)')
+    parser.add_argument('--repeat', type=int, default=None, help='repeats of every benchmark')
+    parser.add_argument('--baseline', default=None,
+                        help='commit to compare with (default: the baseline of this machine)')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown reported as a regression')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='make this run the baseline of this machine')
+    args = parser.parse_args(argv)
+
+    run = run_benchmarks(args.groups, args.quick, args.repeat)
+
+    for key, timing in sorted(run['results'].items()):
+        print('{:<50} {:12.6f} s  (median {:.6f} s)'.format(key, timing['min'], timing['median']))
+
+    stored  = load_results(args.output)
+    machine = stored.get(run['machine_key'], {})
+    baseline_commit = args.baseline or machine.get('baseline')
+    baseline = machine.get('runs', {}).get(baseline_commit)
+
+    save_results(args.output, stored, run, args.save_baseline)
+
+    if baseline is None or baseline_commit == run['key']:
+        print('\nNo baseline to compare with on {}'.format(run['machine_key']))
+        return 0
+
+    regressions = compare(run['results'], baseline['results'], args.threshold)
+    print('\nCompared with {} on {}: {} regressions over {:.0%}'.format(
+        baseline_commit, run['machine_key'], len(regressions), args.threshold))
+    for key, before, after, ratio in regressions:
+        print('  {:<50} {:12.6f} s -> {:12.6f} s  (x{:.2f})'.format(key, before, after, ratio))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+# coding: utf-8
+
+"""
+Cooperative coevolution PSO for problems with hundreds or thousands of variables
+
+A single swarm over n_variables degrades quickly when n grows. pso_cc splits
+the variables into groups and optimizes each group with its own sub-swarm.
+A sub-swarm only moves the variables of its group; to be evaluated, its
+particles are inserted into a shared context vector (the best complete
+solution found so far), and the context takes the best particle of the
+sub-swarm when the latter improves it. One cycle (iteration) moves and
+evaluates every sub-swarm once, all its particles in one call of the
+evaluator (batch objectives receive X of shape (swarm_size, n_variables)).
+
+Groupings of the variables:
+
+    * 'static': consecutive blocks of group_size variables
+    * 'random': random blocks of group_size variables, drawn again every
+      cycle (random regrouping), so interacting variables end up in the same
+      group from time to time
+    * 'differential': groups of interacting variables detected before the
+      optimization by differential grouping (Omidvar et al., 2014). The
+      separable variables are split in blocks of group_size. Detection costs
+      up to about n_variables**2 evaluations (charged to maxFO), evaluated in
+      one batch per variable
+
+The sub-swarms are updated one after the other (each one sees the context
+improved by the previous ones). With synchronous=True the sub-swarms of a
+cycle are evaluated together in a single call against the same context, and
+the improvements of all the groups are then merged into the context.
+"""
+
+import numpy as np
+import sys
+from reporters import make_reporters
+from evaluation import make_evaluator
+from budget import Budget
+
+
+def static_groups(n_variables, group_size):
+    """Consecutive blocks of group_size variables"""
+    return [np.arange(start, min(start + group_size, n_variables))
+            for start in range(0, n_variables, group_size)]
+
+
+def random_groups(n_variables, group_size, rng=None):
+    """Blocks of group_size variables of a random permutation"""
+    permutation = np.random.default_rng(rng).permutation(n_variables)
+    return [np.sort(permutation[start:start + group_size])
+            for start in range(0, n_variables, group_size)]
+
+
+def differential_grouping(evaluate, lb, ub, epsilon=1e-3, group_size=None):
+    """Groups of interacting variables (differential grouping)
+
+    Variables i and j interact when the change of f caused by moving x_i
+    from lb_i to ub_i depends on the value of x_j,
+    |f(x_i', x_j) - f(x_i, x_j) - (f(x_i', x_j') - f(x_i, x_j'))| > epsilon.
+    For every variable all the remaining ones are checked in one batch.
+
+    :param evaluate: function evaluating a (n_points, n_variables) array
+    :param lb, ub: bounds of the variables
+    :param epsilon: interaction threshold
+    :param group_size: size of the blocks of separable variables (None: one
+        block with all of them)
+    :return: list of index arrays, the groups of variables
+    """
+    lb = np.asarray(lb, dtype=float)
+    ub = np.asarray(ub, dtype=float)
+    mid = (lb + ub)/2
+
+    remaining = list(range(lb.size))
+    groups    = []
+    separable = []
+
+    while remaining:
+        i = remaining.pop(0)
+        others = np.array(remaining, dtype=int)
+        m = others.size
+        rows = np.arange(m)
+
+        # * x_l, x_l with x_i = ub_i, x_l with x_j = mid_j, both changes
+        points = np.tile(lb, (2 + 2*m, 1))
+        points[1, i] = ub[i]
+        points[2 + rows, others] = mid[others]
+        points[2 + m + rows, others] = mid[others]
+        points[2 + m:, i] = ub[i]
+
+        f = evaluate(points)
+        delta1 = f[1] - f[0]
+        delta2 = f[2 + m:] - f[2:2 + m]
+
+        interacting = others[np.abs(delta1 - delta2) > epsilon]
+        if interacting.size:
+            groups.append(np.sort(np.concatenate(([i], interacting))))
+            remaining = [j for j in remaining if j not in set(interacting)]
+        else:
+            separable.append(i)
+
+    if separable:
+        separable = np.array(separable)
+        size = group_size or separable.size
+        groups += [separable[start:start + size] for start in range(0, separable.size, size)]
+
+    return groups
+
+
+def pso_cc(objfnc, lb, ub, intVar, grouping='random', group_size=50, **options):
+    """
+    Cooperative coevolution PSO: sub-swarms over groups of variables
+
+    Parameters
+    ----------
+    objfnc: objective function of the n_variables. Batch objectives (see
+        evaluation.py and the batch option) receive the particles of a
+        sub-swarm (or of all of them, synchronous) completed with the
+        context vector, single point objectives are evaluated row by row
+    lb: lower bound (array or list with len()=n_dimensions)
+    ub: upper bound (array or list with len()=n_dimensions)
+    intVar: list containing the indexes for the variables that must be integers
+    grouping: 'static', 'random' (regrouping every cycle), 'differential'
+        or a list of index arrays (fixed groups)
+    group_size: number of variables of each group ('static', 'random' and
+        separable variables of 'differential')
+    options: only these options of pso() are accepted, with the same
+        meaning: swarm_size (of each sub-swarm), maxIter (cycles), maxFO,
+        maxIterNoImprov (cycles), maxTime, inertia_w, acceleration_c1,
+        acceleration_c2, v_max, print_freq, reporters, report_interval,
+        batch, rng, evaluator, n_workers, worker_init and worker_initargs.
+        The other options of pso() (e.g. the tolerances tol_x and tol_fnc,
+        the spread of the sub-swarms says nothing about the context vector)
+        raise TypeError. Own options: epsilon (interaction threshold of the
+        differential grouping) and synchronous (evaluate all the sub-swarms
+        of a cycle in one call)
+
+    Returns: structure containing the results
+        xopt (context vector), FO, exit, iterations (cycles), FO_evaluations,
+        groups (list of index arrays, the last ones used),
+        grouping_evaluations, time_total, time_objective, time_optimizer
+    -------
+
+    """
+
+    #  ----------------- PSO OPTIONS (user inputs) -----------------------------------------
+
+    # * Population size
+    swarm_size = options.pop('swarm_size', 20)       #  number of the particles of each sub-swarm
+
+    # * Termination Conditions
+    maxIter    = options.pop('maxIter', 1000)       #  maximum number of cycles
+    maxFO      = options.pop('maxFO', sys.float_info.max)     #  maximum number of function evaluations
+
+    maxIterNoImprov = options.pop('maxIterNoImprov', sys.maxsize)  # maximum number of cycles without improving the context
+    maxTime         = options.pop('maxTime', sys.float_info.max) # time limit in seconds [s]
+
+    # * PSO parameters
+    inertia_w       = options.pop('inertia_w', 0.72)  # Inertia weight
+    acceleration_c1 = options.pop('acceleration_c1', 1.49)  # Acceleration coefficient (cognitive)
+    acceleration_c2 = options.pop('acceleration_c2', 1.49)  # Acceleration coefficient (social)
+    v_max = options.pop('v_max', 0.07)               # maximum velocity in absolute value
+
+    # * Cooperative coevolution
+    epsilon     = options.pop('epsilon', 1e-3)       # interaction threshold (differential grouping)
+    synchronous = options.pop('synchronous', False)  # all the sub-swarms of a cycle in one call
+
+    # * Algorithm options
+    print_freq = options.pop('print_freq', 10)
+    reporters  = options.pop('reporters', None)     # progress reporters (None: console)
+    report_interval = options.pop('report_interval', 1.0)  # minimum time between reports [s]
+    batch      = options.pop('batch', None)     # objfnc evaluates many particles in one call
+    rng        = options.pop('rng', None)       # numpy Generator or its seed
+
+    # * Evaluation backend
+    evaluator       = options.pop('evaluator', 'serial')  # 'serial', 'thread', 'process' or instance
+    n_workers       = options.pop('n_workers', None)      # workers of the thread/process pools
+    worker_init     = options.pop('worker_init', None)    # objective context of each worker
+    worker_initargs = options.pop('worker_initargs', ())
+
+    if options:
+        raise TypeError('pso_cc() got unexpected options: {} (see the options of its '
+                        'docstring)'.format(', '.join(options)))
+
+    rng = np.random.default_rng(rng)  # Generators are used as given
+
+    reporters, owned_reporters = make_reporters(reporters, print_freq, report_interval)
+
+    evaluator, close_evaluator = make_evaluator(objfnc, evaluator, n_workers, (), batch,
+                                                worker_init, worker_initargs)
+    budget = Budget(maxFO, maxTime)
+    # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>  inputs
+
+
+    # # Pre-processing Operations ##############################################
+    n_variables = np.size(lb) # number variables
+
+    lb = np.array(lb, dtype=float)
+    ub = np.array(ub, dtype=float)
+
+    assert isinstance(intVar, list), "intVar must be a list"
+
+    if intVar:  # if intVar has elements (not empty)
+        assert max(intVar) <= (n_variables-1), "intVar indexes out of range (Python indexing starts at 0)"
+        for i in intVar: assert i >= 0, "Indexes containing int variables must be positive"
+
+        lb[intVar] = lb[intVar] - 0.49
+        ub[intVar] = ub[intVar] + 0.49
+
+    is_int = np.zeros(n_variables, dtype=bool)
+    is_int[intVar] = True
+
+    def evaluate(X):
+        """Fitness of the complete solutions X (n_points, n_variables)"""
+        fval, _ = budget.evaluate(evaluator.evaluate, X, X.shape[0])
+        return fval
+
+    # * Groups of variables
+    grouping_evaluations = 0
+    if isinstance(grouping, str):
+        assert grouping in ('static', 'random', 'differential'), \
+            "grouping must be 'static', 'random', 'differential' or a list of index arrays"
+
+        if grouping == 'static':
+            groups = static_groups(n_variables, group_size)
+        elif grouping == 'random':
+            groups = random_groups(n_variables, group_size, rng)
+        else:
+            groups = differential_grouping(evaluate, lb, ub, epsilon, group_size)
+            grouping_evaluations = budget.evaluations
+    else:
+        groups = [np.asarray(group, dtype=int) for group in grouping]
+        assert np.array_equal(np.sort(np.concatenate(groups)), np.arange(n_variables)), \
+            "groups must contain every variable exactly once"
+
+
+    # #  Initialization #######################################################
+
+    # 02. Initial position and velocity of the particles (all the sub-swarms) -
+    #     column j of x holds variable j of the particles of its sub-swarm
+    x = lb + (ub - lb)*rng.random((swarm_size, n_variables))
+    x[:, is_int] = np.round(x[:, is_int])
+
+    v = np.zeros((swarm_size, n_variables))
+
+    # 04. Context vector: first particle ---------------------------------------
+    context   = np.copy(x[0])
+    context_f = evaluate(context[np.newaxis])[0]
+
+    # 05. Personal bests (fitness of each particle of each sub-swarm) ---------
+    pbest_position = np.copy(x)
+    pbest_fitness  = np.full((len(groups), swarm_size), np.inf)
+
+    iter                     = 1
+    iter_fitness_improvement = 0
+    pworst_fitness           = context_f
+
+    for reporter in reporters:
+        reporter.start(swarm_size, n_variables, intVar)
+        reporter.update(iter, budget.evaluations, context_f, pworst_fitness, 0.0, np.nan)
+
+    while True:
+
+    # * Random regrouping: the personal bests of the old groups are forgotten
+        if grouping == 'random' and iter > 1:
+            groups = random_groups(n_variables, group_size, rng)
+            pbest_fitness[:] = np.inf
+
+        context_f_start = context_f
+        pworst_fitness  = -np.inf
+
+        candidates = []  # sub-swarms evaluated in this call (synchronous)
+
+        for g, group in enumerate(groups):
+
+    # 08. Update velocity of the particles of the sub-swarm -------------------
+            r1, r2 = rng.random((2, swarm_size, group.size))
+
+            x_g = x[:, group]
+            v_g = inertia_w * v[:, group] + \
+                acceleration_c1 * r1 * (pbest_position[:, group] - x_g) + \
+                acceleration_c2 * r2 * (context[group] - x_g)
+
+    # 09. Velocity control ----------------------------------------------------
+            np.clip(v_g, -v_max, v_max, out=v_g)
+
+    # 10-11. Update and control the position ----------------------------------
+            x_g = np.clip(x_g + v_g, lb[group], ub[group])
+            v[:, group] = v_g
+            x[:, group] = x_g
+
+    # 12. Particles of the sub-swarm completed with the context vector --------
+            X = np.tile(context, (swarm_size, 1))
+            X[:, group] = np.where(is_int[group], np.round(x_g), x_g)
+
+            if synchronous:
+                candidates.append((g, group, X))
+                continue
+
+    # 13-14. Evaluation, personal bests and context ---------------------------
+            fval = evaluate(X)
+            context, context_f, fworst = _update(g, group, X, fval, pbest_fitness,
+                                                 pbest_position, context, context_f)
+            pworst_fitness = max(pworst_fitness, fworst)
+
+            if budget.exhausted():
+                break
+
+        if synchronous:  # all the sub-swarms in one call, against the same context
+            fvals = np.split(evaluate(np.concatenate([X for _, _, X in candidates])),
+                             len(candidates))
+
+            merged = np.copy(context)
+            best_f = context_f
+            for (g, group, X), fval in zip(candidates, fvals):
+                group_context, group_f, fworst = _update(g, group, X, fval, pbest_fitness,
+                                                         pbest_position, context, context_f)
+                pworst_fitness = max(pworst_fitness, fworst)
+                if group_f < context_f:
+                    merged[group] = group_context[group]
+                    if group_f < best_f:
+                        best, best_f = group_context, group_f
+
+            if best_f < context_f:  # merge every improvement if the merged vector is better
+                merged_f = evaluate(merged[np.newaxis])[0]
+                context, context_f = (merged, merged_f) if merged_f <= best_f else (best, best_f)
+
+        iter = iter + 1
+
+        if context_f < context_f_start:
+            iter_fitness_improvement = 0
+        else:
+            iter_fitness_improvement = iter_fitness_improvement + 1
+
+    # 15. Print Results -------------------------------------------------------
+        for reporter in reporters:
+            reporter.update(iter, budget.evaluations, context_f, pworst_fitness,
+                            np.abs(pworst_fitness - context_f), np.nan)
+
+    # 17. Check Termination criteria ------------------------------------------
+        if iter >= maxIter:
+            termination = 'Stop due to maximum number of major iterations.'
+            break
+        elif budget.out_of_evaluations():
+            termination = 'Stop due to maximum number of function evaluations.'
+            break
+        elif iter_fitness_improvement >= maxIterNoImprov:
+            termination = 'Number of generations without fitness improvement Reached. The objective function is under specified tolerance'
+            break
+        elif budget.out_of_time():
+            termination = 'The solver was interrupted because it reached the time limit.'
+            break
+
+    for reporter in reporters:
+        reporter.flush()
+    for reporter in owned_reporters:  # the caller's reporters stay open
+        reporter.close()
+
+    if close_evaluator:
+        evaluator.close()
+
+    class Result:
+        pass
+
+    Result.xopt  = np.where(is_int, np.round(context), context)
+    Result.FO    = context_f
+    Result.exit  = termination
+
+    Result.iterations           = iter
+    Result.FO_evaluations       = budget.evaluations
+    Result.groups               = groups
+    Result.grouping_evaluations = grouping_evaluations
+    Result.time_total           = budget.elapsed()
+    Result.time_objective       = budget.objective_time
+    Result.time_optimizer       = Result.time_total - Result.time_objective
+
+    return Result
+
+
+def _update(g, group, X, fval, pbest_fitness, pbest_position, context, context_f):
+    """Personal bests of sub-swarm g and context with its best particle
+
+    :return: (context, context_f, worst fitness of the sub-swarm)
+    """
+    improved = fval < pbest_fitness[g]
+    pbest_fitness[g, improved] = fval[improved]
+    pbest_position[np.ix_(improved, group)] = X[np.ix_(improved, group)]
+
+    ibest = np.argmin(fval)
+    if fval[ibest] < context_f:
+        context = np.copy(context)
+        context[group] = X[ibest, group]
+        context_f = fval[ibest]
+
+    return context, context_f, np.max(fval)
@@ -0,0 +1,284 @@
+# coding: utf-8
+
+"""
+Evaluations-to-target benchmarking of the PSO (COCO/BBOB style)
+
+The cost of an optimization with a process simulator is the number of
+objective evaluations, so this harness measures how many evaluations pso()
+needs to reach a target precision, f(x) - f* <= target, instead of wall time.
+f* and the search domain of each test function are the exact values of
+optitestfuns.OPTIMA (the docstrings show them rounded, which would put the
+smallest targets out of reach).
+
+Every (variant, function, dimension) is run with many seeds. The objective is
+wrapped in a TargetRecorder that counts the evaluations and stores the first
+evaluation at which every target is reached, so the counts are exact even
+when the gbest improves in the middle of an iteration. From the trials:
+
+    * success rate: fraction of the runs reaching the target
+    * ERT (expected running time): evaluations of all the runs (until the
+      target was reached or until the end of the run) divided by the number
+      of successful runs, np.inf when no run succeeded
+    * ECDF: fraction of the (run, target) pairs reached within a budget of
+      evaluations per dimension, for a log-spaced grid of budgets
+
+The runs are independent and spread across processes (jobs).
+
+    python ert.py --functions ackley rastrigin --dims 2 10 --runs 15 --jobs 4 \\
+                  --variant gbest:topology='gbest' --variant ring:topology='ring'
+"""
+
+import argparse
+import ast
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import optitestfuns
+from benchmark import FUNCTIONS, supports
+from pso import pso
+
+TARGETS = (1e1, 1e0, 1e-1, 1e-2, 1e-3, 1e-5)  # precisions f(x) - f*
+
+
+def documented(function):
+    """(f*, lb, ub) of a test function (see optitestfuns.OPTIMA)
+
+    :param function: test function of optitestfuns.py (or its name), also
+        its shifted and rotated variants (same f* and domain)
+    :return: exact optimum f* and bounds of every variable
+    """
+    name = function if isinstance(function, str) else function.__name__
+    if name.endswith('_shifted_rotated'):
+        name = name[:-len('_shifted_rotated')]
+    assert name in optitestfuns.OPTIMA, "No known optimum of {}".format(name)
+
+    f_opt, lower, upper = optitestfuns.OPTIMA[name]
+    return float(f_opt), float(lower), float(upper)
+
+
+class TargetRecorder:
+    """Objective wrapper recording the evaluation at which each target is
+    first reached (single points or batches of points)
+
+    :param function: objective function
+    :param f_opt: optimum of the function
+    :param targets: precisions f(x) - f_opt, in decreasing order
+    """
+
+    def __init__(self, function, f_opt, targets=TARGETS):
+        assert all(np.diff(targets) < 0), "targets must be in decreasing order"
+
+        self.function = function
+        self.f_opt    = f_opt
+        self.targets  = tuple(targets)
+
+        self.evaluations = 0
+        self.best        = np.inf                # best fitness so far
+        self.hits        = [None]*len(targets)   # evaluations to reach each target
+        self.n_hits      = 0                     # targets reached
+
+    def __call__(self, x):
+        f = self.function(x)
+
+        if np.ndim(x) == 1:
+            self.evaluations += 1
+            if f < self.best:
+                self._improved(f, self.evaluations)
+            return f
+
+        # * Batch: best so far after every point of the batch, in row order
+        best = np.minimum.accumulate(np.minimum(f, self.best))
+        for target in self.targets[self.n_hits:]:
+            reached = np.flatnonzero(best - self.f_opt <= target)
+            if reached.size == 0:
+                break
+            self.hits[self.n_hits] = self.evaluations + int(reached[0]) + 1
+            self.n_hits += 1
+
+        self.evaluations += len(f)
+        self.best = min(self.best, best[-1])
+        return f
+
+    def _improved(self, f, evaluation):
+        self.best = f
+        while self.n_hits < len(self.targets) and f - self.f_opt <= self.targets[self.n_hits]:
+            self.hits[self.n_hits] = evaluation
+            self.n_hits += 1
+
+
+def run_trial(task):
+    """One pso() run of task = (variant, options, function, n, seed, budget,
+    targets); returns the trial dict (picklable, used by the worker processes)"""
+    variant, options, name, n, seed, budget, targets = task
+
+    f_opt, lower, upper = documented(name)
+    recorder = TargetRecorder(getattr(optitestfuns, name), f_opt, targets)
+
+    options = dict(options)
+    if options.get('engine') == 'swarm':
+        options.setdefault('batch', True)  # the test functions accept batches
+    options.setdefault('v_max', 0.1*(upper - lower))
+
+    result = pso(recorder, [lower]*n, [upper]*n, [], maxFO=budget, rng=seed,
+                 reporters=[], history=False, **options)
+
+    return {'variant':     variant,
+            'function':    name,
+            'n':           n,
+            'seed':        seed,
+            'evaluations': recorder.evaluations,
+            'hits':        recorder.hits,
+            'precision':   float(result.FO - f_opt),
+            'exit':        result.exit.strip()}
+
+
+def run_experiment(variants=None, functions=FUNCTIONS, dimensions=(2, 10), n_runs=15,
+                   budget_per_dimension=1000, targets=TARGETS, jobs=None, seed=0):
+    """Runs every variant over functions x dimensions with n_runs seeds
+
+    :param variants: dict {name: pso options} of the compared configurations
+        (default: pso() with its default options)
+    :param budget_per_dimension: maxFO of every run divided by the dimension
+    :param targets: precisions in decreasing order (the order of the hits)
+    :param jobs: worker processes (None: one per core, 1: serial)
+    :param seed: seed of the SeedSequence of the runs, run i of every
+        variant/function/dimension uses its i-th spawned seed
+    :return: list of trial dicts (see run_trial)
+    """
+    variants = variants or {'pso': {}}
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n_runs)]
+
+    tasks = [(variant, options, name, n, run_seed, budget_per_dimension*n, tuple(targets))
+             for variant, options in variants.items()
+             for name in functions
+             for n in dimensions if supports(name, n, known_optimum=True)
+             for run_seed in seeds]
+
+    jobs = jobs or os.cpu_count()
+    if jobs == 1:
+        return [run_trial(task) for task in tasks]
+
+    with ProcessPoolExecutor(jobs) as executor:
+        return list(executor.map(run_trial, tasks, chunksize=max(1, len(tasks) // (4*jobs))))
+
+
+def _groups(trials):
+    """{(variant, function, n): [trials]} in the order of the experiment"""
+    groups = {}
+    for trial in trials:
+        groups.setdefault((trial['variant'], trial['function'], trial['n']), []).append(trial)
+    return groups
+
+
+def ert(trials, target_index):
+    """(ERT, success rate) of the trials for the target_index-th target"""
+    successes   = [trial['hits'][target_index] for trial in trials
+                   if trial['hits'][target_index] is not None]
+    evaluations = sum(successes) + sum(trial['evaluations'] for trial in trials
+                                       if trial['hits'][target_index] is None)
+
+    ert = evaluations / len(successes) if successes else np.inf
+    return ert, len(successes) / len(trials)
+
+
+def summary(trials, targets=TARGETS):
+    """{(variant, function, n): {'ert': [...], 'success_rate': [...]}} per target"""
+    table = {}
+    for key, group in _groups(trials).items():
+        values = [ert(group, i) for i in range(len(targets))]
+        table[key] = {'ert':          [value for value, _ in values],
+                      'success_rate': [rate for _, rate in values],
+                      'runs':         len(group)}
+    return table
+
+
+def ecdf(trials, n_budgets=50):
+    """Runtime ECDF of every variant (all functions, dimensions and targets)
+
+    :return: {variant: (budgets, fraction)} with budgets the log-spaced
+        evaluations per dimension and fraction the proportion of (run,
+        target) pairs reached within that budget
+    """
+    max_budget = max(trial['evaluations'] / trial['n'] for trial in trials)
+    budgets = np.logspace(0, np.log10(max(max_budget, 1)), n_budgets)
+
+    curves = {}
+    for variant in dict.fromkeys(trial['variant'] for trial in trials):
+        runtimes = np.array([np.inf if hit is None else hit / trial['n']
+                             for trial in trials if trial['variant'] == variant
+                             for hit in trial['hits']])
+        runtimes.sort()
+        curves[variant] = (budgets, np.searchsorted(runtimes, budgets, side='right') / runtimes.size)
+
+    return curves
+
+
+def format_table(trials, targets=TARGETS):
+    """Comparison table: ERT (successful runs/runs) per function, dimension,
+    variant and target"""
+    lines = ['{:<12} {:>5} {:<12}'.format('function', 'n', 'variant') +
+             ''.join('{:>18}'.format('{:.0e}'.format(target)) for target in targets)]
+
+    for (variant, name, n), row in sorted(summary(trials, targets).items(),
+                                          key=lambda item: (item[0][1], item[0][2])):
+        cells = ['{:.4g} ({}/{})'.format(value, round(rate*row['runs']), row['runs'])
+                 for value, rate in zip(row['ert'], row['success_rate'])]
+        lines.append('{:<12} {:>5} {:<12}'.format(name, n, variant) +
+                     ''.join('{:>18}'.format(cell) for cell in cells))
+
+    return '\n'.join(lines)
+
+
+def _variant(text):
+    """'name:key=value,key=value' -> (name, options), values as Python literals"""
+    name, _, assignments = text.partition(':')
+    options = {}
+    for assignment in filter(None, assignments.split(',')):
+        key, _, value = assignment.partition('=')
+        try:
+            options[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[key] = value
+    return name, options
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluations-to-target (ERT) benchmarking of pso()')
+    parser.add_argument('--functions', nargs='+', default=list(FUNCTIONS), choices=FUNCTIONS)
+    parser.add_argument('--dims', nargs='+', type=int, default=[2, 10])
+    parser.add_argument('--runs', type=int, default=15, help='seeds per function and dimension')
+    parser.add_argument('--budget', type=int, default=1000, help='evaluations per dimension')
+    parser.add_argument('--targets', nargs='+', type=float, default=list(TARGETS))
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--variant', action='append', type=_variant, default=[],
+                        help="compared configuration, name:option=value,option=value")
+    parser.add_argument('--output', default=None, help='JSON file with the trials, table and ECDF')
+    args = parser.parse_args(argv)
+
+    targets = sorted(args.targets, reverse=True)
+    trials = run_experiment(dict(args.variant) or None, args.functions, args.dims, args.runs,
+                            args.budget, targets, args.jobs, args.seed)
+
+    print(format_table(trials, targets))
+
+    if args.output:
+        table = summary(trials, targets)
+        with open(args.output, 'w') as file:
+            json.dump({'targets': targets,
+                       'trials':  trials,
+                       'summary': [dict(variant=variant, function=name, n=n, **row)
+                                   for (variant, name, n), row in table.items()],
+                       'ecdf':    {variant: {'budgets': budgets.tolist(), 'fraction': fraction.tolist()}
+                                   for variant, (budgets, fraction) in ecdf(trials).items()}},
+                      file, indent=1)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
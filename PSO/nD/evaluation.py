@@ -0,0 +1,249 @@
+"""
+Objective function evaluation for the PSO algorithm
+
+Two contracts are supported for the objective function:
+
+    * single point (default): objfnc(x) receives a 1D array with the
+      n_variables of one particle and returns its fitness value
+
+    * batch: objfnc(X) receives a 2D array of shape (n_points, n_variables),
+      one particle per row, and returns an array with the n_points fitness
+      values. Objectives opt in with the batch_objective decorator or with
+      the batch option of pso()
+
+The algorithms evaluate the particles through an evaluator (below), which
+calls single point objectives row by row for a batch of particles and batch
+objectives with a batch of one row for a single particle.
+
+Evaluation backends spread the evaluations of a swarm across workers and
+return the fitness values in particle order:
+
+    * SerialEvaluator: one particle after another in the calling process
+    * ThreadPoolEvaluator: n_workers threads (objectives releasing the GIL,
+      e.g. COM/simulator calls or NumPy heavy functions)
+    * ProcessPoolEvaluator: n_workers processes (black box objectives). The
+      objective function must be picklable (defined at module level)
+
+Evaluators also accept single particles, evaluate_one(x) and submit(x), the
+latter returning a concurrent.futures.Future for asynchronous algorithms.
+
+Each worker has its own objective context: when an initializer is given, it
+is called once per worker, initializer(*initargs), and its return value is
+passed to the objective as its last argument, objfnc(x, context). This is
+the place to open one simulator connection per worker.
+"""
+
+import numpy as np
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def batch_objective(function):
+    """Decorator marking an objective function as a batch objective
+
+    @batch_objective
+    def sphere(X):
+        return np.sum(X**2, axis=1)
+    """
+    function.batch = True
+    return function
+
+
+def is_batch(objfnc):
+    """Returns True if objfnc has been marked as a batch objective"""
+    return getattr(objfnc, 'batch', False) is True
+
+
+# # Evaluation backends ###################################################
+
+_worker = threading.local()  # objective function and context of each worker
+
+
+def _init_worker(objfnc, args, batch, initializer, initargs):
+    """Initializes the objective context of the current worker"""
+    if initializer is not None:
+        args = tuple(args) + (initializer(*initargs),)
+
+    _worker.objfnc = objfnc
+    _worker.args   = tuple(args)
+    _worker.batch  = batch
+
+
+def _evaluate_chunk(X):
+    """Evaluates a (n_points, n_variables) chunk of positions in the worker"""
+    objfnc = _worker.objfnc
+    args   = _worker.args
+
+    if _worker.batch:
+        return np.asarray(objfnc(X, *args), dtype=float)
+
+    return np.fromiter((objfnc(x, *args) for x in X), dtype=float, count=X.shape[0])
+
+
+def _evaluate_point(x):
+    """Evaluates the 1D position of a single particle in the worker"""
+    if _worker.batch:
+        return float(_worker.objfnc(x[np.newaxis, :], *_worker.args)[0])
+
+    return _worker.objfnc(x, *_worker.args)
+
+
+class SerialEvaluator:
+    """Evaluates the particles one after another in the calling process
+
+    :param objfnc: objective function (single point or batch)
+    :param args: extra arguments passed to objfnc after the position
+    :param batch: True if objfnc follows the batch contract (None: autodetect)
+    :param initializer: optional function returning the objective context
+    :param initargs: arguments of initializer
+    """
+
+    n_workers = 1
+
+    def __init__(self, objfnc, args=(), batch=None, initializer=None, initargs=()):
+        if batch is None:
+            batch = is_batch(objfnc)
+
+        self.objfnc      = objfnc
+        self.args        = tuple(args)
+        self.batch       = batch
+        self.initializer = initializer
+        self.initargs    = tuple(initargs)
+        self.context     = None
+
+    def _args(self):
+        if self.initializer is None:
+            return self.args
+
+        if self.context is None:
+            self.context = (self.initializer(*self.initargs),)
+        return self.args + self.context
+
+    def evaluate(self, X):
+        """Returns the fitness values of the rows of X"""
+        args = self._args()
+
+        if self.batch:
+            fval = np.asarray(self.objfnc(X, *args), dtype=float)
+            assert fval.shape == (X.shape[0],), \
+                "Batch objective must return one fitness value per row"
+            return fval
+
+        return np.fromiter((self.objfnc(x, *args) for x in X), dtype=float, count=X.shape[0])
+
+    def evaluate_one(self, x):
+        """Returns the fitness value of the 1D position x"""
+        if self.batch:
+            return self.evaluate(x[np.newaxis, :])[0]
+
+        return self.objfnc(x, *self._args())
+
+    def submit(self, x):
+        """Evaluates x and returns it as a completed Future"""
+        future = Future()
+        try:
+            future.set_result(self.evaluate_one(x))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+    def close(self):
+        self.context = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _PoolEvaluator(SerialEvaluator):
+    """Base class of the evaluators based on concurrent.futures executors
+
+    :param n_workers: number of workers (threads or processes)
+    :param chunksize: particles sent to a worker per task. Defaults to 1 for
+        single point objectives (best load balance for slow simulators) and
+        to an even split of the swarm among the workers for batch objectives
+    """
+
+    Executor = None
+
+    def __init__(self, objfnc, n_workers=None, args=(), batch=None,
+                 initializer=None, initargs=(), chunksize=None):
+        super().__init__(objfnc, args, batch, initializer, initargs)
+
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.executor  = self.Executor(max_workers=self.n_workers,
+                                       initializer=_init_worker,
+                                       initargs=(objfnc, self.args, self.batch,
+                                                 initializer, self.initargs))
+
+    def evaluate(self, X):
+        """Returns the fitness values of the rows of X (in particle order)"""
+        n_points = X.shape[0]
+
+        chunksize = self.chunksize
+        if chunksize is None:
+            chunksize = -(-n_points // self.n_workers) if self.batch else 1
+
+        X = np.ascontiguousarray(X)
+        futures = [self.executor.submit(_evaluate_chunk, X[i:i + chunksize])
+                   for i in range(0, n_points, chunksize)]
+
+        fval = np.concatenate([future.result() for future in futures])
+        assert fval.shape == (n_points,), \
+            "Batch objective must return one fitness value per row"
+        return fval
+
+    def evaluate_one(self, x):
+        """Returns the fitness value of the 1D position x"""
+        return self.submit(x).result()
+
+    def submit(self, x):
+        """Starts the evaluation of the 1D position x and returns its Future"""
+        return self.executor.submit(_evaluate_point, x)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class ThreadPoolEvaluator(_PoolEvaluator):
+    """Evaluates the particles in a pool of n_workers threads"""
+
+    Executor = ThreadPoolExecutor
+
+
+class ProcessPoolEvaluator(_PoolEvaluator):
+    """Evaluates the particles in a pool of n_workers processes"""
+
+    Executor = ProcessPoolExecutor
+
+
+EVALUATORS = {'serial':  SerialEvaluator,
+              'thread':  ThreadPoolEvaluator,
+              'process': ProcessPoolEvaluator}
+
+
+def make_evaluator(objfnc, evaluator='serial', n_workers=None, args=(), batch=None,
+                   initializer=None, initargs=()):
+    """Returns an evaluation backend for objfnc
+
+    :param evaluator: 'serial', 'thread', 'process' or an evaluator instance
+        (returned unchanged)
+    :param n_workers: number of workers of the thread and process pools
+        (None: number of processors)
+    :return: (evaluator, owned) where owned is True when the evaluator has
+        been created here and must be closed by the caller
+    """
+    if not isinstance(evaluator, str):
+        return evaluator, False
+
+    assert evaluator in EVALUATORS, \
+        "evaluator must be one of {}".format(', '.join(EVALUATORS))
+
+    if evaluator == 'serial':
+        return SerialEvaluator(objfnc, args, batch, initializer, initargs), True
+
+    return EVALUATORS[evaluator](objfnc, n_workers, args, batch, initializer, initargs), True
@@ -0,0 +1,290 @@
+# coding: utf-8
+
+"""
+Multi-swarm engine: many independent PSO runs as one NumPy pipeline
+
+Statistics and restarts need dozens of independent runs of pso(). Instead of
+a Python loop over the runs, pso_multiswarm holds the K swarms in tensors of
+shape (n_swarms, swarm_size, n_variables), moves all of them with one
+vectorized step per iteration and evaluates the particles of every swarm
+still running in one call of the batch objective, X of shape
+(n_running*swarm_size, n_variables).
+
+Every swarm follows the synchronous PSO of pso(engine='swarm') (worst
+particle rule included) and has its own termination: when a swarm stops its
+result is stored and the swarm is dropped from the tensors, so finished
+swarms are neither moved nor evaluated any more.
+"""
+
+import numpy as np
+import sys
+from reporters import make_reporters
+from evaluation import make_evaluator
+from budget import Budget
+
+
+def pso_multiswarm(objfnc, lb, ub, intVar, n_swarms=10, **options):
+    """
+    Runs n_swarms independent PSO (gbest) minimizations of objfnc at once
+
+    Parameters
+    ----------
+    objfnc: objective function. Batch objectives (see evaluation.py and the
+        batch option) receive the particles of all the running swarms in one
+        call; single point objectives are evaluated row by row
+    lb: lower bound (array or list with len()=n_dimensions)
+    ub: upper bound (array or list with len()=n_dimensions)
+    intVar: list containing the indexes for the variables that must be integers
+    n_swarms: number of independent swarms (K)
+    options: same meaning and defaults as in pso() (swarm_size, maxIter,
+        maxFO, maxIterNoImprov, maxTime, tol_x, tol_fnc, inertia_w,
+        acceleration_c1, acceleration_c2, v_max, break_coeff,
+        Red_acceleration_c1, print_freq, reporters, report_interval, batch,
+        rng, evaluator, n_workers, worker_init, worker_initargs). The termination criteria are checked
+        per swarm at the end of every iteration (maxFO in multiples of
+        swarm_size); maxTime stops every swarm still running. Reporters
+        receive the best gbest, worst pworst and smallest errors of the
+        swarms still running
+
+    Returns: list with the n_swarms results, each one with the fields of the
+        pso() result (xopt, FO, exit, iterations, FO_evaluations, time_total)
+        plus swarm (index of the swarm). time_objective and time_optimizer
+        are the times of the whole multi-swarm run
+    -------
+
+    """
+
+    #  ----------------- PSO OPTIONS (user inputs) -----------------------------------------
+
+    # * Population size
+    swarm_size = options.pop('swarm_size', 20)       #  number of the particles of each swarm
+
+    # * Termination Conditions (per swarm)
+    maxIter    = options.pop('maxIter', 1000)       #  maximum number of iterations
+    maxFO      = options.pop('maxFO', sys.float_info.max)     #  maximum number of function evaluations
+
+    maxIterNoImprov = options.pop('maxIterNoImprov', sys.maxsize)  # maximum number of iterations without improving the objective function
+    maxTime         = options.pop('maxTime', sys.float_info.max) # time limit of the whole run in seconds [s]
+
+    tol_x   = options.pop('tol_x', 1e-5)          # tolerance in x (norm 2)
+    tol_fnc = options.pop('tol_fnc', 1e-5)          # tolerance in objective function
+
+    # * PSO parameters
+    inertia_w       = options.pop('inertia_w', 0.72)  # Inertia weight
+    acceleration_c1 = options.pop('acceleration_c1', 1.49)  # Acceleration coefficient (cognitive)
+    acceleration_c2 = options.pop('acceleration_c2', 1.49)  # Acceleration coefficient (social)
+    v_max = options.pop('v_max', 0.07)               # maximum velocity in absolute value
+    break_coeff = options.pop('break_coeff', 0.05)      # break  # stops while loop factor for the worst particle
+    Red_acceleration_c1 = options.pop('Red_acceleration_c1', 2) # Reduction factor of acceleration c1 coefficient for the worst particle
+
+    # * Algorithm options
+    print_freq = options.pop('print_freq', 10)
+    reporters  = options.pop('reporters', None)     # progress reporters (None: console)
+    report_interval = options.pop('report_interval', 1.0)  # minimum time between reports [s]
+    batch      = options.pop('batch', None)     # objfnc evaluates many particles in one call
+    rng        = options.pop('rng', None)       # numpy Generator or its seed
+
+    # * Evaluation backend
+    evaluator       = options.pop('evaluator', 'serial')  # 'serial', 'thread', 'process' or instance
+    n_workers       = options.pop('n_workers', None)      # workers of the thread/process pools
+    worker_init     = options.pop('worker_init', None)    # objective context of each worker
+    worker_initargs = options.pop('worker_initargs', ())
+
+    if options:
+        raise TypeError('pso_multiswarm() got unexpected options: {}'.format(', '.join(options)))
+
+    assert n_swarms >= 1, "n_swarms must be a positive integer"
+
+    rng = np.random.default_rng(rng)  # Generators are used as given
+
+    reporters, owned_reporters = make_reporters(reporters, print_freq, report_interval)
+
+    evaluator, close_evaluator = make_evaluator(objfnc, evaluator, n_workers, (), batch,
+                                                worker_init, worker_initargs)
+    budget = Budget(np.inf, maxTime)
+    # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>  inputs
+
+
+    # # Pre-processing Operations ##############################################
+    n_variables = np.size(lb) # number variables
+
+    lb = np.array(lb, dtype=float)
+    ub = np.array(ub, dtype=float)
+
+    assert isinstance(intVar, list), "intVar must be a list"
+
+    if intVar:  # if intVar has elements (not empty)
+        assert max(intVar) <= (n_variables-1), "intVar indexes out of range (Python indexing starts at 0)"
+        for i in intVar: assert i >= 0, "Indexes containing int variables must be positive"
+
+        lb[intVar] = lb[intVar] - 0.49
+        ub[intVar] = ub[intVar] + 0.49
+
+    def evaluate(x):
+        """Fitness (n_running, swarm_size) of the particles x (n_running, swarm_size, n_variables)"""
+        X = x.reshape(-1, n_variables)
+        fval, _ = budget.evaluate(evaluator.evaluate, X, X.shape[0])
+        return fval.reshape(x.shape[:2])
+
+
+    # #  Initialization #######################################################
+    shape = (n_swarms, swarm_size, n_variables)
+
+    # 02. Initial position and velocity of the particles ----------------------
+    x = lb + (ub - lb)*rng.random(shape)
+    x[..., intVar] = np.round(x[..., intVar])
+
+    v = np.zeros(shape)
+
+    # 04. Evaluation of each particle -----------------------------------------
+    fval = evaluate(x)
+
+    # 05. Personal bests and global best of each swarm ------------------------
+    swarm = np.arange(n_swarms)  # index of the swarms still running
+
+    pbest_position = np.copy(x)
+    pbest_fitness  = np.copy(fval)
+
+    gbest_ind      = np.nanargmin(fval, axis=1)
+    gbest_fitness  = fval[swarm, gbest_ind]
+    gbest_position = x[swarm, gbest_ind]
+
+    iter                     = 1
+    iter_fitness_improvement = np.zeros(n_swarms, dtype=int)
+
+    results = [None]*n_swarms
+
+    # * Work arrays of the vectorized update
+    cognitive = np.empty(shape)
+    social    = np.empty(shape)
+
+    while True:
+
+    # 06. Worst particle and errors of each swarm -----------------------------
+        pworst_ind      = np.nanargmax(pbest_fitness, axis=1)
+        pworst_fitness  = pbest_fitness[np.arange(swarm.size), pworst_ind]
+        pworst_position = pbest_position[np.arange(swarm.size), pworst_ind]
+
+        error_x   = np.linalg.norm(pworst_position - gbest_position, 2, axis=1)
+        error_fnc = np.abs(pworst_fitness - gbest_fitness)
+
+        for reporter in reporters:
+            if iter == 1:
+                reporter.start(swarm_size, n_variables, intVar)
+            reporter.update(iter, budget.evaluations, np.min(gbest_fitness), np.max(pworst_fitness),
+                            np.min(error_fnc), np.min(error_x))
+
+    # 07. Check Termination criteria of each swarm ----------------------------
+        termination = np.full(swarm.size, None, dtype=object)
+        termination[error_x <= tol_x]   = ' The tolerance between best and worse particles is under specification'
+        termination[error_fnc <= tol_fnc] = ' The objective function is under specified tolerance '
+        if budget.out_of_time():
+            termination[:] = 'The solver was interrupted because it reached the time limit.'
+        termination[iter_fitness_improvement >= maxIterNoImprov] = \
+            'Number of generations without fitness improvement Reached. The objective function is under specified tolerance'
+        if iter*swarm_size >= maxFO:
+            termination[:] = 'Stop due to maximum number of function evaluations.'
+        if iter >= maxIter:
+            termination[:] = 'Stop due to maximum number of major iterations.'
+
+        stopped = termination != None
+
+        for k in np.flatnonzero(stopped):
+            class Result:
+                pass
+
+            Result.swarm = int(swarm[k])
+            Result.xopt  = gbest_position[k]
+            Result.FO    = gbest_fitness[k]
+            Result.exit  = termination[k]
+
+            Result.iterations     = iter
+            Result.FO_evaluations = iter*swarm_size
+            Result.time_total     = budget.elapsed()
+
+            results[swarm[k]] = Result
+
+        if stopped.all():
+            break
+
+    # * Drop the swarms that have finished
+        if stopped.any():
+            running = ~stopped
+
+            swarm, x, v = swarm[running], x[running], v[running]
+            pbest_position, pbest_fitness = pbest_position[running], pbest_fitness[running]
+            gbest_position, gbest_fitness = gbest_position[running], gbest_fitness[running]
+            pworst_ind = pworst_ind[running]
+            iter_fitness_improvement = iter_fitness_improvement[running]
+
+            cognitive, social = cognitive[:swarm.size], social[:swarm.size]
+
+        n_running = swarm.size
+        rows      = np.arange(n_running)
+
+    # 08. Update velocity for all particles of all swarms ---------------------
+        r1, r2 = rng.random((2, n_running, swarm_size, n_variables))  # one call for all the swarms
+
+        np.subtract(pbest_position, x, out=cognitive)
+        cognitive *= r1
+        np.subtract(gbest_position[:, np.newaxis, :], x, out=social)
+        social *= r2
+
+        v_new  = inertia_w * v
+        v_new += acceleration_c1 * cognitive
+        v_new += acceleration_c2 * social
+
+        if iter > 1:
+            v_new[rows, pworst_ind] = break_coeff * inertia_w * v[rows, pworst_ind] + \
+                acceleration_c1 * cognitive[rows, pworst_ind]/Red_acceleration_c1 + \
+                acceleration_c2 * social[rows, pworst_ind]
+
+    # 09. Velocity control ----------------------------------------------------
+        np.clip(v_new, -v_max, v_max, out=v_new)
+
+    # 10. Update position for all particles -----------------------------------
+        x += v_new
+        v  = v_new
+
+    # 11. Position control ----------------------------------------------------
+        np.clip(x, lb, ub, out=x)
+
+    # 12. Round integer variables to the nearest integer ----------------------
+        if intVar:
+            x_eval = np.copy(x)
+            x_eval[..., intVar] = np.round(x_eval[..., intVar])
+        else:
+            x_eval = x
+
+    # 13. Function evaluation & update personal best particle (pbest) so far --
+        fval = evaluate(x_eval)
+
+        improved = fval < pbest_fitness
+        pbest_fitness[improved]  = fval[improved]
+        pbest_position[improved] = x_eval[improved]
+
+    # 14. Update global best particle (gbest) of each swarm -------------------
+        ibest    = np.nanargmin(pbest_fitness, axis=1)
+        best     = pbest_fitness[rows, ibest]
+        improved = best < gbest_fitness
+
+        gbest_fitness  = np.where(improved, best, gbest_fitness)
+        gbest_position = np.where(improved[:, np.newaxis], pbest_position[rows, ibest], gbest_position)
+
+        iter_fitness_improvement = np.where(improved, 0, iter_fitness_improvement + swarm_size)
+
+        iter = iter + 1
+
+    for reporter in reporters:
+        reporter.flush()
+    for reporter in owned_reporters:  # the caller's reporters stay open
+        reporter.close()
+
+    if close_evaluator:
+        evaluator.close()
+
+    for Result in results:
+        Result.time_objective = budget.objective_time
+        Result.time_optimizer = budget.elapsed() - budget.objective_time
+
+    return results
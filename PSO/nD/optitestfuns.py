@@ -1,174 +1,384 @@
+"""
+Test functions for optimization
+
+All the functions accept either a single point or a batch of points:
+    x = 1D array or list with the n independent variables (or a number,
+        one variable) -> returns a float
+    x = 2D array of shape (n_points, n) -> returns an array of n_points values
+
+The optional argument work receives preallocated buffers (see workspace) so
+repeated calls with batches of the same shape do not allocate temporaries.
+
+shifted_rotated returns CEC-style variants of ackley, rastrigin, griewangk,
+schwefel and rana whose optimum is moved away from the origin (or the axis
+aligned point) and whose variables are coupled by a random rotation (with
+the rotated points kept inside the domain of the function).
+"""
+
+import os
+import zlib
 import numpy as np
 import matplotlib.pyplot as plt
 
 
-def ackley(x):
+def workspace(shape, n_arrays=4):
+    """Preallocated buffers for the test functions
+
+    Params:
+    shape = shape of the points to be evaluated, (n,) or (n_points, n)
+    n_arrays = number of buffers (4 is enough for every function)
+    returns work = array of shape (n_arrays, *shape)
+    """
+
+    return np.empty((n_arrays,) + tuple(shape))
+
+
+def _buffers(x, work, n_arrays):
+    """Returns work after checking its shape, or n_arrays new buffers (only
+    the number the function uses) when no work buffers are given"""
+
+    if work is None:
+        return workspace(x.shape, n_arrays)
+
+    assert work.shape[1:] == x.shape, "Error: work buffers do not match the shape of x"
+    return work
+
+
+def ackley(x, work=None):
     """Ackley n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
     f(x_i*) = y = 0  (i dimensions)
     x_i* = 0
-    
+
     -30 <= x_i <= 30
     """
-    
 
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
 
-    y = -20 * np.exp(-0.2 * (1 / n * np.sum(x ** 2)) ** 0.5) + \
-        -np.exp(1 / n * np.sum(np.cos(2 * np.pi * x))) + 20 + np.exp(1)
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    n = x.shape[-1]  # n-dimensions of the vector
+    w = _buffers(x, work, 1)
+
+    sum_x2 = np.sum(np.square(x, out=w[0]), axis=-1)
+    sum_cos = np.sum(np.cos(np.multiply(2 * np.pi, x, out=w[0]), out=w[0]), axis=-1)
+
+    y = -20 * np.exp(-0.2 * (1 / n * sum_x2) ** 0.5) + \
+        -np.exp(1 / n * sum_cos) + 20 + np.exp(1)
 
     return y
 
 
-def griewangk(x):
+def griewangk(x, work=None):
     """Griewank n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
     f(x_i*) = y = 0  (i dimensions)
     x_i* = 0
-    
+
     -100 <= x_i <= 100
     """
 
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    n = x.shape[-1]  # n-dimensions of the vector
     j = np.arange(n)
-    
-    y = 1/4000 * np.sum(x**2) - np.prod(np.cos(x/(j + 1)**0.5)) + 1
+    w = _buffers(x, work, 1)
+
+    sum_x2 = np.sum(np.square(x, out=w[0]), axis=-1)
+    prod_cos = np.prod(np.cos(np.divide(x, (j + 1)**0.5, out=w[0]), out=w[0]), axis=-1)
+
+    y = 1/4000 * sum_x2 - prod_cos + 1
 
     return y
 
-def rastrigin(x):
+def rastrigin(x, work=None):
     """Rastrigin n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
     f(x_i*) = y = 0  (i dimensions)
     x_i* = 0
-    
+
     -5.12 <= x_i <= 5.12
     """
 
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
-    
-    y = np.sum(x**2 - 10*np.cos(2*np.pi*x)+10)
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    w = _buffers(x, work, 2)
+
+    # x**2 - 10*cos(2*pi*x) + 10
+    np.multiply(2 * np.pi, x, out=w[0])
+    np.cos(w[0], out=w[0])
+    w[0] *= 10
+    np.square(x, out=w[1])
+    w[1] -= w[0]
+    w[1] += 10
+
+    y = np.sum(w[1], axis=-1)
 
     return y
 
-def salomon(x):
+def salomon(x, work=None):
     """Salomon n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
     f(x_i*) = y = 0  (i dimensions)
     x_i* = 0
-    
+
     -100 <= x_i <= 100
     """
 
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
-    
-    x_norm = np.sqrt(np.sum(x**2))
-    
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    w = _buffers(x, work, 1)
+
+    x_norm = np.sqrt(np.sum(np.square(x, out=w[0]), axis=-1))
+
     y = -np.cos(2*np.pi*x_norm) + 0.1*x_norm+1
 
     return y
 
-def odd_square(x):
+def odd_square(x, work=None):
     """Whitley n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
-    f(x_i*) = y = -1.14383  (i dimensions)
+    f(x_i*) = y = -1.0084673  (i dimensions)
     x_i* = many solutions near b
-    
+
     -5*pi <= x_i <= 5*pi
     """
-    
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
-    
+
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    n = x.shape[-1]  # n-dimensions of the vector
+
     assert n<=10, "Error: more than 10 dimensions were given, you need to modify function params to run"
     b = np.array([1, 1.3, 0.8, -0.4, -1.3, 1.6, -0.2, -0.6, 0.5, 1.4,
                   1, 1.3, 0.8, -0.4, -1.3, 1.6, -0.2, -0.6, 0.5, 1.4])
-    
+
     b = b[0:n]
-    
-    d = n*np.max((x-b)**2)
-    h = np.sum((x-b)**2)
-        
+    w = _buffers(x, work, 1)
+
+    dist2 = np.square(np.subtract(x, b, out=w[0]), out=w[0])  # (x-b)**2
+
+    d = n*np.max(dist2, axis=-1)
+    h = np.sum(dist2, axis=-1)
+
     y = -np.exp(-d/(2*np.pi))*np.cos(np.pi*d)*(1 + (0.02*h)/(d+0.01))
 
     return y
 
-def schwefel(x):
+def schwefel(x, work=None):
     """Schwefel n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
-    f(x_i*) = y = -418.983 (i dimensions)
+    f(x_i*) = y = -418.98289 (i dimensions)
     x_i* = 420.968746
-    
+
     -500 <= x_i <= 500
     """
 
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
-    
-    y = -1/n*np.sum(x*np.sin(np.sqrt(np.abs(x))))
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    n = x.shape[-1]  # n-dimensions of the vector
+    w = _buffers(x, work, 1)
+
+    # x*sin(sqrt(|x|))
+    np.abs(x, out=w[0])
+    np.sqrt(w[0], out=w[0])
+    np.sin(w[0], out=w[0])
+    w[0] *= x
+
+    y = -1/n*np.sum(w[0], axis=-1)
 
     return y
 
-def rana(x):
+def rana(x, work=None):
     """Rana n-dimensional function
 
     Params:
     x =  numpy array or list containing the independent variables
+    work = optional preallocated buffers (see workspace)
     returns y = objective function value
-    
+
     Best solution:
-    f(x_i*) = y = -511.708 (i dimensions)
+    f(x_i*) = y = -511.99858 (2 dimensions)
     x_i* = -512
-    
+
     -512 <= x_i <= 512
     """
 
-    x = np.array(x)  # converts list to numpy array
-    n = x.size  # n-dimensions of the vector
+    x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+    n = x.shape[-1]  # n-dimensions of the vector
     assert n>=2, "Error: Rana function requires at least 2D"
-    
-    #import pdb; pdb.set_trace()
-    
-    x_j = x[:-1]
-    x_j1 = x[1:]
-    alpha = np.sqrt(np.abs(x_j1+1-x_j))
-    beta = np.sqrt(np.abs(x_j1+1+x_j))
-    
-    fo = np.sum(x_j*np.sin(alpha)*np.cos(beta)+x_j1*np.cos(alpha)*np.sin(beta))
+    w = _buffers(x, work, 4)
+
+    x_j = x[..., :-1]
+    x_j1 = x[..., 1:]
+
+    # alpha = sqrt(|x_j1 + 1 - x_j|) and beta = sqrt(|x_j1 + 1 + x_j|)
+    alpha = np.add(x_j1, 1, out=w[0][..., :-1])
+    alpha -= x_j
+    np.sqrt(np.abs(alpha, out=alpha), out=alpha)
+    beta = np.add(x_j1, 1, out=w[1][..., :-1])
+    beta += x_j
+    np.sqrt(np.abs(beta, out=beta), out=beta)
+
+    # x_j*sin(alpha)*cos(beta) + x_j1*cos(alpha)*sin(beta)
+    term_j = np.sin(alpha, out=w[2][..., :-1])
+    term_j *= x_j
+    term_j *= np.cos(beta, out=w[3][..., :-1])
+    term_j1 = np.cos(alpha, out=alpha)
+    term_j1 *= x_j1
+    term_j1 *= np.sin(beta, out=beta)
+    term_j += term_j1
+
+    fo = np.sum(term_j, axis=-1)
 
     return fo
 
+
+# Optima ######################################################################
+
+# * Exact optimum f* and search domain (lb <= x_i <= ub) of every function,
+#   for benchmarking (see ert.py). odd_square is defined up to 10 variables
+#   and the optimum of rana is the one of the 2D function
+OPTIMA = {'ackley':     (0.0,                 -30,      30),
+          'griewangk':  (0.0,                 -100,     100),
+          'rastrigin':  (0.0,                 -5.12,    5.12),
+          'salomon':    (0.0,                 -100,     100),
+          'odd_square': (-1.0084672811394721, -5*np.pi, 5*np.pi),
+          'schwefel':   (-418.98288727243374, -500,     500),
+          'rana':       (-511.99858421945237, -512,     512)}
+
+
+# Shifted and rotated functions ###############################################
+
+# * Position of the optimum and search domain (-bound <= x_i <= bound)
+ROTATABLE = {'ackley':    (0,          30),
+             'rastrigin': (0,          5.12),
+             'griewangk': (0,          100),
+             'schwefel':  (420.968746, 500),
+             'rana':      (-512,       512)}
+
+_transformations = {}  # (name, n, seed) -> (shift, rotation)
+
+
+def transformation(name, n, seed=0, cache_dir=None):
+    """Shift vector and orthogonal rotation matrix of a function
+
+    Generated once per (name, n, seed) and kept in memory; when cache_dir is
+    given they are also stored there as .npz files and read back by later
+    processes (a 1000x1000 QR decomposition takes longer than many calls)
+
+    Params:
+    name = name of the test function (see ROTATABLE)
+    n = number of variables
+    seed = seed of the random shift and rotation
+    cache_dir = optional directory of the disk cache
+    returns (shift, rotation) = arrays of shape (n,) and (n, n)
+    """
+
+    key = (name, n, seed)
+    if key in _transformations:
+        return _transformations[key]
+
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, '{}_{}_{}.npz'.format(name, n, seed))
+
+    if path is not None and os.path.exists(path):
+        with np.load(path) as data:
+            shift, rotation = data['shift'], data['rotation']
+    else:
+        rng = np.random.default_rng([seed, n, zlib.crc32(name.encode())])
+        bound = ROTATABLE[name][1]
+
+        shift = rng.uniform(-0.8*bound, 0.8*bound, n)  # optimum inside the domain
+
+        # Haar distributed orthogonal matrix: QR of a Gaussian matrix with the
+        # signs of the diagonal of R moved to Q
+        q, r = np.linalg.qr(rng.standard_normal((n, n)))
+        rotation = q * np.sign(np.diag(r))
+
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as file:
+                np.savez(file, shift=shift, rotation=rotation)
+            os.replace(tmp, path)
+
+    _transformations[key] = (shift, rotation)
+    return shift, rotation
+
+
+def shifted_rotated(function, seed=0, cache_dir=None):
+    """Shifted and rotated variant of a test function (CEC style)
+
+    z = rotation @ (x - shift) + x*, with x* the optimum of function. The
+    rotation takes points of the domain out of the domain of function, where
+    schwefel and rana are unbounded, so z is clipped to the domain and the
+    squared distance it was moved is added as a penalty:
+
+        f_sr(x) = function(clip(z)) + ||z - clip(z)||**2
+
+    The optimum of f_sr is x = shift with the same value f*. The
+    transformation of each dimension is generated on the first call (see
+    transformation) and a batch of points is rotated with one matmul.
+
+    Params:
+    function = ackley, rastrigin, griewangk, schwefel or rana
+    seed = seed of the random shift and rotation
+    cache_dir = optional directory where the transformations are cached
+    returns f_sr(x, work=None) = function of a single point or of a batch
+        (work: optional buffers from workspace(shape, 6))
+    """
+
+    name = function.__name__
+    assert name in ROTATABLE, "Error: no shifted/rotated variant of {}".format(name)
+    x_opt, bound = ROTATABLE[name]
+
+    def function_sr(x, work=None):
+        x = np.atleast_1d(np.asarray(x, dtype=float))  # converts list (or scalar) to numpy array
+        shift, rotation = transformation(name, x.shape[-1], seed, cache_dir)
+        w = _buffers(x, work if work is None else work[:2], 2)
+
+        z = np.subtract(x, shift, out=w[0])
+        z = np.matmul(z, rotation.T, out=w[1])  # every point of the batch at once
+        z += x_opt
+
+        # * Boundary handling: clip z to the domain, penalize the distance
+        z_clip = np.clip(z, -bound, bound, out=w[0])
+        z -= z_clip
+        penalty = np.sum(np.square(z, out=z), axis=-1)
+
+        return function(z_clip, work if work is None else work[2:]) + penalty
+
+    function_sr.__name__ = name + '_shifted_rotated'
+    function_sr.__doc__ = "Shifted and rotated {} (seed {}), optimum at x = shift, " \
+                          "see shifted_rotated\n{}".format(name, seed, function.__doc__)
+    return function_sr
@@ -0,0 +1,74 @@
+"""
+Per-phase timing of a PSO run
+
+The wall time of a run is split into the phases of the main loop, measured
+with a monotonic clock (time.perf_counter) like the budget:
+
+    * 'objective': objective function evaluations (the time charged to the
+      Budget, including waits for the evaluation workers)
+    * 'update': velocity and position update, personal and global bests
+      (the rest of the steps where the swarm is moved and evaluated)
+    * 'bookkeeping': initialization, worst particle and errors, history,
+      termination criteria and checkpoints
+    * 'reporting': progress reporters
+    * 'plotting': plots of the particles
+
+The driver calls switch(phase) when a new phase starts, a single clock read
+per call. The objective is not switched to around every evaluation: the time
+the budget charged during a lap is moved from the lap's phase to 'objective',
+so particle by particle engines pay no extra timer per evaluation.
+"""
+
+import time
+
+PHASES = ('objective', 'update', 'bookkeeping', 'reporting', 'plotting')
+
+
+class Profiler:
+    """Time spent in each phase of a run
+
+    :param budget: Budget of the run (source of the objective time)
+    :param callback: optional function callback(phase, seconds) called at the
+        end of every phase with its duration ('objective' only when the lap
+        included evaluations)
+    """
+
+    def __init__(self, budget, callback=None):
+        self.budget   = budget
+        self.callback = callback
+        self.times    = dict.fromkeys(PHASES, 0.0)  # accumulated time [s]
+
+        self.phase          = 'bookkeeping'
+        self.objective_time = budget.objective_time  # already charged at the last switch
+        self.tic            = time.perf_counter()
+
+    def switch(self, phase):
+        """Ends the current phase and starts phase"""
+        toc = time.perf_counter()
+        lap = toc - self.tic
+        self.tic = toc
+
+        objective_time = self.budget.objective_time
+        objective = objective_time - self.objective_time
+        self.objective_time = objective_time
+
+        times = self.times
+        times['objective'] += objective
+        times[self.phase]  += lap - objective
+
+        if self.callback is not None:
+            if objective:
+                self.callback('objective', objective)
+            self.callback(self.phase, lap - objective)
+
+        self.phase = phase
+
+    def restart(self):
+        """Ignores the objective time charged since the last switch (e.g. the
+        time of a previous run restored from a checkpoint)"""
+        self.objective_time = self.budget.objective_time
+
+    def stop(self):
+        """Ends the current phase, returns the dict {phase: time [s]}"""
+        self.switch(self.phase)
+        return dict(self.times)
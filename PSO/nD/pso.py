@@ -2,12 +2,19 @@
 
 import numpy as np
 import sys
-import time
 # from optitestfuns import ackley
 # from tictoc import tic, toc
-from print_pso import print_results
-
-def pso(objfnc, lb, ub, intVar, *varargin):
+from reporters import make_reporters
+from evaluation import make_evaluator
+from cache import CachedEvaluator
+from budget import Budget
+from checkpoint import CheckpointWriter, load_checkpoint, rng_state, set_rng_state
+from topology import make_topology, neighborhood_best
+from history import History, diversity, diversity_work
+from trajectory import TrajectoryRecorder
+from profiler import Profiler
+
+def pso(objfnc, lb, ub, intVar, *varargin, **options):
     """
     Standard PSO algorithm (gbest) to minimize a function
 
@@ -17,13 +24,129 @@ def pso(objfnc, lb, ub, intVar, *varargin):
 
     Parameters
     ----------
-    objfnc: argument containing the objective function
+    objfnc: argument containing the objective function. By default it is
+        called with the position of one particle, objfnc(x) -> float. Batch
+        objectives receive the whole swarm, objfnc(X) with X of shape
+        (swarm_size, n_variables), and return the swarm_size fitness values
+        (see evaluation.py and the batch option)
     lb: lower bound (array or list with len()=n_dimensions)
     ub: upper bound (array or list with len()=n_dimensions)
     intVar: list containing the indexes for the variables that must be integers
     varargin: unused input variables
+    options: keyword arguments overriding the PSO OPTIONS listed below
+        (swarm_size, maxIter, maxFO, maxIterNoImprov, maxTime, tol_x, tol_fnc,
+        inertia_w, acceleration_c1, acceleration_c2, v_max, break_coeff,
+        Red_acceleration_c1, topology, topology_k, print_freq, reporters,
+        report_interval, plotPSO,
+        engine, batch, dtype, rng, history, history_size, history_mode, trajectory,
+        profile_callback, evaluator, n_workers, worker_init, worker_initargs, cache_size,
+        cache_quantization)
+
+    rng: numpy.random.Generator used by the run, or its seed (int or
+        np.random.SeedSequence; None for a fresh unpredictable seed). The
+        random coefficients of each iteration are drawn in one bulk call in
+        the optimizer, never in the evaluation workers, so the same seed
+        gives the same run with the serial, thread and process evaluators
+
+    topology: social attractor of the particles, 'gbest' (default, best of
+        the whole swarm) or a lbest topology, 'ring', 'von_neumann', 'random'
+        or a neighbor index array (see topology.py), where each particle is
+        attracted by the best personal best of its neighbors. topology_k is
+        the radius of the ring or the number of random informants
+
+    print_freq, reporters, report_interval: progress of the run. By default
+        a ConsoleReporter prints the table of iterations every print_freq
+        iterations and at most once per report_interval seconds (see
+        reporters.py). reporters is a list of Reporter instances and/or
+        functions f(iteration, evaluations, gbest, pworst, error_fnc,
+        error_x) replacing it ([] for a silent run). Reporter instances are
+        flushed but not closed when the run ends, so they can be reused
+
+    plotPSO: animation of the particles of 1D and 2D problems, an object
+        with a method update(x, v, fval, iteration) called after every
+        iteration, like animation.AnimationWriter, which streams the frames
+        to a .gif/.mp4 file from one reused figure. The caller owns it (and
+        closes it after the run)
+
+    engine: update scheme of the main loop
+        'particle': particles are moved and evaluated one at a time and the
+                    gbest is updated as soon as a particle improves it (default
+                    with the serial evaluator)
+        'swarm': steps 08-12 are performed as matrix operations over the whole
+                 (n_variables, swarm_size) swarm and the gbest is updated once
+                 per iteration (synchronous PSO). The worst particle rule is
+                 kept. Default with parallel evaluators.
+        Many independent runs are done at once by multiswarm.pso_multiswarm,
+        problems with hundreds of variables are split into sub-swarms by
+        coevolution.pso_cc
+
+    batch: True if objfnc follows the batch contract. None (default) checks
+        whether objfnc was decorated with evaluation.batch_objective
+
+    evaluator: evaluation backend of the swarm, 'serial' (default), 'thread',
+        'process' or an evaluator instance from evaluation.py (not closed by
+        pso, so it can be reused across runs)
+    n_workers: number of workers of the thread and process pools
+    worker_init, worker_initargs: worker_init(*worker_initargs) is called once
+        per worker and its result passed to the objective, objfnc(x, context)
+    cache_size: number of evaluated positions kept in a LRU cache (0 disables
+        it). Positions are keyed after rounding the integer variables and,
+        if cache_quantization is given (float or one value per variable),
+        after quantizing the continuous ones. Cache hits count as function
+        evaluations but the objective is not called
+
+    maxFO, maxTime: evaluation and wall time budgets. They are checked after
+        every evaluation, so the run can stop in the middle of an iteration
+        returning the best so far. Parallel evaluators receive the whole
+        swarm and the evaluations not started when the time runs out are
+        cancelled
+
+    dtype: floating point type of the swarm arrays (positions, velocities
+        and personal bests), np.float64 by default. np.float32 halves the
+        memory and the memory traffic of very high dimensional swarms (the
+        objective then receives float32 positions). The swarm uses, per
+        particle and in bytes (itemsize = 8 for float64, 4 for float32):
+            engine 'particle': 7*n_variables*itemsize + 16
+            engine 'swarm':    9*n_variables*itemsize + 16
+                               (+ n_variables*itemsize with integer variables)
+        for x, v, their double buffers x_new and v_new, pbest_position, the
+        two random coefficients of each iteration, the work arrays of the
+        vectorized update and the float64 fitness values
+        (fval and pbest_fitness). The result reports it (memory_per_particle)
+
+    history: True (default) to record the convergence history (see
+        history.py): iteration, evaluations, wall time, gbest, pworst,
+        error_fnc, error_x and diversity of every iteration, returned as
+        Result.history. history_mode 'grow' keeps every iteration, 'ring'
+        the last history_size ones and 'downsample' at most history_size
+        rows covering the whole run. False disables it; a History instance
+        is used as given
+
+    trajectory: folder where the position, velocity and fitness of every
+        particle at every iteration are recorded in memory-mapped .npy files
+        sized maxIter x swarm_size x n_variables (see trajectory.py, which
+        computes statistics and replays the run with plotPSO or animation.py
+        without loading it in memory). With resume, the recorded files are
+        continued
+
+    profile_callback: function f(phase, seconds) called at the end of every
+        phase of the run. The time of each phase ('objective', 'update',
+        'bookkeeping', 'reporting' and 'plotting', see profiler.py) is
+        returned as Result.profile, so the optimizer overhead can be told
+        apart from the objective function
+
+    checkpoint: path of a .npz file where the swarm state is saved every
+        checkpoint_every iterations, at most once per checkpoint_interval
+        seconds, by a background writer (checkpoint_background)
+    resume: path of a checkpoint to continue a run from (same objfnc, bounds
+        and options); the run continues exactly as the uninterrupted one
 
     Returns: structure containing the results
+        xopt, FO, exit, iterations, FO_evaluations (exact count), time_total,
+        time_objective (time in the objective function), time_optimizer,
+        memory_per_particle (bytes of the swarm arrays per particle),
+        history (None when disabled), profile (dict {phase: time [s]}) and
+        trajectory (folder of the recorded trajectory or None)
     -------
 
     """
@@ -32,30 +155,99 @@ def pso(objfnc, lb, ub, intVar, *varargin):
     #  ----------------- PSO OPTIONS (user inputs) -----------------------------------------
 
     # * Population size
-    swarm_size = 20       #  number of the swarm particles
+    swarm_size = options.pop('swarm_size', 20)       #  number of the swarm particles
 
     # * Termination Conditions
-    maxIter    = 1000       #  maximum number of iterations
-    maxFO      = sys.float_info.max     #  maximum number of function after i evaluations
+    maxIter    = options.pop('maxIter', 1000)       #  maximum number of iterations
+    maxFO      = options.pop('maxFO', sys.float_info.max)     #  maximum number of function after i evaluations
 
-    maxIterNoImprov = sys.maxsize  # maximum number of iterations without improving the objective function
-    maxTime         = sys.float_info.max # time limit in seconds [s]
+    maxIterNoImprov = options.pop('maxIterNoImprov', sys.maxsize)  # maximum number of iterations without improving the objective function
+    maxTime         = options.pop('maxTime', sys.float_info.max) # time limit in seconds [s]
 
-    tol_x   = 1e-5          # tolerance in x (norm 2)
-    tol_fnc = 1e-5          # tolerance in objective function
+    tol_x   = options.pop('tol_x', 1e-5)          # tolerance in x (norm 2)
+    tol_fnc = options.pop('tol_fnc', 1e-5)          # tolerance in objective function
 
     # * PSO parameters
-    inertia_w       = 0.72  # Inertia weight
-    acceleration_c1 = 1.49  # Acceleration coefficient (cognitive)
-    acceleration_c2 = 1.49  # Acceleration coefficient (social)
-    v_max = 0.07               # maximum velocity in absolute value
-    break_coeff = 0.05      # break  # stops while loop factor for the worst particle
-    Red_acceleration_c1 = 2 # Reduction factor of acceleration c1 coefficient for the worst particle
+    inertia_w       = options.pop('inertia_w', 0.72)  # Inertia weight
+    acceleration_c1 = options.pop('acceleration_c1', 1.49)  # Acceleration coefficient (cognitive)
+    acceleration_c2 = options.pop('acceleration_c2', 1.49)  # Acceleration coefficient (social)
+    v_max = options.pop('v_max', 0.07)               # maximum velocity in absolute value
+    break_coeff = options.pop('break_coeff', 0.05)      # break  # stops while loop factor for the worst particle
+    Red_acceleration_c1 = options.pop('Red_acceleration_c1', 2) # Reduction factor of acceleration c1 coefficient for the worst particle
+    topology   = options.pop('topology', 'gbest')  # 'gbest', 'ring', 'von_neumann', 'random' or neighbor array
+    topology_k = options.pop('topology_k', None)   # ring radius or number of random informants
 
 
     # * Algorithm options
-    print_freq = 10
-    plotPSO    = False
+    print_freq = options.pop('print_freq', 10)
+    reporters  = options.pop('reporters', None)     # progress reporters (None: console)
+    report_interval = options.pop('report_interval', 1.0)  # minimum time between reports [s]
+    plotPSO    = options.pop('plotPSO', False)    # animation sink, see animation.py
+    engine     = options.pop('engine', None)    # 'particle' or 'swarm' (vectorized) update
+    batch      = options.pop('batch', None)     # objfnc evaluates the whole swarm in one call
+    dtype      = options.pop('dtype', np.float64)  # float type of the swarm (np.float32: compact mode)
+    rng        = options.pop('rng', None)       # numpy Generator or its seed
+
+    # * Convergence history
+    history      = options.pop('history', True)      # record the metrics of every iteration
+    history_size = options.pop('history_size', 1024) # rows (initial rows in 'grow' mode)
+    history_mode = options.pop('history_mode', 'grow')  # 'grow', 'ring' or 'downsample'
+    trajectory   = options.pop('trajectory', None)   # folder of the recorded trajectory
+
+    # * Profiling
+    profile_callback = options.pop('profile_callback', None)  # f(phase, seconds) after every phase
+
+    # * Evaluation backend
+    evaluator       = options.pop('evaluator', 'serial')  # 'serial', 'thread', 'process' or instance
+    n_workers       = options.pop('n_workers', None)      # workers of the thread/process pools
+    worker_init     = options.pop('worker_init', None)    # objective context of each worker
+    worker_initargs = options.pop('worker_initargs', ())
+
+    # * Evaluation cache
+    cache_size         = options.pop('cache_size', 0)            # LRU size (0: no cache)
+    cache_quantization = options.pop('cache_quantization', None) # quantum of the continuous variables
+
+    # * Checkpoints
+    checkpoint            = options.pop('checkpoint', None)          # .npz file with the swarm state
+    checkpoint_every      = options.pop('checkpoint_every', 1)       # iterations between checkpoints
+    checkpoint_interval   = options.pop('checkpoint_interval', 60.0) # minimum time between checkpoints [s]
+    checkpoint_background = options.pop('checkpoint_background', True)
+    resume                = options.pop('resume', None)              # checkpoint to continue from
+
+    if options:
+        raise TypeError('pso() got unexpected options: {}'.format(', '.join(options)))
+
+    rng = np.random.default_rng(rng)  # Generators are used as given
+
+    reporters, owned_reporters = make_reporters(reporters, print_freq, report_interval)
+
+    if history is True:
+        history = History(history_size, history_mode)
+    elif history is False:
+        history = None
+
+    evaluator, close_evaluator = make_evaluator(objfnc, evaluator, n_workers, (), batch,
+                                                worker_init, worker_initargs)
+    backend = evaluator
+
+    if cache_size:
+        evaluator = CachedEvaluator(backend, cache_size, cache_quantization)
+
+    if engine is None:
+        engine = 'particle' if evaluator.n_workers == 1 else 'swarm'
+
+    assert engine in ('particle', 'swarm'), "engine must be 'particle' or 'swarm'"
+
+    # * Budget: evaluations are charged as they are done. Batch objectives get
+    #   the whole swarm, serial evaluators are checked after every particle
+    #   and parallel ones get the whole swarm as Futures (see Budget.evaluate)
+    batch_backend = getattr(backend, 'batch', False)
+    budget = Budget(maxFO, maxTime)
+    budget_chunk  = swarm_size if batch_backend else evaluator.n_workers
+    budget_submit = evaluator.submit if evaluator.n_workers > 1 and not batch_backend else None
+
+    # * Time of each phase of the run (objective, update, bookkeeping ...)
+    profiler = Profiler(budget, profile_callback)
     # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>  inputs
 
 
@@ -89,23 +281,38 @@ def pso(objfnc, lb, ub, intVar, *varargin):
     # 02. Set the initial position of the particles ---------------------------
     aux1 =  (ub - lb)
     x = np.outer(lb, np.ones(swarm_size)) + \
-        np.outer(aux1, np.ones(swarm_size))*np.random.rand(n_variables, swarm_size)
+        np.outer(aux1, np.ones(swarm_size))*rng.random((n_variables, swarm_size))
 
     # x = np.array([[-4.067602406241254, 1.411475292329600, 2.311848990285760]])
     x[intVar, :] = np.round(x[intVar, :])
+    x = x.astype(dtype, copy=False)
 
 
     # 03. Set initial velocity for particles ----------------------------------
-    v = np.zeros([n_variables, swarm_size])
+    v = np.zeros([n_variables, swarm_size], dtype=dtype)
+
+    # * Trajectory of the particles (memory-mapped files sized for maxIter iterations)
+    if trajectory is not None:
+        recorder = TrajectoryRecorder(trajectory, int(maxIter), swarm_size, n_variables, dtype,
+                                      lb_original, ub_original, intVar, objfnc, resume is not None)
 
     # 04. Evaluation of each particle -----------------------------------------
-    # NOTE3: It is not possible to perform a vectorized version since our
-    #        objective function can be a black box (e.g. process simulator)
+    # NOTE3: Black box objectives (e.g. process simulator) are evaluated one
+    #        particle at a time by the evaluator (serially or spread across
+    #        its workers), while batch objectives receive the whole swarm
+    #        (one particle per row)
+    evaluate_swarm    = evaluator.evaluate
+    evaluate_particle = evaluator.evaluate_one
 
-    tic = time.time()
-    fval = np.zeros(swarm_size)
-    for iParticle in range(swarm_size):
-        fval[iParticle] = objfnc(x[:, iParticle])
+    if resume is None:
+        fval, n_evaluated = budget.evaluate(evaluate_swarm, x.T, budget_chunk, budget_submit)
+    else:
+        state = load_checkpoint(resume)  # swarm state of a previous run
+        assert state['x'].shape == x.shape, "Checkpoint swarm does not match swarm_size and bounds"
+
+        x, v, fval = state['x'], state['v'], state['fval']
+        budget.restore(state['evaluations'], state['elapsed'], state['objective_time'])
+        profiler.restart()
 
 
     # 05. Best particle position and global best particle position and fitness-
@@ -117,7 +324,9 @@ def pso(objfnc, lb, ub, intVar, *varargin):
     
     gbest_position             = np.copy(x[:, gbest_ind])
 
-    iter1_time = round((time.time()-tic), 2)
+    if resume is not None:
+        pbest_position, pbest_fitness = state['pbest_position'], state['pbest_fitness']
+        gbest_position, gbest_fitness = state['gbest_position'], state['gbest_fitness']
 
     # 06. Print Results -------------------------------------------------------
 
@@ -129,21 +338,34 @@ def pso(objfnc, lb, ub, intVar, *varargin):
     error_x   = np.linalg.norm(pworst_position - gbest_position, 2)
     error_fnc = np.abs(pworst_fitness - gbest_fitness)
 
-    print_results(1, swarm_size, gbest_fitness, pworst_fitness,
-                  error_fnc, error_x, swarm_size, n_variables, intVar,
-                        print_freq)
+    # * A resumed run was recorded, reported and plotted up to its checkpoint
+    work_diversity = diversity_work(n_variables)
+
+    if history is not None and resume is None:
+        history.record(1, budget.evaluations, budget.elapsed(), gbest_fitness, pworst_fitness,
+                       error_fnc, error_x, diversity(x[:, :n_evaluated], work_diversity))
+
+    if trajectory is not None and resume is None:
+        recorder.record(1, x[:, :n_evaluated], v[:, :n_evaluated], fval[:n_evaluated])
+
+    profiler.switch('reporting')
+    for reporter in reporters:
+        reporter.start(swarm_size, n_variables, intVar)
+        if resume is None:
+            reporter.update(1, budget.evaluations, gbest_fitness, pworst_fitness,
+                            error_fnc, error_x)
+    profiler.switch('bookkeeping')
 
 
     # 07. Plot Particles and Objective Function -------------------------------
 
     if plotPSO:
-        if n_variables == 2:
-            # plot_3D(objfnc, lb_original, ub_original, x, fval, 1)             # Aux Fnc # 02 ###
-            pass
-        elif n_variables == 1:
-            pass
-        else:
+        if n_variables not in (1, 2):
             raise Warning(" Only 2D and 3D plots are possible !!! ")
+        if resume is None:
+            profiler.switch('plotting')
+            plotPSO.update(x, v, fval, 1)
+            profiler.switch('bookkeeping')
         
     
 
@@ -154,84 +376,192 @@ def pso(objfnc, lb, ub, intVar, *varargin):
 
     # * Control parameters & Preallocation arrays
     iter                     = 1
-    timeLimit                = iter1_time
-    FO_evaluations           = swarm_size
     iter_fitness_improvement = 0
 
+    # * Neighbor index array of the lbest topologies (None for gbest)
+    neighbors = make_topology(topology, swarm_size, topology_k, rng)
+
+    if resume is not None:
+        iter                     = int(state['iter'])
+        iter_fitness_improvement = int(state['iter_fitness_improvement'])
+        set_rng_state(state, rng)
+
+        if neighbors is not None:
+            neighbors = state['neighbors']
+
+    if checkpoint is not None:
+        writer = CheckpointWriter(checkpoint, checkpoint_every, checkpoint_interval,
+                                  checkpoint_background)
+
+        def swarm_state():
+            """Snapshot of everything the main loop needs to continue"""
+            state = dict(x=np.copy(x), v=np.copy(v), fval=np.copy(fval),
+                         pbest_position=np.copy(pbest_position),
+                         pbest_fitness=np.copy(pbest_fitness),
+                         gbest_position=np.copy(gbest_position),
+                         gbest_fitness=gbest_fitness,
+                         iter=iter, iter_fitness_improvement=iter_fitness_improvement,
+                         evaluations=budget.evaluations, elapsed=budget.elapsed(),
+                         objective_time=budget.objective_time)
+            if neighbors is not None:
+                state['neighbors'] = neighbors
+            state.update(rng_state(rng))
+            return state
+
+    # * Double buffers of positions and velocities, swapped every iteration
     v_new  = np.copy(v)
     x_new  = np.copy(x)
 
-    tic = time.time()
-    
+    # * Random coefficients of the cognitive [0] and social [1] terms
+    coefficients = np.empty((2, n_variables, swarm_size), dtype=dtype)
+
+    if engine == 'swarm':
+        cognitive = np.empty_like(x)    # work arrays of the vectorized update
+        social    = np.empty_like(x)
+        lb_column = lb[:, np.newaxis].astype(dtype)
+        ub_column = ub[:, np.newaxis].astype(dtype)
+
+        if intVar:
+            x_eval = np.empty_like(x)   # positions with the integer variables rounded
+
     pso_flag = True
 
 
     while True:
 
-        for iP in range(swarm_size):
+        profiler.switch('update')  # steps 08-14 (evaluations are charged to 'objective')
+
+        if engine == 'swarm':
+
+    # 08. Update velocity for all particles (whole swarm at once) -------------
+            rng.random(dtype=dtype, out=coefficients)  # whole iteration in one call
+
+            np.subtract(pbest_position, x, out=cognitive)
+            cognitive *= coefficients[0]
+            if neighbors is None:
+                np.subtract(gbest_position[:, np.newaxis], x, out=social)
+            else:  # best neighbor of each particle in one gather
+                np.subtract(pbest_position[:, neighborhood_best(pbest_fitness, neighbors)], x, out=social)
+            social *= coefficients[1]
+
+            cognitive *= acceleration_c1
+            social    *= acceleration_c2
 
-            # 08. Update velocity for all particles -----------------------------------
+            np.multiply(v, inertia_w, out=v_new)
+            v_new += cognitive
+            v_new += social
 
-            if iter > 1 and iP == pworst_ind:
+            if iter > 1:
+                v_new[:, pworst_ind] = break_coeff * inertia_w * v[:, pworst_ind] + \
+                    cognitive[:, pworst_ind]/Red_acceleration_c1 + \
+                    social[:, pworst_ind]
 
-                v_new[:, iP] =  break_coeff * inertia_w * v[:, iP] +\
-                    acceleration_c1 * np.random.rand(n_variables) * (pbest_position[:, iP] - x[:, iP])/Red_acceleration_c1 + \
-                    acceleration_c2 * np.random.rand(n_variables) * (gbest_position - x[:, iP])
+    # 09. Velocity control ----------------------------------------------------
+            np.clip(v_new, -v_max, v_max, out=v_new)
+
+    # 10. Update position for all particles -----------------------------------
+            np.add(x, v_new, out=x_new)
+
+    # 11. Position control ----------------------------------------------------
+            np.clip(x_new, lb_column, ub_column, out=x_new)
+
+    # 12. Round integer variables to the nearest integer ----------------------
+            if intVar:
+                np.copyto(x_eval, x_new)
+                x_eval[intVar, :] = np.round(x_eval[intVar, :])
             else:
-                v_new[:, iP] = inertia_w * v[:, iP] + \
-                    acceleration_c1 * np.random.rand(n_variables) * (pbest_position[:, iP] - x[:, iP]) + \
-                    acceleration_c2 * np.random.rand(n_variables) * (gbest_position - x[:, iP])
-            
+                x_eval = x_new
+
+    # 13. Function evaluation & update personal best particle (pbest) so far --
+            fval, n_evaluated = budget.evaluate(evaluate_swarm, x_eval.T, budget_chunk, budget_submit)
+
+            improved = fval < pbest_fitness
+            pbest_fitness[improved]     = fval[improved]
+            pbest_position[:, improved] = x_eval[:, improved]
+
+    # 14. Update global best particle (gbest) ---------------------------------
+            ibest = np.nanargmin(pbest_fitness)
+            if pbest_fitness[ibest] < gbest_fitness:
+                gbest_fitness  = pbest_fitness[ibest]
+                gbest_position = np.copy(pbest_position[:, ibest])
+                iter_fitness_improvement = 0
+            else:
+                iter_fitness_improvement = iter_fitness_improvement + swarm_size
+
+        else:
+
+            if neighbors is not None:  # best neighbor of each particle
+                lbest_ind = neighborhood_best(pbest_fitness, neighbors)
+
+            rng.random(dtype=dtype, out=coefficients)  # whole iteration in one call
+            r1, r2 = coefficients
+
+            n_evaluated = swarm_size  # unless a budget runs out
+            for iP in range(swarm_size):
+
+                if budget.exhausted():  # stop in the middle of the iteration
+                    n_evaluated = iP
+                    break
+
+                social_position = gbest_position if neighbors is None else pbest_position[:, lbest_ind[iP]]
+
+                # 08. Update velocity for all particles -----------------------------------
+
+                if iter > 1 and iP == pworst_ind:
+
+                    v_new[:, iP] =  break_coeff * inertia_w * v[:, iP] +\
+                        acceleration_c1 * r1[:, iP] * (pbest_position[:, iP] - x[:, iP])/Red_acceleration_c1 + \
+                        acceleration_c2 * r2[:, iP] * (social_position - x[:, iP])
+                else:
+                    v_new[:, iP] = inertia_w * v[:, iP] + \
+                        acceleration_c1 * r1[:, iP] * (pbest_position[:, iP] - x[:, iP]) + \
+                        acceleration_c2 * r2[:, iP] * (social_position - x[:, iP])
+                
 
     # 09. Velocity control ----------------------------------------------------
-            v_new[v_new >  v_max] =  v_max
-            v_new[v_new < -v_max] = -v_max
+                v_iP = v_new[:, iP]
+                np.clip(v_iP, -v_max, v_max, out=v_iP)
 
     # 10. Update position for all particles pbest -------------------------------
-            x_new[:, iP] = x[:, iP] + v_new[:, iP]
+                x_new_iP = x_new[:, iP]
+                np.add(x[:, iP], v_iP, out=x_new_iP)
 
     # 11. Position control ----------------------------------------------------
 
-            # * Lower bound
-            x_new[:, iP] = (x_new[:, iP] < lb)*lb + (x_new[:, iP] >= lb)*x_new[:, iP]
-
-            # * Upper bound
-            x_new[:, iP] = (x_new[:, iP] > ub)*ub + (x_new[:, iP] <= ub)*x_new[:, iP]
+                # * Lower and upper bounds
+                np.clip(x_new_iP, lb, ub, out=x_new_iP)
 
 
     # 12. Round integer variables to the nearest integer ----------------------
     # NOTE4: we need an aux var for the position in order to round the integer
     #        variables keeping unalterd x_new for next iterations
-            x_iP = x_new[:, iP]
-            x_iP[intVar] = np.round(x_iP[intVar])
+                x_iP = np.copy(x_new[:, iP])
+                x_iP[intVar] = np.round(x_iP[intVar])
 
 
     # 13. Function evaluation & update personal best particle (pbest) so far --
-            fval[iP] = objfnc(x_iP)
+                fval[iP] = budget.evaluate_one(evaluate_particle, x_iP)
 
-            if fval[iP] < pbest_fitness[iP]:
-                pbest_fitness[iP]     = fval[iP]
-                pbest_position[:, iP] = x_iP
-            
+                if fval[iP] < pbest_fitness[iP]:
+                    pbest_fitness[iP]     = fval[iP]
+                    pbest_position[:, iP] = x_iP
+                
 
     # 14. Update global best particle (gbest) ---------------------------------
-            if pbest_fitness[iP] < gbest_fitness:
-                gbest_fitness  = pbest_fitness[iP]
-                gbest_position = x_iP
-                iter_fitness_improvement = 0
-            else:
-                iter_fitness_improvement = iter_fitness_improvement + 1
-            
-         # for loop in range 1:size_swarm ##################################
+                if pbest_fitness[iP] < gbest_fitness:
+                    gbest_fitness  = pbest_fitness[iP]
+                    gbest_position = x_iP
+                    iter_fitness_improvement = 0
+                else:
+                    iter_fitness_improvement = iter_fitness_improvement + 1
+                
+            # for loop in range 1:size_swarm ##################################
             # #################################################################
 
-        iter_time = tic - time.time()
-
     # 15. Print Results -------------------------------------------------------
-        iter = iter + 1
-        FO_evaluations = FO_evaluations + swarm_size
+        profiler.switch('bookkeeping')
 
-        timeLimit = timeLimit + iter_time
+        iter = iter + 1
 
         # * Worst particle in each iteration
         pworst_fitness = np.nanmax(pbest_fitness)
@@ -241,9 +571,22 @@ def pso(objfnc, lb, ub, intVar, *varargin):
         error_x   = np.linalg.norm(pworst_position - gbest_position, 2)
         error_fnc = np.abs(pworst_fitness - gbest_fitness)
 
-        print_results(iter, FO_evaluations, gbest_fitness, pworst_fitness,
-                      error_fnc, error_x, swarm_size, n_variables, intVar,
-                            print_freq )
+        # * Particles evaluated in the iteration (views, all of them unless a
+        #   budget ran out in the middle of the iteration)
+        x_iter, v_iter, fval_iter = x_new[:, :n_evaluated], v_new[:, :n_evaluated], fval[:n_evaluated]
+
+        if history is not None:  # diversity only for the rows that are stored
+            history.record(iter, budget.evaluations, budget.elapsed(), gbest_fitness, pworst_fitness,
+                           error_fnc, error_x,
+                           diversity(x_iter, work_diversity) if history.keeps() else np.nan)
+
+        if trajectory is not None:
+            recorder.record(iter, x_iter, v_iter, fval_iter)
+
+        profiler.switch('reporting')
+        for reporter in reporters:
+            reporter.update(iter, budget.evaluations, gbest_fitness, pworst_fitness,
+                            error_fnc, error_x)
 
         # print('x:{}'.format(gbest_position))
         # import pdb; pdb.set_trace()
@@ -251,28 +594,24 @@ def pso(objfnc, lb, ub, intVar, *varargin):
     # 16. Plot Particles and Objective Function -------------------------------
 
         if plotPSO:
-            if n_variables == 2:
-                # plot_3D(objfnc, lb_original, ub_original, x, fval, 1)             # Aux Fnc # 02 ###
-                pass
-            elif n_variables == 1:
-                pass
-            else:
-                raise Warning(" Only 2D and 3D plots are possible !!! ")
+            profiler.switch('plotting')
+            plotPSO.update(x_iter, v_iter, fval_iter, iter)
     
 
     # 17. Check Termination criteria -----------------------------------------
+        profiler.switch('bookkeeping')
 
         if iter >= maxIter:
             termination = 'Stop due to maximum number of major iterations.'
             break  # stops while loop
             
-        elif FO_evaluations >= maxFO:
+        elif budget.out_of_evaluations():
             termination = 'Stop due to maximum number of function evaluations.'
             break  # stops while loop
         elif iter_fitness_improvement >= maxIterNoImprov:
             termination = 'Number of generations without fitness improvement Reached. The objective function is under specified tolerance'
             break  # stops while loop
-        elif timeLimit >= maxTime:
+        elif budget.out_of_time():
             termination = 'The solver was interrupted because it reached the time limit.'
             break  # stops while loop
 
@@ -285,9 +624,27 @@ def pso(objfnc, lb, ub, intVar, *varargin):
         else:
             termination = 'Continue: # {0} iteration'.format(iter)
 
-        # * Position and velocity for next iteration
-        x = np.copy(x_new)
-        v = np.copy(v_new)
+        # * Position and velocity for next iteration (swap of the double buffers,
+        #   x_new and v_new are completely overwritten in the next iteration)
+        x, x_new = x_new, x
+        v, v_new = v_new, v
+
+        # * Checkpoint of the swarm state
+        if checkpoint is not None and writer.due(iter):
+            writer.save(swarm_state)
+
+    if checkpoint is not None:
+        writer.close()
+
+    profiler.switch('reporting')
+    for reporter in reporters:
+        reporter.flush()
+    for reporter in owned_reporters:  # the caller's reporters stay open
+        reporter.close()
+    profiler.switch('bookkeeping')
+
+    if close_evaluator:
+        backend.close()
 
     class Result:
         pass
@@ -295,4 +652,26 @@ def pso(objfnc, lb, ub, intVar, *varargin):
     Result.xopt  = gbest_position
     Result.FO    = gbest_fitness
     Result.exit  = termination
+
+    Result.iterations     = iter
+    Result.FO_evaluations = budget.evaluations
+    Result.profile        = profiler.stop()  # time of each phase {phase: [s]}
+    Result.time_total     = budget.elapsed()
+    Result.time_objective = budget.objective_time
+    Result.time_optimizer = Result.time_total - Result.time_objective
+
+    swarm_arrays = [x, v, x_new, v_new, pbest_position, coefficients, fval, pbest_fitness]
+    if engine == 'swarm':
+        swarm_arrays += [cognitive, social] + ([x_eval] if intVar else [])
+    Result.memory_per_particle = sum(array.nbytes for array in swarm_arrays) / swarm_size
+
+    Result.history = history  # convergence history (None if disabled)
+
+    if trajectory is not None:
+        recorder.close()
+    Result.trajectory = trajectory
+
+    if cache_size:
+        Result.cache          = evaluator.stats()  # hits, misses, hit_rate, objective_time ...
+        Result.cache_hit_rate = Result.cache['hit_rate']
     return Result
@@ -0,0 +1,161 @@
+"""
+Progress reporters of the PSO drivers
+
+The drivers do not print anything themselves: at the end of every iteration
+they call update() on each of their reporters with the progress of the run
+(iteration, evaluations, gbest, pworst, error_fnc, error_x). A reporter
+decides cheaply whether a report is due, every `every` iterations and at most
+once per `interval` seconds, and only then formats and writes it, either in
+the optimizer thread or in a background thread (the newest report wins when
+the thread falls behind). When the run ends, flush() writes the last report
+that was due but held back by the time throttle; the drivers close() (stop
+the background thread of) only the reporters they created, so a reporter
+passed by the caller can be reused in the next run.
+
+    * ConsoleReporter: the table of print_pso.py (default reporter)
+    * CallbackReporter: calls any function with the progress of the run
+
+Custom reporters subclass Reporter and implement report() (and start() to
+receive the description of the run).
+"""
+
+import queue
+import threading
+import time
+from print_pso import print_header, print_table_header, print_row
+
+
+class Reporter:
+    """Observer of a PSO run
+
+    :param every: report one of every `every` iterations (print_freq)
+    :param interval: minimum time between two reports [s]
+    :param background: call report() in a background thread
+    """
+
+    def __init__(self, every=1, interval=0.0, background=False):
+        self.every      = max(int(every), 1)
+        self.interval   = interval
+        self.background = background
+
+        self.last_time = -float('inf')
+        self.held      = None  # progress due but held back by the time throttle
+
+        if background:
+            self.queue  = queue.Queue(maxsize=1)
+            self.thread = threading.Thread(target=self._reporter, daemon=True)
+            self.thread.start()
+
+    def start(self, swarm_size, n_variables, intVar):
+        """Called once before the first iteration with the description of the run"""
+
+    def report(self, iteration, evaluations, gbest, pworst, error_fnc, error_x):
+        """Writes the progress of the run (implemented by subclasses)"""
+        raise NotImplementedError
+
+    def update(self, iteration, evaluations, gbest, pworst, error_fnc, error_x):
+        """Called by the driver at the end of every iteration"""
+        if iteration % self.every and iteration != 1:
+            return
+
+        progress = (iteration, evaluations, gbest, pworst, error_fnc, error_x)
+        now = time.perf_counter()
+        if now - self.last_time < self.interval:
+            self.held = progress
+            return
+
+        self.last_time = now
+        self.held = None
+        self._emit(progress)
+
+    def _emit(self, progress):
+        if not self.background:
+            self.report(*progress)
+            return
+
+        try:
+            self.queue.get_nowait()  # drop the report not yet written
+            self.queue.task_done()
+        except queue.Empty:
+            pass
+        self.queue.put(progress)
+
+    def _reporter(self):
+        while True:
+            progress = self.queue.get()
+            try:
+                if progress is None:
+                    return
+                self.report(*progress)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Writes the held report (and waits for the background thread to
+        write it), called by the drivers when a run ends"""
+        if self.held is not None:
+            self._emit(self.held)
+            self.held = None
+
+        if self.background and self.thread.is_alive():
+            self.queue.join()
+
+    def close(self):
+        """Writes the held report and stops the background thread"""
+        self.flush()
+
+        if self.background and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+class ConsoleReporter(Reporter):
+    """Prints the table of iterations of print_pso.py (header every 20 rows)"""
+
+    def __init__(self, every=1, interval=0.0, background=False):
+        super().__init__(every, interval, background)
+        self.n_rows = 0
+
+    def start(self, swarm_size, n_variables, intVar):
+        print_header(swarm_size, n_variables, intVar)
+
+    def report(self, iteration, evaluations, gbest, pworst, error_fnc, error_x):
+        if self.n_rows % 20 == 0:
+            print_table_header()
+
+        print_row(iteration, evaluations, gbest, pworst, error_fnc, error_x)
+        self.n_rows += 1
+
+
+class CallbackReporter(Reporter):
+    """Calls function(iteration, evaluations, gbest, pworst, error_fnc, error_x)"""
+
+    def __init__(self, function, every=1, interval=0.0, background=False):
+        super().__init__(every, interval, background)
+        self.function = function
+
+    def report(self, iteration, evaluations, gbest, pworst, error_fnc, error_x):
+        self.function(iteration, evaluations, gbest, pworst, error_fnc, error_x)
+
+
+def make_reporters(reporters=None, print_freq=1, interval=0.0):
+    """Returns the reporters of a run
+
+    :param reporters: None for the default ConsoleReporter(print_freq,
+        interval), or a list of Reporter instances and functions (wrapped
+        in a CallbackReporter reporting every iteration); [] for a silent run
+    :return: (reporters, owned) where owned are the reporters created here,
+        to be closed by the caller (Reporter instances are only flushed)
+    """
+    if reporters is None:
+        reporters = [ConsoleReporter(print_freq, interval)]
+        return reporters, reporters
+
+    run_reporters, owned = [], []
+    for reporter in reporters:
+        if not isinstance(reporter, Reporter):
+            reporter = CallbackReporter(reporter)
+            owned.append(reporter)
+        run_reporters.append(reporter)
+
+    return run_reporters, owned
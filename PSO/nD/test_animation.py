@@ -0,0 +1,131 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import animation
+from animation import AnimationWriter
+from pso import pso
+import optitestfuns
+import unittest
+import tempfile
+import tracemalloc
+import time
+import os
+import numpy as np
+from PIL import Image
+
+'''Tests for the streaming animation of the particles.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_animation.py
+'''
+
+
+class AnimationTests(unittest.TestCase):
+
+    def test_gif_frames(self):
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ackley.gif')
+            with AnimationWriter(optitestfuns.ackley, ([-5, 5], [-5, 5]), path,
+                                 n_points=30, figsize=(3, 2), queue_size=100) as writer:
+                figure = writer.figure
+                for i in range(6):
+                    writer.update(rng.uniform(-5, 5, (2, 10)), rng.uniform(-1, 1, (2, 10)),
+                                  iteration=i)
+                self.assertIs(writer.figure, figure)  # one figure for the whole run
+
+            self.assertEqual(writer.n_frames, 6)
+            self.assertEqual(writer.dropped, 0)
+            with Image.open(path) as gif:
+                self.assertEqual(gif.n_frames, 6)
+                self.assertEqual(gif.size, (300, 200))
+
+    def test_throttling(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rastrigin.gif')
+            with AnimationWriter(optitestfuns.rastrigin, [-5, 5], path, every=3,
+                                 n_points=30, figsize=(3, 2)) as writer:
+                rendered = [writer.update(np.linspace(-4, 4, 5)[np.newaxis]) for i in range(9)]
+
+            self.assertEqual(rendered, [True, False, False]*3)
+            self.assertEqual(writer.n_frames + writer.dropped, 3)
+
+            path = os.path.join(tmp, 'slow.gif')
+            with AnimationWriter(optitestfuns.rastrigin, [-5, 5], path, max_fps=1e-3,
+                                 n_points=30, figsize=(3, 2)) as writer:
+                rendered = [writer.update(np.zeros((1, 5))) for i in range(5)]
+
+            self.assertEqual(sum(rendered), 1)
+
+    def test_gif_stream(self):
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stream.gif')
+            writer = AnimationWriter(optitestfuns.ackley, ([-5, 5], [-5, 5]), path,
+                                     n_points=30, figsize=(3, 2), block=True)
+            frame_bytes = 300*200*3
+
+            tracemalloc.start()
+            memory = []
+            for i in range(60):
+                writer.update(rng.uniform(-5, 5, (2, 10)), iteration=i)
+                if i in (9, 59):
+                    while writer.n_frames < i + 1:
+                        time.sleep(0.01)
+                    memory.append(tracemalloc.get_traced_memory()[0])
+            tracemalloc.stop()
+
+            # * The frames are written as they arrive, none is kept in memory
+            assert memory[1] - memory[0] < 5*frame_bytes, "ERROR: memory grows with the frames"
+            with Image.open(path) as gif:  # unfinished file (no trailer) of a killed run
+                self.assertEqual(gif.n_frames, 60)
+
+            writer.close()
+            with Image.open(path) as gif:
+                self.assertEqual(gif.n_frames, 60)
+                self.assertEqual(gif.info['loop'], 0)
+                self.assertEqual(gif.info['duration'], 100)
+
+    def test_gif_image_block(self):
+        frame = np.random.default_rng(0).integers(0, 256, (20, 30, 3), dtype=np.uint8)
+        image = Image.fromarray(frame).quantize(256, method=Image.Quantize.FASTOCTREE)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'frame.gif')
+            with open(path, 'wb') as file:
+                file.write(animation._gif_header(image.size) + animation._gif_image(image) + b';')
+            with Image.open(path) as gif:
+                decoded = np.asarray(gif.convert('RGB'))
+
+        self.assertTrue(np.array_equal(decoded, np.asarray(image.convert('RGB'))))
+
+    def test_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'missing', 'ackley.gif')  # the GIF can't be written
+
+            with self.assertRaises(FileNotFoundError):
+                with AnimationWriter(optitestfuns.ackley, [-5, 5], path, n_points=30,
+                                     figsize=(3, 2)) as writer:
+                    writer.update(np.zeros((1, 5)))
+
+            # * The error of the with block is not hidden by the one of the encoder
+            with self.assertRaises(ZeroDivisionError):
+                with AnimationWriter(optitestfuns.ackley, [-5, 5], path, n_points=30,
+                                     figsize=(3, 2)) as writer:
+                    writer.update(np.zeros((1, 5)))
+                    1/0
+
+    def test_pso_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'pso.gif')
+            with AnimationWriter(optitestfuns.ackley, ([-5, 5], [-5, 5]), path,
+                                 n_points=30, figsize=(3, 2), queue_size=1000) as writer:
+                result = pso(optitestfuns.ackley, [-5, -5], [5, 5], [], swarm_size=10,
+                             maxIter=5, reporters=[], plotPSO=writer, rng=0)
+
+            self.assertEqual(writer.n_updates, result.iterations)
+            with Image.open(path) as gif:
+                self.assertEqual(gif.n_frames, writer.n_frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import benchmark
+import unittest
+import os
+import tempfile
+
+'''Tests for the benchmark suite.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_benchmark.py
+'''
+
+class BenchmarkTests(unittest.TestCase):
+
+    def test_compare(self):
+        baseline = {'a': {'min': 1.0}, 'b': {'min': 1.0}, 'c': {'min': 1.0}}
+        results  = {'a': {'min': 1.1}, 'b': {'min': 2.0}, 'c': {'min': 0.5}, 'new': {'min': 9.0}}
+
+        regressions = benchmark.compare(results, baseline, threshold=0.2)
+        assert [key for key, *_ in regressions] == ['b'], "ERROR: regressions not flagged"
+        assert regressions[0][3] == 2.0
+
+    def test_results_by_machine_and_commit(self):
+        run = benchmark.run_benchmarks(groups=['function'], quick=True, repeat=1)
+        assert 'function/ackley/n=10/batch=100' in run['results']
+        assert all(timing['min'] <= timing['median'] for timing in run['results'].values())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'benchmark_results.json')
+            benchmark.save_results(path, benchmark.load_results(path), run)
+
+            other = dict(run, key='other-commit')
+            benchmark.save_results(path, benchmark.load_results(path), other)
+
+            machine = benchmark.load_results(path)[run['machine_key']]
+            assert machine['baseline'] == run['key'], "ERROR: first run isn't the baseline"
+            assert set(machine['runs']) == {run['key'], 'other-commit'}
+
+
+if __name__ == '__main__':
+    unittest.main()
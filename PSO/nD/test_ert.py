@@ -0,0 +1,91 @@
+import ert
+import benchmark
+import unittest
+import numpy as np
+from optitestfuns import ackley
+
+'''Tests for the evaluations-to-target (ERT) harness.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_ert.py
+'''
+
+class ERTTests(unittest.TestCase):
+
+    def test_documented_optima(self):
+        assert ert.documented('ackley') == (0.0, -30.0, 30.0)
+        f_opt, lower, upper = ert.documented('odd_square')
+        assert np.isclose(upper, 5*np.pi) and lower == -upper
+
+        # * f* is reached (to the smallest target) and nothing in the domain is lower
+        optitestfuns = ert.optitestfuns
+        b = np.array([1, 1.3, 0.8])
+        optima = {'ackley':     np.zeros(3),
+                  'griewangk':  np.zeros(3),
+                  'rastrigin':  np.zeros(3),
+                  'salomon':    np.zeros(3),
+                  'odd_square': b + np.sqrt(0.015254900897867223/3),
+                  'schwefel':   np.full(3, 420.968746359982),
+                  'rana':       np.full(2, -512.0)}
+
+        rng = np.random.default_rng(0)
+        for name, x_opt in optima.items():
+            function = getattr(optitestfuns, name)
+            f_opt, lower, upper = ert.documented(name)
+
+            assert abs(function(x_opt) - f_opt) < 1e-9, "ERROR: f* of {} is not exact".format(name)
+            X = rng.uniform(lower, upper, (20000, x_opt.size))
+            assert np.min(function(X)) >= f_opt, "ERROR: points of {} below f*".format(name)
+
+            if name in optitestfuns.ROTATABLE:  # same f* at the shift
+                variant = optitestfuns.shifted_rotated(function)
+                shift, _ = optitestfuns.transformation(name, x_opt.size)
+                assert ert.documented(variant) == (f_opt, lower, upper)
+                assert abs(variant(shift) - f_opt) < 1e-9
+                assert np.min(variant(X)) >= f_opt, "ERROR: points of {} below f*".format(variant.__name__)
+
+    def test_recorder_batch_and_single(self):
+        X = np.random.default_rng(0).uniform(-2, 2, (60, 3))
+
+        batch = ert.TargetRecorder(ackley, 0.0)
+        batch(X[:25])
+        batch(X[25:])
+
+        single = ert.TargetRecorder(ackley, 0.0)
+        for x in X:
+            single(x)
+
+        assert batch.hits == single.hits, "ERROR: batch and single point hits differ"
+        assert batch.evaluations == single.evaluations == 60
+        assert batch.hits[0] == 1 and batch.hits[-1] is None
+
+    def test_ert(self):
+        trials = [{'hits': [10, None], 'evaluations': 100},
+                  {'hits': [30, 80],   'evaluations': 100},
+                  {'hits': [None, None], 'evaluations': 100}]
+
+        assert ert.ert(trials, 0) == ((10 + 30 + 100)/2, 2/3)
+        assert ert.ert(trials, 1) == ((80 + 100 + 100)/1, 1/3)
+
+    def test_experiment(self):
+        variants = {'particle': {}, 'swarm': {'engine': 'swarm'}}
+        trials = ert.run_experiment(variants, ['ackley'], [2], n_runs=3,
+                                    budget_per_dimension=500, targets=(1e0, 1e-2), jobs=1)
+
+        assert len(trials) == 6
+        assert all(trial['evaluations'] <= 1000 for trial in trials), "ERROR: budget exceeded"
+        assert all(trial['hits'][0] is not None for trial in trials), "ERROR: ackley 2D target missed"
+
+        budgets, fraction = ert.ecdf(trials)['swarm']
+        assert (np.diff(fraction) >= 0).all() and fraction[-1] <= 1
+        assert 'ackley' in ert.format_table(trials, (1e0, 1e-2))
+
+        # * rana only in 2D (its known optimum), the benchmarks time it in any dimension
+        trials = ert.run_experiment(None, ['rana', 'odd_square'], [2, 10, 20], n_runs=1,
+                                    budget_per_dimension=10, jobs=1)
+        assert sorted((trial['function'], trial['n']) for trial in trials) == \
+            [('odd_square', 2), ('odd_square', 10), ('rana', 2)]
+        assert ert.supports is benchmark.supports and benchmark.supports('rana', 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import history
+import unittest
+import timeit
+import tracemalloc
+import numpy as np
+
+'''Tests for the convergence history recorder.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_history.py
+'''
+
+
+def record(recorder, iterations):
+    for i in iterations:
+        recorder.record(i, 20*i, 0.1*i, 1/(i + 1), 2/(i + 1), 1/(i + 1), 0.5, 0.1)
+
+
+class HistoryTests(unittest.TestCase):
+
+    def test_grow(self):
+        recorder = history.History(4)
+        record(recorder, range(10))
+
+        assert len(recorder) == 10
+        assert np.array_equal(recorder.iteration, np.arange(10)), "ERROR: rows lost when growing"
+        assert np.array_equal(recorder.evaluations, 20*np.arange(10))
+        assert set(recorder.as_dict()) == set(history.FIELDS)
+
+    def test_ring(self):
+        recorder = history.History(4, 'ring')
+        record(recorder, range(10))
+
+        assert recorder.data.shape[1] == 4, "ERROR: ring buffer grew"
+        assert np.array_equal(recorder.iteration, [6, 7, 8, 9]), "ERROR: last iterations not in order"
+
+    def test_downsample(self):
+        recorder = history.History(4, 'downsample')
+        record(recorder, range(40))
+
+        assert recorder.data.shape[1] == 4, "ERROR: downsampled history grew"
+        assert np.array_equal(recorder.iteration, [0, 16, 32]), "ERROR: rows don't cover the whole run"
+        assert recorder.keeps() == (40 % recorder.stride == 0)
+
+    def test_record_cost(self):
+        # typically ~0.35 us over the cost of the call itself, with margin for loaded machines
+        class Empty:
+            __slots__ = ()
+
+            def record(self, *values):
+                pass
+
+        gbest = np.float64(1.0)
+        for mode in history.MODES:
+            costs = []
+            for recorder in (Empty(), history.History(1024, mode)):
+                costs.append(min(timeit.repeat(
+                    lambda: recorder.record(1, 20, 0.5, gbest, gbest, gbest, gbest, gbest),
+                    number=20000, repeat=5))/20000)
+            cost = costs[1] - costs[0]
+            assert cost < 1e-6, "ERROR: recording costs {:.2f} us in {} mode".format(cost*1e6, mode)
+
+    def test_diversity(self):
+        x = np.random.default_rng(0).normal(420, 1, (10, 200000))
+        assert np.isclose(history.diversity(x), np.sqrt(np.sum(np.var(x, axis=1))))
+
+        work = history.diversity_work(10)
+        tracemalloc.start()
+        history.diversity(x, work)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert peak < x.nbytes/20, "ERROR: diversity allocated {} bytes".format(peak)
+
+
+if __name__ == '__main__':
+    unittest.main()
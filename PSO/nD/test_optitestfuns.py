@@ -0,0 +1,91 @@
+import optitestfuns
+import unittest
+import numpy as np
+import tempfile
+import os
+
+'''Tests for the batch evaluation of the test functions.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_optitestfuns.py
+'''
+
+FUNCTIONS = [optitestfuns.ackley, optitestfuns.griewangk, optitestfuns.rastrigin,
+             optitestfuns.salomon, optitestfuns.odd_square, optitestfuns.schwefel,
+             optitestfuns.rana]
+
+
+class OptiTestFunsBatchTests(unittest.TestCase):
+
+    def test_batch_matches_single_point(self):
+        rng = np.random.RandomState(0)
+        for function in FUNCTIONS:
+            for n in [2, 5, 10]:
+                X = rng.uniform(-10, 10, (40, n))
+                work = optitestfuns.workspace(X.shape)
+
+                single = np.array([function(list(x)) for x in X])
+
+                assert np.array_equal(function(X), single), \
+                    "ERROR: {} batch differs from single point".format(function.__name__)
+                assert np.array_equal(function(X, work), single), \
+                    "ERROR: {} with work buffers differs".format(function.__name__)
+                assert np.allclose(function(np.asfortranarray(X)), single, rtol=1e-14), \
+                    "ERROR: {} differs for non contiguous batches".format(function.__name__)
+
+    def test_scalar(self):
+        # * A number is one variable, same values as before the batch support
+        baseline = {'ackley':     9.023767278119472,
+                    'griewangk':  1.9922424966004453,
+                    'rastrigin':  9.0,
+                    'salomon':    0.30000000000000004,
+                    'odd_square': -0.5396329765124782,
+                    'schwefel':   -2.9610799349710613}
+        for name, value in baseline.items():
+            y = getattr(optitestfuns, name)(3.0)
+            assert isinstance(y, float) and np.ndim(y) == 0, "ERROR: {}(3.0) is not a float".format(name)
+            assert np.isclose(y, value, rtol=1e-14), "ERROR: {}(3.0) = {}".format(name, y)
+
+    def test_known_minimum(self):
+        assert np.isclose(optitestfuns.ackley(np.zeros((3, 4))), 0).all()
+        assert np.isclose(optitestfuns.rastrigin(np.zeros(6)), 0)
+        assert np.isclose(optitestfuns.schwefel(420.968746*np.ones((2, 3))), optitestfuns.OPTIMA['schwefel'][0]).all()
+
+    def test_shifted_rotated(self):
+        rng = np.random.RandomState(1)
+        for name in optitestfuns.ROTATABLE:
+            function = optitestfuns.shifted_rotated(getattr(optitestfuns, name), seed=3)
+            for n in [2, 7]:
+                shift, rotation = optitestfuns.transformation(name, n, seed=3)
+                x_opt = np.full(n, optitestfuns.ROTATABLE[name][0])
+
+                assert np.allclose(rotation @ rotation.T, np.eye(n)), "ERROR: rotation isn't orthogonal"
+                assert np.isclose(function(shift), getattr(optitestfuns, name)(x_opt)), \
+                    "ERROR: optimum of {} isn't at the shift".format(function.__name__)
+
+                # nothing in the domain is lower than the optimum
+                bound = optitestfuns.ROTATABLE[name][1]
+                sample = rng.uniform(-bound, bound, (20000, n))
+                assert np.min(function(sample)) >= function(shift), \
+                    "ERROR: points of {} below the optimum at the shift".format(function.__name__)
+
+                X = rng.uniform(-10, 10, (30, n))
+                single = np.array([function(x) for x in X])
+                assert np.allclose(function(X), single, rtol=1e-12)
+                assert np.allclose(function(X, optitestfuns.workspace(X.shape, 6)), single, rtol=1e-12)
+
+    def test_transformation_cache(self):
+        shift, rotation = optitestfuns.transformation('ackley', 5, seed=11)
+        assert optitestfuns.transformation('ackley', 5, seed=11)[1] is rotation, "ERROR: not cached"
+        assert not np.allclose(optitestfuns.transformation('ackley', 5, seed=12)[0], shift)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            on_disk = optitestfuns.transformation('rana', 4, seed=11, cache_dir=cache_dir)
+            assert os.path.exists(os.path.join(cache_dir, 'rana_4_11.npz'))
+
+            del optitestfuns._transformations[('rana', 4, 11)]
+            loaded = optitestfuns.transformation('rana', 4, seed=11, cache_dir=cache_dir)
+            assert np.array_equal(loaded[1], on_disk[1]), "ERROR: disk cache differs"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import matplotlib
+matplotlib.use('Agg')
+
+import plotPSO
+import optitestfuns
+import unittest
+import tempfile
+import os
+import numpy as np
+
+'''Tests for the surface evaluation of the plots.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_plotPSO.py
+'''
+
+
+class SurfaceTests(unittest.TestCase):
+
+    def test_batch_and_scalar_functions(self):
+        calls = []
+        def scalar(x):  # single point function indexing its variables
+            calls.append(x)
+            return x[0]**2 - x[1]
+
+        (XX, YY), ZZ = plotPSO.surface(scalar, ([-1, 1], [-2, 2]), 20)
+        assert np.allclose(ZZ, XX**2 - YY), "ERROR: scalar function surface"
+
+        (XX, YY), ZZ = plotPSO.surface(optitestfuns.rana, ([-5, 5], [-5, 5]), 20)
+        single = [[optitestfuns.rana([x, y]) for x, y in zip(xs, ys)] for xs, ys in zip(XX, YY)]
+        assert np.allclose(ZZ, single), "ERROR: batch function surface"
+
+        x, z = plotPSO.surface(lambda x: float(np.cos(x)), [-3, 3], 15)
+        assert np.allclose(z, np.cos(x)), "ERROR: 1D scalar function curve"
+
+    def test_cached_surface(self):
+        calls = []
+        def ackley(X):
+            calls.append(len(X))
+            return optitestfuns.ackley(X)
+
+        for frame in range(30):
+            plotPSO.plotPSO_2D(ackley, ([-5, 5], [-5, 5]), ([0, 1], [1, 2]), n_points=30)
+            matplotlib.pyplot.close('all')
+
+        assert sum(calls) < 2*30*30, "ERROR: surface evaluated for every frame"
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            _, on_disk = plotPSO.surface(optitestfuns.salomon, ([-3, 3], [-3, 3]), 25, cache_dir)
+            assert len(os.listdir(cache_dir)) == 1
+
+            plotPSO.clear_cache()
+            _, loaded = plotPSO.surface(optitestfuns.salomon, ([-3, 3], [-3, 3]), 25, cache_dir)
+            assert np.array_equal(loaded, on_disk), "ERROR: disk cache differs"
+
+        # * Bounded in-memory cache, least recently used surfaces dropped first
+        plotPSO.clear_cache()
+        for n_points in range(10, 10 + plotPSO.SURFACE_CACHE_SIZE + 5):
+            plotPSO.surface(optitestfuns.salomon, ([-3, 3], [-3, 3]), n_points)
+        assert len(plotPSO._surfaces) == plotPSO.SURFACE_CACHE_SIZE
+        assert (optitestfuns.salomon, ((-3.0, 3.0), (-3.0, 3.0)), 10) not in plotPSO._surfaces
+
+
+if __name__ == '__main__':
+    unittest.main()
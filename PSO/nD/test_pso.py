@@ -1,7 +1,16 @@
 from pso import pso
 from optitestfuns import ackley
 import unittest
-from numpy import isclose, array
+import time
+import os
+import tempfile
+from numpy import isclose, array, sum, random, array_equal, float32, float64, diff, \
+    concatenate, ones, atleast_2d
+from evaluation import batch_objective, ThreadPoolEvaluator
+from cache import CachedEvaluator
+from multiswarm import pso_multiswarm
+from coevolution import pso_cc, differential_grouping
+from topology import make_topology, neighborhood_best
 
 '''Tests for the nD PSO implementation.
 To run it please execute the following command in your terminal or cmd
@@ -50,6 +59,283 @@ class PSOfunctionMethodTests(unittest.TestCase):
         assert isclose(result.xopt[1], theo_min, atol=1e-3), "ERROR: second variable didn't converged to 0"
 
 
+    def test_pso2D_swarm_engine(self):
+        intVar = []
+        result = pso(ackley, [-5,-5], [5,5], intVar, engine='swarm')
+
+        theo_min = array([0])
+
+        print(result.exit)
+        print('x_opt: {}'.format(result.xopt))
+        print('FO: {:2e}'.format(result.FO))
+
+        assert isclose(result.xopt[0], theo_min, atol=1e-3), "ERROR: first variable didn't converged to 0"
+        assert isclose(result.xopt[1], theo_min, atol=1e-3), "ERROR: second variable didn't converged to 0"
+
+    def test_pso_unknown_option(self):
+        with self.assertRaises(TypeError):
+            pso(ackley, [-5], [5], [], swarmsize=10)
+
+
+    def test_pso_batch_objective(self):
+        calls = []
+
+        @batch_objective
+        def sphere(X):
+            calls.append(X.shape)
+            return sum(X**2, axis=1)
+
+        result = pso(sphere, [-5,-5,-5], [5,5,5], [], engine='swarm', swarm_size=30, rng=0)
+        assert all(shape == (30, 3) for shape in calls), "ERROR: the swarm wasn't evaluated in one call"
+
+        result_single = pso(lambda x: sum(x**2), [-5,-5,-5], [5,5,5], [], engine='swarm', swarm_size=30, rng=0)
+        assert array_equal(result.xopt, result_single.xopt), "ERROR: batch and single point objectives differ"
+
+
+    def test_pso_evaluators(self):
+        for engine in ['particle', 'swarm']:
+            results = []
+            for evaluator in ['serial', 'thread', 'process']:
+                results.append(pso(ackley, [-5,-5], [5,5], [], engine=engine, maxIter=50,
+                                   evaluator=evaluator, n_workers=2, rng=1))
+
+            for result in results[1:]:
+                assert array_equal(result.xopt, results[0].xopt), "ERROR: parallel evaluation changed the trajectory"
+                assert result.FO_evaluations == results[0].FO_evaluations
+
+
+    def test_pso_cache(self):
+        calls = []
+
+        def counted_ackley(x):
+            calls.append(1)
+            return ackley(x)
+
+        result = pso(counted_ackley, [-5,-5], [5,5], [0,1], maxIter=30, cache_size=50)
+
+        assert result.cache['hits'] + result.cache['misses'] == 30*20, "ERROR: cache hits are not counted as evaluations"
+        assert len(calls) == result.cache['misses'], "ERROR: cached positions were evaluated again"
+        assert result.cache_hit_rate > 0.5, "ERROR: integer positions were not reused"
+
+
+    def test_pso_budgets(self):
+        for engine in ['particle', 'swarm']:
+            result = pso(ackley, [-5,-5], [5,5], [], engine=engine, maxFO=55, tol_x=0, tol_fnc=0)
+
+            assert result.FO_evaluations == 55, "ERROR: maxFO wasn't enforced in the middle of the iteration"
+            assert 'function evaluations' in result.exit
+
+        def slow_ackley(x):
+            time.sleep(0.002)
+            return ackley(x)
+
+        result = pso(slow_ackley, [-5,-5], [5,5], [], maxTime=0.1, tol_x=0, tol_fnc=0)
+
+        assert result.time_total < 0.1 + 0.05, "ERROR: maxTime wasn't enforced"
+        assert 'time limit' in result.exit
+        assert isclose(result.time_objective + result.time_optimizer, result.time_total)
+        assert result.time_objective > result.time_optimizer
+
+
+    def test_pso_budget_parallel(self):
+        chunks, calls = [], []
+
+        class CountingEvaluator(ThreadPoolEvaluator):
+            def evaluate(self, X):
+                chunks.append(X.shape[0])
+                return super().evaluate(X)
+
+        with CountingEvaluator(ackley, 4) as evaluator:  # no time limit: one call per swarm
+            pso(ackley, [-5,-5], [5,5], [], evaluator=evaluator, maxIter=5, tol_x=0, tol_fnc=0)
+
+        assert chunks == [20]*5, "ERROR: the swarm was split in chunks {}".format(chunks)
+
+        def slow_ackley(x):
+            calls.append(1)
+            time.sleep(0.01)
+            return ackley(x)
+
+        result = pso(slow_ackley, [-5,-5], [5,5], [], evaluator='thread', n_workers=4,
+                     maxTime=0.1, tol_x=0, tol_fnc=0)
+
+        assert result.time_total < 0.1 + 0.05, "ERROR: maxTime wasn't enforced"
+        assert 'time limit' in result.exit
+        assert result.FO_evaluations == len(calls), "ERROR: cancelled evaluations were counted"
+
+
+    def test_cache_in_flight(self):
+        calls = []
+
+        def slow_ackley(x):
+            calls.append(1)
+            time.sleep(0.05)
+            return ackley(x)
+
+        with ThreadPoolEvaluator(slow_ackley, 2) as backend:
+            evaluator = CachedEvaluator(backend)
+            futures = [evaluator.submit(array([1.0, 2.0])) for _ in range(3)]
+
+            assert len(set(futures)) == 1, "ERROR: repeated positions in flight were not shared"
+            assert futures[0].result() == ackley([1.0, 2.0])
+            assert len(calls) == 1 and evaluator.stats()['hits'] == 2
+
+        assert not evaluator.in_flight, "ERROR: finished evaluations kept in flight"
+
+
+    def test_pso_checkpoint_resume(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'swarm.npz')
+
+            for engine in ['particle', 'swarm']:
+                result = pso(ackley, [-5,-5,-5], [5,5,5], [1], engine=engine, maxIter=30,
+                             tol_x=0, tol_fnc=0, checkpoint=path, checkpoint_every=20,
+                             checkpoint_interval=0, rng=2)
+
+                # the generator state is restored from the checkpoint
+                reported = []
+                resumed = pso(ackley, [-5,-5,-5], [5,5,5], [1], engine=engine, maxIter=30,
+                              tol_x=0, tol_fnc=0, resume=path, rng=3,
+                              reporters=[lambda n_iter, *status: reported.append(n_iter)])
+
+                assert array_equal(result.xopt, resumed.xopt), "ERROR: resumed run differs"
+                assert result.FO == resumed.FO
+                assert result.FO_evaluations == resumed.FO_evaluations
+
+                # the iterations before the checkpoint are not recorded or reported again
+                assert reported == list(range(21, 31)), "ERROR: resumed run reported {}".format(reported)
+                assert array_equal(resumed.history.iteration, range(21, 31))
+
+
+    def test_pso_multiswarm(self):
+        calls = []
+
+        @batch_objective
+        def batch_ackley(X):
+            calls.append(X.shape)
+            return ackley(X)
+
+        results = pso_multiswarm(batch_ackley, [-5,-5], [5,5], [], n_swarms=10, swarm_size=15, rng=4)
+
+        assert calls[0] == (10*15, 2), "ERROR: the swarms weren't evaluated in one call"
+        assert all(shape[0] % 15 == 0 for shape in calls), "ERROR: finished swarms were evaluated"
+        assert [result.swarm for result in results] == list(range(10))
+
+        for result in results:
+            assert isclose(result.xopt, 0, atol=1e-3).all(), "ERROR: a swarm didn't converge to 0"
+            assert result.FO_evaluations == result.iterations*15
+
+        results_single = pso_multiswarm(ackley, [-5,-5], [5,5], [], n_swarms=10, swarm_size=15, rng=4)
+        assert all(array_equal(a.xopt, b.xopt) for a, b in zip(results, results_single))
+
+
+    def test_pso_topologies(self):
+        neighbors = make_topology('ring', 6)
+        assert array_equal(neighbors[0], [5, 0, 1]), "ERROR: ring neighbors of the first particle"
+        assert array_equal(neighborhood_best(array([3., 1, 2, 5, 0, 4]), neighbors), [1, 1, 1, 4, 4, 4])
+        assert make_topology('von_neumann', 12).shape == (12, 5)
+
+        for engine in ['particle', 'swarm']:
+            for topology in ['ring', 'von_neumann', 'random']:
+                result = pso(ackley, [-5,-5], [5,5], [], engine=engine, topology=topology, rng=5)
+
+                assert isclose(result.xopt, 0, atol=1e-3).all(), \
+                    "ERROR: {} topology didn't converge to 0".format(topology)
+
+
+    def test_pso_float32(self):
+        n = 50
+        for engine, n_arrays in [('particle', 7), ('swarm', 9)]:
+            for dtype, itemsize in [(float64, 8), (float32, 4)]:
+                result = pso(ackley, [-5]*n, [5]*n, [], engine=engine, dtype=dtype, maxIter=20, rng=6)
+
+                assert result.xopt.dtype == dtype
+                assert result.memory_per_particle == n_arrays*n*itemsize + 16, \
+                    "ERROR: memory per particle differs from the documented one"
+
+        result = pso(ackley, [-5,-5], [5,5], [], engine='swarm', dtype=float32)
+        assert isclose(result.xopt, 0, atol=1e-3).all(), "ERROR: float32 swarm didn't converge to 0"
+
+
+    def test_pso_rng(self):
+        results = [pso(ackley, [-5,-5,-5], [5,5,5], [], maxIter=30, rng=rng)
+                   for rng in [7, random.SeedSequence(7), random.default_rng(7), 8]]
+
+        assert array_equal(results[0].xopt, results[1].xopt), "ERROR: same seed gave different runs"
+        assert array_equal(results[0].xopt, results[2].xopt), "ERROR: injected Generator wasn't used"
+        assert not array_equal(results[0].xopt, results[3].xopt)
+
+
+    def test_pso_history(self):
+        for engine in ['particle', 'swarm']:
+            result = pso(ackley, [-5,-5], [5,5], [], engine=engine, rng=9)
+            history = result.history
+
+            assert len(history) == result.iterations, "ERROR: an iteration wasn't recorded"
+            assert history.gbest[-1] == result.FO
+            assert history.evaluations[-1] == result.FO_evaluations
+            assert (diff(history.gbest) <= 0).all(), "ERROR: gbest history isn't monotone"
+            assert history.diversity[-1] < history.diversity[0], "ERROR: the swarm didn't contract"
+
+        result = pso(ackley, [-5,-5], [5,5], [], rng=9, history_mode='ring', history_size=10)
+        assert array_equal(result.history.iteration, range(result.iterations - 9, result.iterations + 1))
+
+        assert pso(ackley, [-5,-5], [5,5], [], rng=9, history=False).history is None
+
+
+    def test_pso_profile(self):
+        for engine in ['particle', 'swarm']:
+            laps = {}
+            def profile_callback(phase, seconds):
+                assert seconds >= 0, "ERROR: negative phase time"
+                laps[phase] = laps.get(phase, 0.0) + seconds
+
+            result = pso(ackley, [-5,-5], [5,5], [], engine=engine, rng=9, reporters=[],
+                         profile_callback=profile_callback)
+            profile = result.profile
+            total   = sum(list(profile.values()))
+
+            assert set(profile) == {'objective', 'update', 'bookkeeping', 'reporting', 'plotting'}
+            assert isclose(profile['objective'], result.time_objective)
+            assert 0.9*result.time_total < total <= result.time_total, "ERROR: time not profiled"
+            for phase, seconds in laps.items():
+                assert isclose(seconds, profile[phase]), "ERROR: callback and result disagree"
+
+
+    def test_pso_cc(self):
+        n = 200
+        single = pso(ackley, [-5]*n, [5]*n, [], engine='swarm', batch=True, maxFO=40000,
+                     maxIter=2000, tol_x=-1, tol_fnc=-1, v_max=1.0, reporters=[], rng=2)
+
+        for grouping in ['static', 'random']:
+            for synchronous in [False, True]:
+                result = pso_cc(ackley, [-5]*n, [5]*n, [], grouping=grouping, group_size=20,
+                                batch=True, maxFO=40000, v_max=1.0, synchronous=synchronous,
+                                reporters=[], rng=2)
+
+                assert result.FO_evaluations <= 40000, "ERROR: budget exceeded"
+                assert result.FO < single.FO, "ERROR: coevolution didn't beat the single swarm"
+                assert isclose(ackley(result.xopt), result.FO), "ERROR: context fitness is stale"
+                assert array_equal(sorted(concatenate(result.groups)), range(n))
+
+        # * options of pso() without meaning for the context vector are rejected
+        with self.assertRaises(TypeError):
+            pso_cc(ackley, [-5]*4, [5]*4, [], tol_x=1e-6, reporters=[])
+
+    def test_differential_grouping(self):
+        @batch_objective
+        def partially_separable(X):
+            X = atleast_2d(X)
+            return sum(X[:, :6]**2, axis=1) + (X[:, 6] - X[:, 9])**2 + sum(X[:, 10:], axis=1)**2
+
+        groups = differential_grouping(partially_separable, -ones(14), ones(14), group_size=3)
+        assert [group.tolist() for group in groups] == [[6, 9], [10, 11, 12, 13], [0, 1, 2], [3, 4, 5], [7, 8]]
+
+        result = pso_cc(partially_separable, [-1]*14, [1]*14, [], grouping='differential',
+                        group_size=3, maxFO=10000, reporters=[], rng=0)
+        assert result.grouping_evaluations > 0
+        assert result.FO < 1e-6, "ERROR: coevolution didn't converge"
+
+
     # def test_pso2Dinteger(self):
     #     intVar = [0,1]
     #     result = pso(ackley, [-5, -5], [5, 5], intVar)
@@ -0,0 +1,70 @@
+import reporters
+import print_pso
+import unittest
+import io
+import contextlib
+from pso import pso
+from optitestfuns import ackley
+
+'''Tests for the progress reporters.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_reporters.py
+'''
+
+
+class ReporterTests(unittest.TestCase):
+
+    def test_print_results_header_cadence(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for iteration in range(1, 101):
+                print_pso.print_results(iteration, 20*iteration, 1.0, 2.0, 1.0, 0.5, 20, 2, [], 2)
+
+        assert output.getvalue().count('Iteration') == 3, "ERROR: table header not every 20 printed rows"
+        assert output.getvalue().count('5.000e-01') == 51, "ERROR: rows not printed every print_freq iterations"
+
+    def test_callback_every(self):
+        calls = []
+        result = pso(ackley, [-5,-5], [5,5], [], rng=0,
+                     reporters=[reporters.CallbackReporter(lambda *progress: calls.append(progress), every=10)])
+
+        assert [progress[0] for progress in calls] == [1] + list(range(10, result.iterations + 1, 10))
+        assert calls[-1][2] <= calls[0][2], "ERROR: gbest reported doesn't improve"
+
+    def test_throttled_and_background(self):
+        for background in [False, True]:
+            calls = []
+            reporter = reporters.CallbackReporter(lambda *progress: calls.append(progress),
+                                                  interval=3600, background=background)
+            result = pso(ackley, [-5,-5], [5,5], [], rng=0, reporters=[reporter])
+
+            # first iteration and, when the run ends, the last held report
+            assert [progress[0] for progress in calls] == [1, result.iterations]
+            assert calls[-1][2] == result.FO
+
+    def test_reused_reporter(self):
+        calls = []
+        reporter = reporters.CallbackReporter(lambda *progress: calls.append(progress),
+                                              every=1000, background=True)
+        for run in range(2):
+            result = pso(ackley, [-5,-5], [5,5], [], rng=run, reporters=[reporter])
+            # * The background thread of the caller's reporter stays alive for the next run
+            assert reporter.thread.is_alive(), "ERROR: the run closed the caller's reporter"
+
+        assert len(calls) == 2, "ERROR: reports of the second run lost"
+        reporter.close()
+        assert not reporter.thread.is_alive()
+
+        owned = reporters.make_reporters([reporter, print])[1]
+        assert len(owned) == 1 and owned[0].function is print
+
+    def test_silent(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            pso(ackley, [-5,-5], [5,5], [], reporters=[])
+
+        assert output.getvalue() == ''
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+from trajectory import TrajectoryRecorder, Trajectory, statistics, replay
+from pso import pso
+import optitestfuns
+import unittest
+import tempfile
+import os
+import numpy as np
+
+'''Tests for the memory-mapped trajectories of the particles.
+To run it please execute the following command in your terminal or cmd
+python -m unittest test_trajectory.py
+'''
+
+
+class TrajectoryTests(unittest.TestCase):
+
+    def test_pso_trajectory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'run')
+            result = pso(optitestfuns.ackley, [-5, -5], [5, 5], [], swarm_size=10, maxIter=30,
+                         maxFO=150, reporters=[], trajectory=path, rng=0)
+
+            trajectory = Trajectory(path)
+            self.assertEqual(np.load(os.path.join(path, 'x.npy'), mmap_mode='r').shape, (30, 10, 2))
+            self.assertEqual(len(trajectory), result.iterations)
+            self.assertEqual(list(trajectory.iterations), list(range(1, result.iterations + 1)))
+            self.assertEqual(trajectory.meta['function'], 'ackley')
+
+            x, v, fval = trajectory.swarm(len(trajectory) - 1)
+            self.assertEqual(x.shape, (2, 10))
+            self.assertTrue(np.allclose(fval, optitestfuns.ackley(x.T)))
+
+            stats = statistics(trajectory)
+            self.assertEqual(stats['gbest'][-1], result.FO)
+            self.assertTrue(np.all(np.diff(stats['gbest']) <= 0))
+
+            chunked = statistics(path, max_bytes=1)  # one iteration per chunk
+            for name in stats:
+                self.assertTrue(np.array_equal(stats[name], chunked[name]))
+
+            class Sink:
+                iterations = []
+
+                def update(self, x, v, fval, iteration):
+                    self.iterations.append(iteration)
+
+            sink = Sink()
+            replay(trajectory, sink=sink)
+            self.assertEqual(sink.iterations, list(trajectory.iterations))
+
+    def test_budget_in_the_middle_of_an_iteration(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'run')
+            result = pso(optitestfuns.ackley, [-5, -5], [5, 5], [], swarm_size=10, maxIter=30,
+                         maxFO=155, reporters=[], trajectory=path, rng=0)
+            self.assertEqual(result.FO_evaluations, 155)
+
+            # only the 5 particles evaluated in the last iteration are recorded
+            x, v, fval = Trajectory(path).swarm(result.iterations - 1)
+            self.assertTrue(np.allclose(fval[:5], optitestfuns.ackley(x[:, :5].T)))
+            self.assertTrue(np.isnan(x[:, 5:]).all() and np.isnan(fval[5:]).all())
+            self.assertTrue(np.isfinite(statistics(path)['diversity']).all())
+            self.assertTrue(np.isfinite(result.history.diversity).all())
+
+    def test_unfinished_recording(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = TrajectoryRecorder(tmp, 100, 4, 3, np.float32)
+            for iteration in range(1, 4):
+                recorder.record(iteration, np.full((3, 4), iteration), np.zeros((3, 4)), np.ones(4))
+            recorder.x.flush()
+
+            # * Readable while the run goes on (or after a crash)
+            trajectory = Trajectory(tmp)
+            self.assertEqual(len(trajectory), 3)
+            self.assertEqual(trajectory.x.dtype, np.float32)
+            self.assertTrue(np.array_equal(trajectory.x[2], np.full((4, 3), 3)))
+
+            # * Resumed run: the rows after the checkpoint are discarded
+            recorder = TrajectoryRecorder(tmp, 100, 4, 3, np.float32, resume=True)
+            recorder.record(2, np.zeros((3, 4)), np.zeros((3, 4)), np.zeros(4))
+            recorder.close()
+            self.assertEqual(len(Trajectory(tmp)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+# coding: utf-8
+
+"""
+Trajectories of the particles of a PSO run in memory-mapped files
+
+A TrajectoryRecorder (trajectory option of pso()) writes the position,
+velocity and fitness of every particle at every iteration into .npy files
+opened with np.lib.format.open_memmap, sized up front for the whole run:
+
+    x.npy           (max_iter, swarm_size, n_variables) positions
+    v.npy           (max_iter, swarm_size, n_variables) velocities
+    fval.npy        (max_iter, swarm_size) fitness values (float64)
+    iterations.npy  (max_iter,) iteration number of each row (0: not recorded)
+                    (particles not evaluated in the last iteration of a run
+                    stopped by maxFO or maxTime are NaN)
+    trajectory.json shape, dtype, bounds, integer variables and function name
+
+Row i is iteration i+1, so recording costs one copy of the swarm into the
+page cache and the files are valid at any time, even after a crash: the
+recorded rows are the leading rows with a nonzero iteration number. Rows
+never reached (maxFO, maxTime, tolerances) are sparse on most file systems.
+
+The files are read back with Trajectory (memory-mapped, read only): the
+statistics are computed a chunk of iterations at a time and the replay
+feeds the selected iterations to plotPSO_2D/plotPSO_1D or to an animation
+sink (animation.AnimationWriter), so trajectories much bigger than the RAM
+can be analysed:
+
+    python trajectory.py run_folder                       # statistics
+    python trajectory.py run_folder --animation run.gif   # 1D/2D test functions
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from history import diversity
+
+FILES = ('x', 'v', 'fval', 'iterations')
+
+
+class TrajectoryRecorder:
+    """Writes every iteration of a run to memory-mapped .npy files
+
+    :param path: folder of the trajectory (created if needed)
+    :param max_iter: rows of the files (maximum number of iterations)
+    :param dtype: float type of the positions and velocities
+    :param lb, ub, intVar, function: stored in trajectory.json for the replay
+    :param resume: True to continue a recorded run (files opened in place;
+        the rows after the first recorded iteration are discarded)
+    """
+
+    def __init__(self, path, max_iter, swarm_size, n_variables, dtype=np.float64,
+                 lb=None, ub=None, intVar=(), function=None, resume=False):
+        self.path = path
+        shapes = {'x':          (max_iter, swarm_size, n_variables),
+                  'v':          (max_iter, swarm_size, n_variables),
+                  'fval':       (max_iter, swarm_size),
+                  'iterations': (max_iter,)}
+        dtypes = {'x': dtype, 'v': dtype, 'fval': np.float64, 'iterations': np.int64}
+
+        if resume:
+            self.arrays = {name: np.lib.format.open_memmap(_file(path, name), mode='r+')
+                           for name in FILES}
+            assert self.arrays['x'].shape == shapes['x'], "Trajectory does not match the run"
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.arrays = {name: np.lib.format.open_memmap(_file(path, name), mode='w+',
+                                                           dtype=dtypes[name], shape=shapes[name])
+                           for name in FILES}
+
+            meta = {'max_iter':    max_iter,
+                    'swarm_size':  swarm_size,
+                    'n_variables': n_variables,
+                    'dtype':       np.dtype(dtype).name,
+                    'lb':          None if lb is None else np.asarray(lb, dtype=float).tolist(),
+                    'ub':          None if ub is None else np.asarray(ub, dtype=float).tolist(),
+                    'intVar':      list(intVar),
+                    'function':    getattr(function, '__name__', None)}
+            with open(os.path.join(path, 'trajectory.json'), 'w') as file:
+                json.dump(meta, file, indent=1)
+
+        self.x, self.v, self.fval, self.iterations = (self.arrays[name] for name in FILES)
+        self.resume = resume
+
+    def record(self, iteration, x, v, fval):
+        """Writes iteration (1, 2 ...) with x and v of shape (n_variables,
+        n_particles). When a budget ran out in the middle of the iteration
+        only the first n_particles were evaluated, the rest are stored as NaN"""
+        row = iteration - 1
+        assert 0 <= row < len(self.iterations), "iteration beyond the size of the trajectory"
+
+        n = x.shape[1]
+        self.x[row, :n] = x.T
+        self.v[row, :n] = v.T
+        self.fval[row, :n] = fval
+        if n < self.fval.shape[1]:
+            self.x[row, n:] = np.nan
+            self.v[row, n:] = np.nan
+            self.fval[row, n:] = np.nan
+        self.iterations[row] = iteration
+
+        if self.resume:  # rows of the interrupted run after the checkpoint
+            self.iterations[row + 1:] = 0
+            self.resume = False
+
+    def close(self):
+        """Flushes the files to disk"""
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+
+
+def _file(path, name):
+    return os.path.join(path, name + '.npy')
+
+
+class Trajectory:
+    """Recorded trajectory (read-only memory maps of the recorded rows)
+
+    Attributes x, v (n_iterations, swarm_size, n_variables), fval
+    (n_iterations, swarm_size), iterations (n_iterations,) and the contents
+    of trajectory.json (lb, ub, intVar, function ...) as meta
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'trajectory.json')) as file:
+            self.meta = json.load(file)
+
+        iterations = np.load(_file(path, 'iterations'), mmap_mode='r')
+        recorded = np.flatnonzero(iterations == 0)
+        n_iterations = recorded[0] if recorded.size else len(iterations)
+
+        self.iterations = iterations[:n_iterations]
+        self.x    = np.load(_file(path, 'x'), mmap_mode='r')[:n_iterations]
+        self.v    = np.load(_file(path, 'v'), mmap_mode='r')[:n_iterations]
+        self.fval = np.load(_file(path, 'fval'), mmap_mode='r')[:n_iterations]
+
+    def __len__(self):
+        return len(self.iterations)
+
+    def swarm(self, i):
+        """(x, v, fval) of the i-th recorded iteration, x and v with the
+        (n_variables, swarm_size) layout of pso()"""
+        return np.array(self.x[i]).T, np.array(self.v[i]).T, np.array(self.fval[i])
+
+    def chunks(self, max_bytes=2**26):
+        """Yields (start, x, v, fval) in memory chunks of consecutive iterations"""
+        row_bytes = self.x[0].nbytes + self.v[0].nbytes + self.fval[0].nbytes if len(self) else 1
+        step = max(1, max_bytes // row_bytes)
+        for start in range(0, len(self), step):
+            stop = start + step
+            yield start, np.array(self.x[start:stop]), np.array(self.v[start:stop]), \
+                np.array(self.fval[start:stop])
+
+
+def statistics(trajectory, max_bytes=2**26):
+    """Per iteration statistics of a trajectory, computed by chunks
+
+    :param trajectory: Trajectory or its folder
+    :param max_bytes: memory of the chunk of iterations read at once
+    :return: dict of arrays (one value per recorded iteration): iteration,
+        best, mean and worst fitness of the swarm, gbest (best so far),
+        diversity (see history.diversity) and mean speed of the particles
+    """
+    if not isinstance(trajectory, Trajectory):
+        trajectory = Trajectory(trajectory)
+
+    n = len(trajectory)
+    stats = {name: np.empty(n) for name in ('best', 'mean', 'worst', 'diversity', 'speed')}
+
+    for start, x, v, fval in trajectory.chunks(max_bytes):
+        rows = slice(start, start + len(fval))
+        stats['best'][rows]  = np.nanmin(fval, axis=1)
+        stats['mean'][rows]  = np.nanmean(fval, axis=1)
+        stats['worst'][rows] = np.nanmax(fval, axis=1)
+        stats['diversity'][rows] = [diversity(swarm[~np.isnan(swarm[:, 0])].T) for swarm in x]
+        stats['speed'][rows] = np.nanmean(np.linalg.norm(v, axis=2), axis=1)
+
+    stats['gbest'] = np.fmin.accumulate(stats['best']) if n else stats['best']
+    stats['iteration'] = np.array(trajectory.iterations)
+    return stats
+
+
+def replay(trajectory, function=None, iterations=None, sink=None, limits=None, n_points=100):
+    """Plots recorded iterations of a 1D or 2D problem
+
+    :param trajectory: Trajectory or its folder
+    :param function: objective function (default: the test function of
+        optitestfuns.py named in the trajectory)
+    :param iterations: indexes of the recorded iterations (default: all with
+        a sink, the last one otherwise)
+    :param sink: object with update(x, v, fval, iteration), e.g.
+        animation.AnimationWriter. Without a sink every iteration is drawn
+        with plotPSO_2D/plotPSO_1D
+    :param limits: limits of the plot (default: the bounds of the run)
+    :return: list of (fig, axes) of plotPSO (empty with a sink)
+    """
+    if not isinstance(trajectory, Trajectory):
+        trajectory = Trajectory(trajectory)
+
+    n_variables = trajectory.meta['n_variables']
+    assert n_variables in (1, 2), "Only 1D and 2D trajectories can be plotted"
+
+    if function is None:
+        import optitestfuns
+        function = getattr(optitestfuns, trajectory.meta['function'])
+
+    if iterations is None:
+        iterations = range(len(trajectory)) if sink is not None else [len(trajectory) - 1]
+
+    if sink is not None:
+        for i in iterations:
+            x, v, fval = trajectory.swarm(i)
+            sink.update(x, v, fval, int(trajectory.iterations[i]))
+        return []
+
+    from plotPSO import plotPSO_1D, plotPSO_2D
+
+    if limits is None:
+        limits = list(zip(trajectory.meta['lb'], trajectory.meta['ub']))
+
+    figures = []
+    for i in iterations:
+        x, v, _ = trajectory.swarm(i)
+        if n_variables == 2:
+            figures.append(plotPSO_2D(function, limits, (x[0], x[1]), (v[0], v[1]), n_points))
+        else:
+            figures.append(plotPSO_1D(function, limits[0], x[0], [], n_points))
+    return figures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Statistics and replay of a recorded PSO trajectory')
+    parser.add_argument('path', help='folder of the trajectory (trajectory option of pso)')
+    parser.add_argument('--animation', default=None, help='.gif/.mp4 file with the particles (1D/2D)')
+    parser.add_argument('--fps', type=int, default=10)
+    parser.add_argument('--every', type=int, default=1, help='animate one of every k iterations')
+    parser.add_argument('--max-bytes', type=int, default=2**26, help='memory of a chunk of iterations')
+    args = parser.parse_args(argv)
+
+    trajectory = Trajectory(args.path)
+    meta = trajectory.meta
+    print('{}: {} iterations x {} particles x {} variables ({})'.format(
+        meta['function'], len(trajectory), meta['swarm_size'], meta['n_variables'], meta['dtype']))
+
+    stats = statistics(trajectory, args.max_bytes)
+    print('{:>10} {:>14} {:>14} {:>14} {:>14} {:>12}'.format(
+        'iteration', 'gbest', 'best', 'mean', 'diversity', 'speed'))
+    for row in range(0, len(trajectory), max(1, len(trajectory) // 20)):
+        print('{:10d} {:14.6e} {:14.6e} {:14.6e} {:14.6e} {:12.4e}'.format(
+            int(stats['iteration'][row]), stats['gbest'][row], stats['best'][row],
+            stats['mean'][row], stats['diversity'][row], stats['speed'][row]))
+
+    if args.animation:
+        import matplotlib
+        matplotlib.use('Agg')
+        import optitestfuns
+        from animation import AnimationWriter
+
+        function = getattr(optitestfuns, meta['function'])
+        limits = list(zip(meta['lb'], meta['ub']))
+        with AnimationWriter(function, limits if len(limits) == 2 else limits[0], args.animation,
+                             fps=args.fps, every=args.every, block=True) as writer:
+            replay(trajectory, function, sink=writer)
+        print('\n{} frames written to {}'.format(writer.n_frames, args.animation))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())